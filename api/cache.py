@@ -0,0 +1,95 @@
+import asyncio
+import hashlib
+import json
+import re
+import time
+from contextlib import aclosing
+from config import Config
+from api.cancellation import CancelToken
+
+_REPLAY_CHUNK = re.compile(r"\S+\s*|\s+")
+
+
+class ResponseCache:
+    """
+    Кэш ответов в SQLite по хэшу (model, messages, max_tokens, temperature).
+
+    Используется только для детерминированных запросов (температура 0)
+    или если пользователь включил кэш в настройках. Попадание
+    проигрывается тем же async-стримом, что и живой ответ, так что
+    вызывающему коду разница не видна. Вытеснение — по возрасту и по
+    суммарному размеру (LRU по последнему использованию).
+    """
+
+    def __init__(self, db, max_bytes: int = Config.CACHE_MAX_BYTES,
+                 max_age: float = Config.CACHE_MAX_AGE):
+        self.db = db
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, messages: list, max_tokens: int, temperature: float) -> str:
+        raw = json.dumps(
+            [model, messages, int(max_tokens), float(temperature)],
+            ensure_ascii=False, sort_keys=True, separators=(",", ":")
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def applies(temperature: float, settings: dict) -> bool:
+        return float(temperature) == 0.0 or settings.get("cache_responses", False)
+
+    async def lookup(self, key: str):
+        """Запись кэша или None; чтение — в потоке-исполнителе, не в event loop"""
+        now = time.time()
+        entry = await asyncio.to_thread(self.db.cache_get, key, now)
+        if entry and now - entry["created_at"] > self.max_age:
+            self.db.cache_delete(key)
+            entry = None
+
+        if entry:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return entry
+
+    def store(self, key: str, model: str, response: str):
+        now = time.time()
+        self.db.cache_put(key, model, response, now)
+        self.db.cache_evict(self.max_bytes, now - self.max_age)
+
+    async def astream(self, key: str, stream, cancel_token: CancelToken = None,
+                      route: dict = None):
+        """Отдать ответ из кэша или пропустить живой стрим, запомнив его"""
+        token = cancel_token or CancelToken()
+        route = route if route is not None else {}
+
+        entry = await self.lookup(key)
+        if entry:
+            # Живой стрим ещё не начинался — запроса к API не будет
+            await stream.aclose()
+            print(f"[CACHE] Hit {key[:12]}")
+            route["model"] = entry["model"] or route.get("model")
+            route["cached"] = True
+            for piece in _REPLAY_CHUNK.findall(entry["response"]):
+                if token.cancelled:
+                    return
+                yield piece
+                await asyncio.sleep(0)
+            return
+
+        parts = []
+        async with aclosing(stream):
+            async for content in stream:
+                parts.append(content)
+                yield content
+
+        # Сохраняем только полный ответ: без ошибок и без остановки
+        if parts and not token.cancelled:
+            self.store(key, route.get("model"), "".join(parts))
+
+    def stats(self) -> dict:
+        entries, size = self.db.cache_size()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
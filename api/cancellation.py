@@ -0,0 +1,57 @@
+import asyncio
+import threading
+
+
+class GenerationCancelled(Exception):
+    """Генерация остановлена через CancelToken"""
+
+
+class CancelToken:
+    """Токен отмены генерации: cancel() можно вызвать из любого потока"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback):
+        """Вызвать callback при отмене; возвращает функцию отписки"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove_callback(callback)
+        callback()
+        return lambda: None
+
+    def _remove_callback(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+async def cancellable(awaitable, token: CancelToken):
+    """Дождаться awaitable, прервав ожидание при отмене токена"""
+    loop = asyncio.get_running_loop()
+    task = asyncio.ensure_future(awaitable)
+    remove = token.add_callback(lambda: loop.call_soon_threadsafe(task.cancel))
+    try:
+        return await task
+    except asyncio.CancelledError:
+        if token.cancelled and task.cancelled():
+            raise GenerationCancelled() from None
+        raise
+    finally:
+        remove()
@@ -0,0 +1,56 @@
+from config import Config
+from utils.tokens import MESSAGE_OVERHEAD, estimate_tokens, message_tokens
+
+
+class ContextBudgeter:
+    """
+    Подбор истории под контекстное окно модели.
+
+    Системный промпт (и резюме старой части чата, если есть) закреплён
+    всегда, дальше берётся скользящее окно
+    последних сообщений, пока оно помещается в лимит модели за вычетом
+    max_tokens под ответ и запаса на погрешность оценки. Последнее
+    сообщение пользователя отправляется в любом случае.
+    """
+
+    def __init__(self, max_tokens: int = 2048):
+        self.max_tokens = max_tokens
+
+    @staticmethod
+    def context_limit(model: str) -> int:
+        return Config.MODEL_CONTEXT_LIMITS.get(model, Config.DEFAULT_CONTEXT_LIMIT)
+
+    def budget(self, model: str) -> int:
+        limit = self.context_limit(model)
+        return int(limit * (1 - Config.CONTEXT_SAFETY_MARGIN)) - self.max_tokens
+
+    def fit(self, system_prompt: str, messages: list, model: str,
+            summary: str = None) -> list:
+        """messages — из db.get_messages (с закэшированным полем tokens)"""
+        budget = self.budget(model)
+
+        api_messages = []
+        if system_prompt:
+            api_messages.append({"role": "system", "content": system_prompt})
+            budget -= message_tokens(system_prompt)
+        if summary:
+            content = f"Summary of the earlier conversation:\n{summary}"
+            api_messages.append({"role": "system", "content": content})
+            budget -= message_tokens(content)
+
+        window = []
+        for msg in reversed(messages):
+            tokens = msg.get("tokens")
+            if tokens is None:
+                tokens = estimate_tokens(msg["content"])
+            tokens += MESSAGE_OVERHEAD
+            if window and tokens > budget:
+                break
+            window.append({"role": msg["role"], "content": msg["content"]})
+            budget -= tokens
+
+        if len(window) < len(messages):
+            print(f"[CONTEXT] {model}: отправлено {len(window)} из {len(messages)} сообщений")
+
+        api_messages.extend(reversed(window))
+        return api_messages
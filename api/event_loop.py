@@ -0,0 +1,53 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class EventLoopThread:
+    """Один фоновый поток с asyncio-циклом: все стримы живут в нём"""
+
+    def __init__(self, name: str = "asyncio-loop"):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro) -> Future:
+        """Запустить корутину в фоновом цикле (из любого потока)"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def iterate(self, agen):
+        """Синхронный генератор поверх async-генератора"""
+        if threading.current_thread() is self.thread:
+            raise RuntimeError("iterate() нельзя вызывать из потока event loop")
+
+        try:
+            while True:
+                try:
+                    yield self.submit(agen.__anext__()).result()
+                except StopAsyncIteration:
+                    return
+        finally:
+            if self.loop.is_running():
+                self.submit(agen.aclose()).result()
+
+    def stop(self):
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=5)
+
+
+_loop_thread = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop_thread() -> EventLoopThread:
+    """Общий на всё приложение фоновый event loop"""
+    global _loop_thread
+    with _loop_lock:
+        if _loop_thread is None or not _loop_thread.thread.is_alive():
+            _loop_thread = EventLoopThread()
+        return _loop_thread
@@ -1,11 +1,95 @@
-import requests
-import json as json_lib
+import asyncio
+import aiohttp
+import time
+from contextlib import aclosing
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from config import Config
+from api.event_loop import get_event_loop_thread
+from api.sse import SSEParser, json_loads
+from api.cancellation import CancelToken, GenerationCancelled, cancellable
+
+
+class APIError(Exception):
+    """Ошибка запроса: message готов для показа пользователю"""
+
+    STATUS_MESSAGES = {
+        401: "🔑 Ошибка: Неверный API ключ",
+        403: "🚫 Ошибка: Модель недоступна",
+        404: "❌ Ошибка: Модель не найдена. Выберите другую в настройках.",
+        429: "⚡ Rate limit. Подождите минуту."
+    }
+
+    def __init__(self, message: str, status: int = None,
+                 retry_after: float = None, retryable: bool = False,
+                 kind: str = "error"):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.retry_after = retry_after
+        self.retryable = retryable
+        # Класс ошибки для телеметрии: rate_limit, unavailable, timeout, ...
+        self.kind = kind
+
+    @staticmethod
+    def kind_for_status(status: int) -> str:
+        if status == 401:
+            return "auth"
+        if status in (403, 404):
+            return "unavailable"
+        if status == 408:
+            return "timeout"
+        if status == 429:
+            return "rate_limit"
+        if status >= 500:
+            return "server"
+        return "bad_request"
+
+    @classmethod
+    def from_status(cls, status: int, retry_after_header: str = None) -> "APIError":
+        message = cls.STATUS_MESSAGES.get(status, f"❌ Ошибка сервера: {status}")
+        # Модель недоступна/перегружена — есть смысл спросить другую
+        retryable = status in (403, 404, 408, 429) or status >= 500
+        return cls(message, status, parse_retry_after(retry_after_header), retryable,
+                   cls.kind_for_status(status))
+
+    @classmethod
+    def from_event(cls, error) -> "APIError":
+        """Ошибка, пришедшая событием внутри стрима"""
+        if not isinstance(error, dict):
+            return cls(f"❌ {error}", kind="stream")
+        status = error.get("code") if isinstance(error.get("code"), int) else None
+        retryable = status is None or status in (408, 429) or status >= 500
+        kind = cls.kind_for_status(status) if status else "stream"
+        return cls(f"❌ {error.get('message', 'Unknown error')}", status,
+                   retryable=retryable, kind=kind)
+
+
+def parse_retry_after(value: str):
+    """Retry-After: секунды или HTTP-дата -> секунды ожидания"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
 
 
 class OpenRouterAPI:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, api_url: str = Config.API_URL,
+                 pool_size: int = Config.HTTP_POOL_SIZE, keep_alive: bool = True,
+                 telemetry=None):
         self.api_key = api_key
+        self.api_url = api_url
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
         self.headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json",
@@ -13,13 +97,136 @@ class OpenRouterAPI:
             "X-Title": Config.APP_NAME
         }
 
+        # Сессия создаётся лениво внутри event loop
+        self.loop_thread = get_event_loop_thread()
+        self.session = None
+
+        # Замеры каждого вызова (TTFT, токены/с, ошибки) — см. api/telemetry.py
+        self.telemetry = telemetry
+
+        # Метрики переиспользования соединений
+        self.opened_count = 0
+        self.reused_count = 0
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Долгоживущая сессия: TCP+TLS рукопожатие только на первый запрос"""
+        if self.session is None or self.session.closed:
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_create_end.append(self._on_connection_opened)
+            trace.on_connection_reuseconn.append(self._on_connection_reused)
+
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                force_close=not self.keep_alive
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(
+                    total=None,
+                    sock_connect=Config.HTTP_TIMEOUT,
+                    sock_read=Config.HTTP_TIMEOUT
+                ),
+                trace_configs=[trace]
+            )
+        return self.session
+
+    async def _on_connection_opened(self, session, ctx, params):
+        self.opened_count += 1
+
+    async def _on_connection_reused(self, session, ctx, params):
+        self.reused_count += 1
+
+    def connection_stats(self) -> dict:
+        """Сколько запросов ушло по новым и по переиспользованным соединениям"""
+        return {
+            "requests": self.opened_count + self.reused_count,
+            "opened": self.opened_count,
+            "reused": self.reused_count
+        }
+
+    async def aclose(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    def close(self):
+        if self.loop_thread.loop.is_running():
+            self.loop_thread.submit(self.aclose()).result(timeout=5)
+
     def chat_stream(self, messages: list, model: str,
-                    max_tokens: int = 2048, temperature: float = 0.7):
-        """Стриминг ответа"""
+                    max_tokens: int = 2048, temperature: float = 0.7,
+                    cancel_token: CancelToken = None):
+        """Стриминг ответа (синхронная обёртка над achat_stream)"""
+        yield from self.loop_thread.iterate(
+            self.achat_stream(messages, model, max_tokens, temperature, cancel_token)
+        )
+
+    async def achat_stream(self, messages: list, model: str,
+                           max_tokens: int = 2048, temperature: float = 0.7,
+                           cancel_token: CancelToken = None):
+        """Асинхронный стриминг ответа (ошибки приходят текстом в потоке)"""
+        started = False
+        try:
+            async for content in self.astream_deltas(
+                    messages, model, max_tokens, temperature, cancel_token):
+                started = True
+                yield content
+        except APIError as e:
+            yield f"\n{e.message}" if started else e.message
+
+    async def astream_deltas(self, messages: list, model: str,
+                             max_tokens: int = 2048, temperature: float = 0.7,
+                             cancel_token: CancelToken = None):
+        """Асинхронный стриминг ответа; ошибки поднимаются как APIError"""
+        token = cancel_token or CancelToken()
+        usage = {}
+        started_at = time.perf_counter()
+        first_token_at = None
+        deltas = 0
+        error_kind = None
+
+        try:
+            async with aclosing(self._astream(
+                    messages, model, max_tokens, temperature, token, usage)) as stream:
+                async for content in stream:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    deltas += 1
+                    yield content
+        except APIError as e:
+            error_kind = e.kind
+            raise
+        except GeneratorExit:
+            error_kind = "cancelled"
+            raise
+        finally:
+            if error_kind is None and token.cancelled:
+                error_kind = "cancelled"
+            if self.telemetry is not None:
+                self.telemetry.record(
+                    model,
+                    started_at,
+                    first_token_at,
+                    time.perf_counter(),
+                    usage.get("completion_tokens") or deltas,
+                    error_kind
+                )
+
+    @staticmethod
+    async def _events(response):
+        """Payload'ы событий SSE из тела ответа, включая последнее без пустой строки"""
+        parser = SSEParser()
+        async for raw in response.content.iter_any():
+            for data in parser.feed(raw):
+                yield data
+        for data in parser.flush():
+            yield data
+
+    async def _astream(self, messages: list, model: str, max_tokens: int,
+                       temperature: float, token: CancelToken, usage: dict):
 
         if not messages:
-            yield "⚠️ Ошибка: пустой список сообщений"
-            return
+            raise APIError("⚠️ Ошибка: пустой список сообщений", kind="bad_request")
 
         payload = {
             "model": model,
@@ -32,66 +239,68 @@ class OpenRouterAPI:
         print(f"[API] Model: {model}")
         print(f"[API] Messages count: {len(messages)}")
 
+        remove_callback = None
+
         try:
-            response = requests.post(
-                Config.API_URL,
-                headers=self.headers,
-                json=payload,
-                stream=True,
-                timeout=120
+            session = await self._get_session()
+            response = await cancellable(session.post(self.api_url, json=payload), token)
+
+            # Отмена закрывает ответ: чтение обрывается, слот пула освобождается
+            loop = asyncio.get_running_loop()
+            remove_callback = token.add_callback(
+                lambda: loop.call_soon_threadsafe(response.close)
             )
 
-            print(f"[API] Status: {response.status_code}")
-
-            if response.status_code == 401:
-                yield "🔑 Ошибка: Неверный API ключ"
-                return
-            elif response.status_code == 403:
-                yield "🚫 Ошибка: Модель недоступна"
-                return
-            elif response.status_code == 404:
-                yield "❌ Ошибка: Модель не найдена. Выберите другую в настройках."
-                return
-            elif response.status_code == 429:
-                yield "⚡ Rate limit. Подождите минуту."
-                return
-            elif response.status_code >= 400:
-                yield f"❌ Ошибка сервера: {response.status_code}"
-                return
-
-            collected = ""
-
-            for line in response.iter_lines():
-                if line:
-                    line = line.decode("utf-8")
-                    if line.startswith("data: "):
-                        data = line[6:]
-                        if data == "[DONE]":
-                            break
-                        try:
-                            chunk = json_lib.loads(data)
-
-                            if "error" in chunk:
-                                error_msg = chunk["error"].get("message", "Unknown error")
-                                yield f"\n❌ {error_msg}"
-                                return
-
-                            choices = chunk.get("choices", [])
-                            if choices:
-                                delta = choices[0].get("delta", {})
-                                content = delta.get("content", "")
-                                if content:
-                                    collected += content
-                                    yield content
-                        except:
-                            continue
-
-            if not collected.strip():
-                yield "⚠️ Модель не вернула ответ"
-
-        except requests.exceptions.Timeout:
-            yield "⏱️ Timeout"
-        except requests.exceptions.ConnectionError:
-            yield "🌐 Нет интернета"
+            async with response:
+                print(f"[API] Status: {response.status}")
+
+                if response.status >= 400:
+                    # Тело ошибки дочитываем, чтобы соединение осталось в пуле
+                    await response.read()
+                    raise APIError.from_status(
+                        response.status, response.headers.get("Retry-After")
+                    )
+
+                parts = []
+
+                async for data in self._events(response):
+                    if token.cancelled:
+                        return
+                    if data == b"[DONE]":
+                        # Дочитываем тело до конца, чтобы соединение вернулось в пул
+                        continue
+                    try:
+                        chunk = json_loads(data)
+                    except ValueError:
+                        continue
+
+                    if "error" in chunk:
+                        raise APIError.from_event(chunk["error"])
+
+                    if chunk.get("usage"):
+                        usage.update(chunk["usage"])
+
+                    choices = chunk.get("choices")
+                    if choices:
+                        content = (choices[0].get("delta") or {}).get("content")
+                        if content:
+                            parts.append(content)
+                            yield content
+
+                if not any(part.strip() for part in parts):
+                    raise APIError("⚠️ Модель не вернула ответ", retryable=True, kind="empty")
+
+        except APIError:
+            raise
+        except GenerationCancelled:
+            return
+        except asyncio.TimeoutError:
+            raise APIError("⏱️ Timeout", retryable=True, kind="timeout") from None
+        except aiohttp.ClientConnectionError:
+            if not token.cancelled:
+                raise APIError("🌐 Нет интернета", kind="connection") from None
         except Exception as e:
-            yield f"❌ {str(e)}"
\ No newline at end of file
+            raise APIError(f"❌ {str(e)}", kind="exception") from e
+        finally:
+            if remove_callback:
+                remove_callback()
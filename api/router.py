@@ -0,0 +1,102 @@
+import asyncio
+import random
+import time
+from config import Config
+from api.openrouter import APIError
+from api.cancellation import CancelToken, GenerationCancelled, cancellable
+
+
+class ModelRouter:
+    """
+    Маршрутизация запроса по цепочке Config.FREE_MODELS.
+
+    Выбранная модель идёт первой. Если она ответила rate limit'ом,
+    недоступна или вернула пустой ответ до первого токена, модель уходит
+    на «остывание» (Retry-After или экспоненциальный backoff с джиттером),
+    а запрос прозрачно повторяется на следующей здоровой модели.
+    Состояние остывания общее для всех запросов через этот роутер.
+    С телеметрией запасные модели перебираются от самой быстрой.
+    """
+
+    def __init__(self, api, models: list = None, telemetry=None):
+        self.api = api
+        self.telemetry = telemetry
+        self.models = models or list(Config.FREE_MODELS.values())
+        self.cooldown_until = {}
+        self.failures = {}
+
+    def chain(self, preferred: str) -> list:
+        """Порядок обхода: выбранная модель, затем остальные; остывающие в конце"""
+        others = [m for m in self.models if m != preferred]
+        if self.telemetry is not None:
+            others = self.telemetry.rank(others)
+        chain = [preferred] + others
+        now = time.monotonic()
+        return sorted(chain, key=lambda m: max(self.cooldown_until.get(m, 0) - now, 0))
+
+    def backoff(self, model: str, error: APIError) -> float:
+        failures = self.failures.get(model, 0)
+        if error.status in (403, 404):
+            delay = Config.UNAVAILABLE_COOLDOWN
+        elif error.retry_after is not None:
+            delay = error.retry_after
+        else:
+            delay = min(Config.RETRY_BASE_DELAY * 2 ** failures, Config.RETRY_MAX_DELAY)
+        return delay * random.uniform(1.0, 1.0 + Config.RETRY_JITTER)
+
+    def mark_failed(self, model: str, error: APIError):
+        self.cooldown_until[model] = time.monotonic() + self.backoff(model, error)
+        self.failures[model] = self.failures.get(model, 0) + 1
+
+    def mark_healthy(self, model: str):
+        self.cooldown_until.pop(model, None)
+        self.failures.pop(model, None)
+
+    async def astream(self, messages: list, preferred: str,
+                      max_tokens: int = 2048, temperature: float = 0.7,
+                      cancel_token: CancelToken = None, route: dict = None,
+                      fit=None):
+        """
+        Стриминг с переключением моделей. В route записывается модель,
+        которая реально ответила, и число попыток. fit(model) — если
+        задан — собирает сообщения под контекстное окно каждой модели.
+        """
+        token = cancel_token or CancelToken()
+        route = route if route is not None else {}
+        last_error = None
+        if self.telemetry is not None:
+            # Один раз на запрос и вне event loop; chain() дальше берёт кэш
+            await self.telemetry.refresh(self.models)
+
+        for attempt in range(1, Config.FAILOVER_MAX_ATTEMPTS + 1):
+            model = self.chain(preferred)[0]
+            wait = self.cooldown_until.get(model, 0) - time.monotonic()
+            if wait > Config.FAILOVER_MAX_WAIT:
+                break
+            if wait > 0:
+                print(f"[ROUTER] Все модели остывают, ждём {wait:.1f} с")
+                try:
+                    await cancellable(asyncio.sleep(wait), token)
+                except GenerationCancelled:
+                    return
+
+            route["model"] = model
+            route["attempts"] = attempt
+            started = False
+            try:
+                attempt_messages = fit(model) if fit else messages
+                async for content in self.api.astream_deltas(
+                        attempt_messages, model, max_tokens, temperature, token):
+                    started = True
+                    yield content
+                self.mark_healthy(model)
+                return
+            except APIError as e:
+                # После первого токена менять модель уже поздно
+                if started or not e.retryable:
+                    raise
+                self.mark_failed(model, e)
+                last_error = e
+                print(f"[ROUTER] {model}: {e.message} -> следующая модель")
+
+        raise last_error or APIError("⚡ Все модели временно недоступны", retryable=True)
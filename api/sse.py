@@ -0,0 +1,78 @@
+import json
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    def json_loads(data: bytes):
+        return json.loads(data.decode("utf-8"))
+
+
+class SSEParser:
+    """
+    Инкрементальный разбор text/event-stream прямо по сырым байтам.
+
+    Куски из сети скармливаются в feed() как есть — границы строк и
+    событий могут приходить где угодно. Возвращаются payload'ы готовых
+    событий (bytes): несколько строк `data:` одного события склеиваются
+    через \\n, комментарии (`: keep-alive`) и прочие поля пропускаются.
+    Строки не декодируются в str — байты уходят прямо в JSON-парсер.
+    Концы строк — \\n, \\r\\n или одиночный \\r, как в спецификации.
+    """
+
+    def __init__(self):
+        # Куски незавершённой строки склеиваются один раз, когда придёт
+        # её конец, — длинное событие из мелких кусков не копируется заново
+        self._tail = []
+        self._data = []
+        self._after_cr = False
+
+    def feed(self, chunk: bytes) -> list:
+        if self._after_cr:
+            # \r\n, разрезанный между кусками, — один конец строки
+            self._after_cr = False
+            if chunk.startswith(b"\n"):
+                chunk = chunk[1:]
+
+        # Разбираем только завершённые строки, хвост ждёт следующего куска
+        end = max(chunk.rfind(b"\n"), chunk.rfind(b"\r"))
+        if end < 0:
+            if chunk:
+                self._tail.append(chunk)
+            return []
+        if self._tail:
+            self._tail.append(chunk[:end + 1])
+            buffer = b"".join(self._tail)
+            self._tail.clear()
+        else:
+            buffer = chunk[:end + 1]
+        if end + 1 < len(chunk):
+            self._tail.append(chunk[end + 1:])
+        else:
+            self._after_cr = chunk.endswith(b"\r")
+
+        events = []
+        data = self._data
+        for line in buffer.splitlines():
+            if not line:
+                # Пустая строка завершает событие
+                if data:
+                    events.append(self._dispatch())
+            elif line.startswith(b"data:"):
+                data.append(line[6:] if line.startswith(b"data: ") else line[5:])
+            # Комментарии (":") и поля event/id/retry клиенту не нужны
+
+        return events
+
+    def flush(self) -> list:
+        """Отдать событие, не закрытое пустой строкой к концу потока"""
+        events = self.feed(b"\n") if self._tail else []
+        if self._data:
+            events.append(self._dispatch())
+        return events
+
+    def _dispatch(self) -> bytes:
+        data = self._data
+        event = data[0] if len(data) == 1 else b"\n".join(data)
+        data.clear()
+        return event
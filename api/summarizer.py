@@ -0,0 +1,97 @@
+import asyncio
+from config import Config
+from api.openrouter import APIError
+from api.event_loop import get_event_loop_thread
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an "
+    "assistant. Update the summary with the new turns below. Keep facts, "
+    "decisions, names, numbers and open questions; drop small talk. Write in "
+    "the language of the conversation, at most a few paragraphs. Reply with "
+    "the updated summary only."
+)
+
+
+class ConversationSummarizer:
+    """
+    Фоновое сворачивание старых реплик в накопительное резюме чата.
+
+    Когда за пределами последних SUMMARY_KEEP_RECENT сообщений накопилось
+    SUMMARY_BATCH ещё не свёрнутых, дешёвая модель получает прежнее
+    резюме и только эти новые реплики — резюме достраивается, а не
+    пересчитывается с нуля. Работает в общем event loop; базу читает
+    в потоке-исполнителе, и только ещё не свёрнутые сообщения.
+    _tasks трогается только из потока event loop.
+    """
+
+    def __init__(self, api, db, model: str = Config.SUMMARY_MODEL):
+        self.api = api
+        self.db = db
+        self.model = model
+        self.loop = get_event_loop_thread().loop
+        self._tasks = {}
+
+    @staticmethod
+    def pending(messages: list, summary: dict = None) -> list:
+        """Старые сообщения, ещё не попавшие в резюме"""
+        covered_until = summary["covered_until"] if summary else 0
+        older = messages[:-Config.SUMMARY_KEEP_RECENT] if Config.SUMMARY_KEEP_RECENT else messages
+        return [m for m in older if m["id"] > covered_until]
+
+    def schedule(self, chat_id: int):
+        """Запустить свёртку, если пора (вызывать из event loop)"""
+        if chat_id in self._tasks:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(chat_id))
+        self._tasks[chat_id] = task
+        task.add_done_callback(lambda t: self._forget(chat_id, t))
+
+    def _forget(self, chat_id: int, task):
+        # Отменённая задача не должна снять уже запущенную следом новую
+        if self._tasks.get(chat_id) is task:
+            del self._tasks[chat_id]
+
+    def _pending_batch(self, chat_id: int) -> tuple:
+        """Резюме и ещё не свёрнутые старые сообщения (вне event loop)"""
+        summary = self.db.get_summary(chat_id)
+        covered_until = summary["covered_until"] if summary else 0
+        return summary, self.pending(self.db.get_messages_after(chat_id, covered_until), summary)
+
+    async def _run(self, chat_id: int):
+        summary, batch = await asyncio.to_thread(self._pending_batch, chat_id)
+        if len(batch) < Config.SUMMARY_BATCH:
+            return
+        await self._summarize(chat_id, summary, batch)
+
+    async def _summarize(self, chat_id: int, summary: dict, batch: list):
+        turns = "\n\n".join(f"{m['role'].upper()}: {m['content']}" for m in batch)
+        previous = summary["summary"] if summary else "(empty)"
+        prompt = [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": f"Current summary:\n{previous}\n\nNew turns:\n{turns}"}
+        ]
+
+        parts = []
+        try:
+            async for content in self.api.astream_deltas(
+                    prompt, self.model, Config.SUMMARY_MAX_TOKENS, 0.2):
+                parts.append(content)
+        except APIError as e:
+            print(f"[SUMMARY] Чат {chat_id}: резюме не обновлено ({e.message})")
+            return
+
+        text = "".join(parts).strip()
+        if not text:
+            return
+        saved = self.db.save_summary(chat_id, text, batch[-1]["id"])
+        if await asyncio.wrap_future(saved):
+            print(f"[SUMMARY] Чат {chat_id}: свёрнуто {len(batch)} сообщений")
+
+    def cancel(self, chat_id: int):
+        """Отменить свёртку чата (из любого потока)"""
+        self.loop.call_soon_threadsafe(self._cancel, chat_id)
+
+    def _cancel(self, chat_id: int):
+        task = self._tasks.pop(chat_id, None)
+        if task:
+            task.cancel()
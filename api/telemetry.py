@@ -0,0 +1,100 @@
+import asyncio
+import time
+from statistics import median
+from config import Config
+
+
+class Telemetry:
+    """
+    Замеры вызовов OpenRouterAPI по моделям: время до первого токена,
+    токены в секунду, длительность и класс ошибки. Хранятся скользящим
+    окном в таблице model_stats; по ним работает режим «Авто».
+
+    rank() берёт сводки из кэша: refresh() перечитывает устаревшие в
+    потоке-исполнителе, так что event loop не ждёт базу.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._summaries = {}
+        self._loaded_at = {}
+
+    def record(self, model: str, started_at: float, first_token_at: float,
+               finished_at: float, tokens: int, error: str = None):
+        ttft = first_token_at - started_at if first_token_at is not None else None
+        generation = finished_at - first_token_at if first_token_at is not None else 0
+        tokens_per_sec = tokens / generation if generation > 0 else None
+
+        try:
+            self.db.add_model_stat(
+                model, ttft, finished_at - started_at, tokens, tokens_per_sec, error
+            )
+        except Exception as e:
+            # Телеметрия не должна ломать ответ
+            print(f"[TELEMETRY] Не удалось записать замер: {e}")
+
+        ttft_text = f"{ttft * 1000:.0f} ms" if ttft is not None else "—"
+        print(f"[TELEMETRY] {model}: TTFT {ttft_text}, {tokens} tok, "
+              f"{finished_at - started_at:.2f} s, error={error}")
+
+    def summary(self, model: str) -> dict:
+        """Скользящая статистика модели"""
+        samples = self.db.get_model_stats(model)
+        # Остановленная пользователем генерация — не вина модели
+        ok = [s for s in samples if s["error"] in (None, "cancelled")]
+        ttfts = sorted(s["ttft"] for s in ok if s["ttft"] is not None)
+        speeds = [s["tokens_per_sec"] for s in ok if s["tokens_per_sec"]]
+        errors = {}
+        for s in samples:
+            if s["error"] and s["error"] != "cancelled":
+                errors[s["error"]] = errors.get(s["error"], 0) + 1
+
+        return {
+            "samples": len(samples),
+            "ttft_p50": median(ttfts) if ttfts else None,
+            "ttft_p95": ttfts[min(int(len(ttfts) * 0.95), len(ttfts) - 1)] if ttfts else None,
+            "tokens_per_sec": median(speeds) if speeds else None,
+            "duration_avg": sum(s["duration"] for s in ok) / len(ok) if ok else None,
+            "error_rate": (len(samples) - len(ok)) / len(samples) if samples else 0.0,
+            "errors": errors
+        }
+
+    def _load(self, models: list):
+        for model in models:
+            self._summaries[model] = self.summary(model)
+            self._loaded_at[model] = time.monotonic()
+
+    async def refresh(self, models: list):
+        """Перечитать сводки старше TELEMETRY_CACHE_TTL (вызывать из event loop)"""
+        now = time.monotonic()
+        stale = [m for m in models
+                 if now - self._loaded_at.get(m, -Config.TELEMETRY_CACHE_TTL) >= Config.TELEMETRY_CACHE_TTL]
+        if stale:
+            await asyncio.to_thread(self._load, stale)
+
+    def rank(self, models: list) -> list:
+        """
+        Модели от самой быстрой к самой медленной по p50 TTFT.
+        Модели без достаточного числа замеров идут первыми — их нужно
+        попробовать; модели без единого успешного ответа — последними.
+        Сводки — из кэша; в базу идут только модели, которых в нём нет.
+        """
+        missing = [m for m in models if m not in self._summaries]
+        if missing:
+            self._load(missing)
+        summaries = {m: self._summaries[m] for m in models}
+
+        def key(model):
+            stats = summaries[model]
+            if stats["samples"] < Config.TELEMETRY_MIN_SAMPLES:
+                return (0, 0.0)
+            if stats["ttft_p50"] is None:
+                return (2, 0.0)
+            return (1, stats["ttft_p50"])
+
+        return sorted(models, key=key)
+
+    async def fastest_model(self, models: list = None) -> str:
+        models = models or list(Config.FREE_MODELS.values())
+        await self.refresh(models)
+        return self.rank(models)[0]
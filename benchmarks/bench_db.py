@@ -0,0 +1,142 @@
+"""
+Бенчмарк запросов к базе чатов до и после миграций (индексы + WAL).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_db
+    python -m benchmarks.bench_db --chats 1000 --messages 100000
+
+Во временном файле создаётся база в исходной схеме (миграция 1,
+настройки SQLite по умолчанию) и заполняется сообщениями, перемешанными
+между чатами, как в живой базе. Сначала замеряются прежние запросы
+get_messages (ORDER BY timestamp) и get_all_chats, затем база открывается
+через DatabaseManager — он применяет остальные миграции и PRAGMA —
+и те же замеры повторяются.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from database.db_manager import DatabaseManager
+from database.migrations import migrate
+
+WORDS = ["привет", "модель", "ответ", "token", "stream", "база", "запрос",
+         "python", "данные", "chat", "индекс", "быстро", "context", "sqlite"]
+
+
+def seed(path: str, chats: int, messages: int):
+    conn = sqlite3.connect(path)
+    migrate(conn, target=1)
+
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+
+    conn.executemany(
+        "INSERT INTO chats (id, title, created_at, updated_at, model) VALUES (?, ?, ?, ?, ?)",
+        ((i, f"Чат {i}", start, start + timedelta(minutes=rng.randrange(500000)),
+          "mistralai/mistral-7b-instruct:free")
+         for i in range(1, chats + 1))
+    )
+
+    def rows():
+        for i in range(messages):
+            content = " ".join(rng.choices(WORDS, k=rng.randint(5, 60)))
+            yield (rng.randint(1, chats), "user" if i % 2 else "assistant", content,
+                   start + timedelta(seconds=i), len(content) // 4)
+
+    conn.executemany(
+        "INSERT INTO messages (chat_id, role, content, timestamp, tokens) VALUES (?, ?, ?, ?, ?)",
+        rows()
+    )
+    conn.commit()
+    conn.close()
+
+
+def measure(fn, args_list: list) -> dict:
+    # Прогрев: первые обращения читают страницы с диска
+    for args in args_list[:10]:
+        fn(*args)
+
+    times = []
+    for args in args_list:
+        started = time.perf_counter()
+        fn(*args)
+        times.append((time.perf_counter() - started) * 1000)
+
+    times.sort()
+    return {"p50": statistics.median(times),
+            "p95": times[int(len(times) * 0.95) - 1],
+            "total": sum(times)}
+
+
+def run_before(path: str, chat_ids: list, list_runs: int) -> dict:
+    conn = sqlite3.connect(path)
+
+    def get_messages(chat_id):
+        return conn.execute("""
+            SELECT id, role, content, timestamp, model, tokens
+            FROM messages WHERE chat_id = ? ORDER BY timestamp
+        """, (chat_id,)).fetchall()
+
+    def get_all_chats():
+        return conn.execute("""
+            SELECT id, title, created_at, updated_at, model
+            FROM chats ORDER BY updated_at DESC
+        """).fetchall()
+
+    result = {
+        "get_messages": measure(get_messages, [(c,) for c in chat_ids]),
+        "get_all_chats": measure(get_all_chats, [()] * list_runs),
+    }
+    conn.close()
+    return result
+
+
+def run_after(path: str, chat_ids: list, list_runs: int) -> dict:
+    db = DatabaseManager(path)
+    result = {
+        "get_messages": measure(db.get_messages, [(c,) for c in chat_ids]),
+        "get_all_chats": measure(db.get_all_chats, [()] * list_runs),
+    }
+    db.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chats", type=int, default=10_000)
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200, help="вызовов get_messages")
+    parser.add_argument("--list-runs", type=int, default=50, help="вызовов get_all_chats")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+
+        started = time.perf_counter()
+        seed(path, args.chats, args.messages)
+        print(f"Заполнено: {args.messages} сообщений в {args.chats} чатах "
+              f"за {time.perf_counter() - started:.1f} с")
+
+        rng = random.Random(7)
+        chat_ids = [rng.randint(1, args.chats) for _ in range(args.queries)]
+
+        before = run_before(path, chat_ids, args.list_runs)
+        started = time.perf_counter()
+        after = run_after(path, chat_ids, args.list_runs)
+        print(f"Миграции + замеры после: {time.perf_counter() - started:.1f} с\n")
+
+    print(f"{'запрос':<16}{'':>8}{'p50, мс':>10}{'p95, мс':>10}")
+    for name in ("get_messages", "get_all_chats"):
+        for label, result in (("до", before), ("после", after)):
+            r = result[name]
+            print(f"{name:<16}{label:>8}{r['p50']:>10.2f}{r['p95']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
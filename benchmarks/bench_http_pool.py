@@ -0,0 +1,51 @@
+"""
+Бенчмарк: время до первого токена с пулом соединений и без него.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_http_pool --requests 50 --handshake-ms 40
+
+--handshake-ms эмулирует стоимость TCP+TLS рукопожатия до удалённого API,
+которой на loopback-интерфейсе нет.
+"""
+
+import argparse
+import statistics
+import time
+
+from api.openrouter import OpenRouterAPI
+from benchmarks.sse_stub import SSEStubServer
+
+MESSAGES = [{"role": "user", "content": "ping"}]
+
+
+def run(api: OpenRouterAPI, count: int) -> list:
+    ttft = []
+    for _ in range(count):
+        start = time.perf_counter()
+        first = None
+        for _chunk in api.chat_stream(MESSAGES, "stub/model"):
+            if first is None:
+                first = time.perf_counter() - start
+        ttft.append(first * 1000)
+    return ttft
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--handshake-ms", type=float, default=40.0)
+    args = parser.parse_args()
+
+    with SSEStubServer(handshake_ms=args.handshake_ms) as url:
+        for title, keep_alive in (("без keep-alive", False), ("пул сессии", True)):
+            api = OpenRouterAPI("sk-bench", api_url=url, keep_alive=keep_alive)
+            ttft = run(api, args.requests)
+            stats = api.connection_stats()
+            api.close()
+            print(f"{title:>16}: TTFT p50 {statistics.median(ttft):7.2f} ms, "
+                  f"max {max(ttft):7.2f} ms | "
+                  f"opened {stats['opened']}, reused {stats['reused']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Микробенчмарк разбора SSE-потока: старый построчный цикл против SSEParser.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_sse_parser --chunks 10000
+    python -m benchmarks.bench_sse_parser --file dump.sse
+
+Без --file поток генерируется детерминированно в формате OpenRouter
+(с keep-alive комментариями) и режется на куски случайной длины, как
+их отдаёт iter_any(). --file принимает сырой дамп тела ответа.
+"""
+
+import argparse
+import json
+import random
+import time
+
+from api import sse
+from api.sse import SSEParser
+
+
+def record_stream(chunks: int) -> bytes:
+    rng = random.Random(42)
+    words = ["the", "model", "token", "stream", "привет", "данные", "fast", "json"]
+    out = [b": OPENROUTER PROCESSING\n\n"]
+    for i in range(chunks):
+        event = {
+            "id": "gen-1700000000-abcdef",
+            "provider": "Mistral",
+            "model": "mistralai/mistral-7b-instruct:free",
+            "object": "chat.completion.chunk",
+            "created": 1700000000,
+            "choices": [{"index": 0, "delta": {"role": "assistant",
+                                               "content": rng.choice(words) + " "},
+                         "finish_reason": None}]
+        }
+        out.append(b"data: " + json.dumps(event, ensure_ascii=False).encode() + b"\n\n")
+        if i % 500 == 0:
+            out.append(b": OPENROUTER PROCESSING\n\n")
+    out.append(b"data: [DONE]\n\n")
+    return b"".join(out)
+
+
+def split_network(raw: bytes) -> list:
+    rng = random.Random(7)
+    pieces, pos = [], 0
+    while pos < len(raw):
+        size = rng.randint(1, 1500)
+        pieces.append(raw[pos:pos + size])
+        pos += size
+    return pieces
+
+
+def legacy(pieces: list) -> str:
+    """Прежний цикл: decode каждой строки, startswith, json.loads, +="""
+    collected = ""
+    pending = b""
+    for piece in pieces:
+        pending += piece
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line:
+                line = line.decode("utf-8")
+                if line.startswith("data: "):
+                    data = line[6:]
+                    if data == "[DONE]":
+                        continue
+                    try:
+                        chunk = json.loads(data)
+                        content = chunk["choices"][0]["delta"].get("content", "")
+                        if content:
+                            collected += content
+                    except ValueError:
+                        continue
+    return collected
+
+
+def incremental(pieces: list, loads) -> str:
+    parser = SSEParser()
+    parts = []
+    for piece in pieces:
+        for data in parser.feed(piece):
+            if data == b"[DONE]":
+                continue
+            content = loads(data)["choices"][0]["delta"].get("content")
+            if content:
+                parts.append(content)
+    return "".join(parts)
+
+
+def bench(title: str, fn, pieces: list, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(pieces)
+        best = min(best, time.perf_counter() - start)
+    print(f"{title:>24}: {best * 1000:8.2f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--file")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, "rb") as f:
+            raw = f.read()
+    else:
+        raw = record_stream(args.chunks)
+    pieces = split_network(raw)
+    print(f"Поток: {len(raw) / 1024:.0f} KiB, {len(pieces)} сетевых кусков")
+
+    expected = bench("построчно + json + +=", legacy, pieces, args.repeat)
+    got = bench("SSEParser + json", lambda p: incremental(p, lambda d: json.loads(d.decode())),
+                pieces, args.repeat)
+    assert got == expected
+    if sse.json_loads.__module__ == "orjson":
+        got = bench("SSEParser + orjson", lambda p: incremental(p, sse.json_loads),
+                    pieces, args.repeat)
+        assert got == expected
+
+
+if __name__ == "__main__":
+    main()
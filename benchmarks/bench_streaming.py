@@ -0,0 +1,152 @@
+"""
+Бенчмарк отрисовки стриминга: занятость главного потока Tk.
+
+Сравниваются прежняя схема (after(0) на каждый кусок + label.configure
+с полным текстом + прокрутка) и StreamRenderer (не больше fps кадров,
+в Text дописывается только новый текст). Поток-генератор отдаёт токены
+с заданной скоростью, как сеть; в главном потоке меряется процессорное
+время (time.thread_time) от первого токена до финальной отрисовки.
+
+Нужен дисплей (Tk). Запуск из корня проекта:
+    python -m benchmarks.bench_streaming --tokens 20000 --rate 2000
+    python -m benchmarks.bench_streaming --mode renderer --fps 60
+"""
+
+import argparse
+import random
+import threading
+import time
+
+import customtkinter as ctk
+
+from ui.message_list import MessageList
+from ui.streaming import StreamRenderer
+
+COLORS = {
+    "user_bubble": "#6366f1",
+    "user_bubble_dark": "#4f46e5",
+    "ai_bubble": "#1e1e2e",
+    "ai_bubble_light": "#f1f5f9",
+}
+
+
+def make_tokens(count: int) -> list:
+    rng = random.Random(42)
+    words = ["the", "model", "token", "stream", "привет", "данные", "fast", "json", "renderer"]
+    tokens = []
+    for i in range(count):
+        token = rng.choice(words) + " "
+        if i % 120 == 119:
+            token += "\n\n"
+        tokens.append(token)
+    return tokens
+
+
+def produce(tokens: list, rate: int, push, finish):
+    """Отдавать токены пачками по 10 с частотой rate токенов в секунду"""
+    started = time.perf_counter()
+    for i in range(0, len(tokens), 10):
+        for token in tokens[i:i + 10]:
+            push(token)
+        delay = started + (i + 10) / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    finish("".join(tokens))
+
+
+def run_legacy(root, tokens: list, rate: int, done) -> int:
+    """Как было: полный текст в label на каждый кусок"""
+    frame = ctk.CTkScrollableFrame(root)
+    frame.pack(fill="both", expand=True)
+    label = ctk.CTkLabel(frame, text="▌", wraplength=450, justify="left",
+                         font=ctk.CTkFont(family="Segoe UI", size=14))
+    label.pack(anchor="w")
+    canvas = frame._parent_canvas
+    updates = [0]
+    collected = {"text": ""}
+
+    def update(text):
+        updates[0] += 1
+        label.configure(text=text + " ▌")
+        canvas.yview_moveto(1.0)
+
+    def final(text):
+        label.configure(text=text)
+        done()
+
+    def push(token):
+        collected["text"] += token
+        root.after(0, lambda t=collected["text"]: update(t))
+
+    threading.Thread(
+        target=produce, daemon=True,
+        args=(tokens, rate, push, lambda text: root.after(0, lambda: final(text)))
+    ).start()
+    return updates
+
+
+def run_renderer(root, tokens: list, rate: int, fps: int, done):
+    """Как стало: MessageList + StreamRenderer"""
+    message_list = MessageList(root, COLORS, fg_color=("gray98", "#0f0f1a"))
+    message_list.pack(fill="both", expand=True)
+    item = message_list.append("assistant", "", streaming=True)
+
+    renderer = StreamRenderer(root, fps=fps)
+
+    def final(text):
+        message_list.set_text(item, text, streaming=False)
+        done()
+
+    renderer.attach(lambda delta: message_list.append_text(item, delta), final)
+    threading.Thread(
+        target=produce, daemon=True, args=(tokens, rate, renderer.push, renderer.finish)
+    ).start()
+    return renderer
+
+
+def bench(mode: str, tokens: list, rate: int, fps: int):
+    root = ctk.CTk()
+    root.geometry("900x700")
+    root.update()
+
+    result = {}
+
+    def done():
+        root.update_idletasks()
+        result["busy"] = time.thread_time() - busy_start
+        result["wall"] = time.perf_counter() - wall_start
+        root.after(0, root.quit)
+
+    busy_start = time.thread_time()
+    wall_start = time.perf_counter()
+    if mode == "legacy":
+        updates = run_legacy(root, tokens, rate, done)
+    else:
+        renderer = run_renderer(root, tokens, rate, fps, done)
+    root.mainloop()
+
+    count = updates[0] if mode == "legacy" else renderer.frames
+    print(f"{mode:>9}: главный поток занят {result['busy'] * 1000:9.1f} мс "
+          f"за {result['wall']:5.1f} с ({result['busy'] / result['wall']:6.1%}), "
+          f"обновлений UI: {count}")
+    root.destroy()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--rate", type=int, default=2000, help="токенов в секунду")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--mode", choices=["legacy", "renderer", "both"], default="both")
+    args = parser.parse_args()
+
+    tokens = make_tokens(args.tokens)
+    print(f"Поток: {args.tokens} токенов, {len(''.join(tokens)) / 1024:.0f} KiB, "
+          f"{args.rate} ток/с")
+    modes = ["legacy", "renderer"] if args.mode == "both" else [args.mode]
+    for mode in modes:
+        bench(mode, tokens, args.rate, args.fps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Локальный SSE-сервер, имитирующий OpenRouter /chat/completions.
+
+Используется бенчмарками: отдаёт поток `data: {...}` событий через
+chunked transfer encoding и умеет эмулировать стоимость TCP+TLS
+рукопожатия задержкой на каждое новое соединение.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_chunk(content: str) -> bytes:
+    event = {"choices": [{"delta": {"content": content}}]}
+    return f"data: {json.dumps(event)}\n\n".encode("utf-8")
+
+
+class _SSEHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        # Новое соединение = "рукопожатие"
+        time.sleep(self.server.handshake_delay)
+        super().setup()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+
+        status = self.server.fail_models.get(payload.get("model"))
+        if status:
+            body = json.dumps({"error": {"code": status, "message": "stub"}}).encode()
+            self.send_response(status)
+            if status == 429:
+                self.send_header("Retry-After", "1")
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        try:
+            for i in range(self.server.chunks):
+                self._write_chunk(make_chunk(f"token{i} "))
+                if self.server.chunk_delay:
+                    self.wfile.flush()
+                    time.sleep(self.server.chunk_delay)
+            self._write_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Клиент оборвал стрим (отмена генерации)
+            self.close_connection = True
+
+
+class SSEStubServer:
+    """SSE-заглушка в фоновом потоке: `with SSEStubServer() as url: ...`"""
+
+    def __init__(self, chunks: int = 5, handshake_ms: float = 0.0,
+                 chunk_delay_ms: float = 0.0, fail_models: dict = None):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _SSEHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.chunks = chunks
+        self.httpd.handshake_delay = handshake_ms / 1000
+        self.httpd.chunk_delay = chunk_delay_ms / 1000
+        # model id -> HTTP-статус ошибки, которой отвечать
+        self.httpd.fail_models = fail_models or {}
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}/api/v1/chat/completions"
+
+    def __enter__(self) -> str:
+        self.thread.start()
+        return self.url
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -10,9 +10,40 @@ class Config:
     BASE_DIR = Path(__file__).parent
     DATA_DIR = BASE_DIR / "data"
     DB_PATH = DATA_DIR / "chats.db"
+    ARCHIVE_PATH = DATA_DIR / "archive.db"
+    ARCHIVE_BATCH = 20                  # чатов за одну транзакцию переноса
+    ARCHIVE_PAUSE = 0.1
+    IMPORT_BATCH = 500                  # чатов на одну транзакцию импорта
+    ORPHAN_SWEEP_BATCH = 5000
+    ORPHAN_SWEEP_PAUSE = 0.05
+    DB_CACHE_SIZE_KB = 20000            # кэш страниц SQLite
+    DB_MMAP_SIZE = 256 * 1024 * 1024    # чтение через mmap
+    DB_READ_POOL_SIZE = 4               # соединений только для чтения
+    DB_STATEMENT_CACHE = 64             # скомпилированных запросов на соединение
+    DB_WRITE_WINDOW = 0.005             # окно группового коммита, с
+    DB_WRITE_MAX_BATCH = 256            # записей в одной транзакции
+    MESSAGE_PAGE_SIZE = 50              # сообщений за одну подгрузку чата
+    CHAT_PAGE_SIZE = 100                # чатов за одну подгрузку списка
+    HISTORY_RENDER_BATCH = 10           # сообщений, дорисовываемых за один такт UI
+
+    # Длинные тексты: в blobs по хэшу, сжатые (zstd при наличии zstandard)
+    COMPRESS_MIN_BYTES = 1024
+    COMPRESS_LEVEL_ZLIB = 6
+    COMPRESS_LEVEL_ZSTD = 3
+    COMPACT_BATCH = 2000                # старых сообщений за одну транзакцию
+    COMPACT_PAUSE = 0.05
+
+    # Полнотекстовый поиск
+    SEARCH_RESULTS_LIMIT = 30
+    SEARCH_BACKFILL_BATCH = 2000        # сообщений за одну транзакцию индексации
+    SEARCH_BACKFILL_PAUSE = 0.05
 
     API_URL = "https://openrouter.ai/api/v1/chat/completions"
 
+    # Пул HTTP-соединений (keep-alive между запросами)
+    HTTP_POOL_SIZE = 4
+    HTTP_TIMEOUT = 120
+
     # ✅ Актуальные бесплатные модели (январь 2025)
     FREE_MODELS = {
         "Mistral 7B": "mistralai/mistral-7b-instruct:free",
@@ -22,13 +53,62 @@ class Config:
         "Zephyr 7B": "huggingfaceh4/zephyr-7b-beta:free",
     }
 
+    # Переключение на другие модели при rate limit / недоступности
+    FAILOVER_MAX_ATTEMPTS = 6
+    FAILOVER_MAX_WAIT = 20.0      # дольше ждать Retry-After не имеет смысла
+    RETRY_BASE_DELAY = 1.0
+    RETRY_MAX_DELAY = 60.0
+    RETRY_JITTER = 0.3
+    UNAVAILABLE_COOLDOWN = 300.0  # 403/404: модель выпадает из цепочки
+
+    # Телеметрия моделей и режим «Авто» (самая быстрая по p50 TTFT)
+    AUTO_MODEL = "auto"
+    TELEMETRY_WINDOW = 50         # сколько последних вызовов хранить на модель
+    TELEMETRY_MIN_SAMPLES = 3     # меньше замеров — модель сначала «пробуем»
+    TELEMETRY_CACHE_TTL = 10.0    # секунды: сводки для ранжирования перечитываются не чаще
+
+    # Кэш ответов: при температуре 0 всегда, иначе — если включён в настройках
+    CACHE_MAX_BYTES = 20 * 1024 * 1024
+    CACHE_MAX_AGE = 30 * 24 * 3600   # секунды
+
+    # Контекстное окно моделей (токены): история обрезается под лимит
+    DEFAULT_CONTEXT_LIMIT = 8192
+    MODEL_CONTEXT_LIMITS = {
+        "mistralai/mistral-7b-instruct:free": 32768,
+        "meta-llama/llama-3.2-3b-instruct:free": 131072,
+        "google/gemini-2.0-flash-exp:free": 1048576,
+        "meta-llama/llama-3.1-8b-instruct:free": 131072,
+        "huggingfaceh4/zephyr-7b-beta:free": 4096,
+    }
+    CONTEXT_SAFETY_MARGIN = 0.1   # доля лимита на погрешность оценки токенов
+
+    # Накопительное резюме длинных чатов (сворачивается в фоне дешёвой моделью)
+    SUMMARY_MODEL = "meta-llama/llama-3.2-3b-instruct:free"
+    SUMMARY_KEEP_RECENT = 8       # последние сообщения всегда идут как есть
+    SUMMARY_BATCH = 10            # сворачиваем, когда накопилось столько старых
+    SUMMARY_MAX_TOKENS = 512
+
+    # Режим сравнения: сколько моделей стримят одновременно
+    COMPARE_MAX_CONCURRENCY = 3
+
+    # Стриминг в UI: не больше кадров в секунду, куски между кадрами копятся
+    STREAM_FPS = 30
+
     DEFAULT_SETTINGS = {
         "api_key": "",
         "model": "mistralai/mistral-7b-instruct:free",
         "theme": "dark",
         "system_prompt": "You are a helpful assistant.",
         "max_tokens": 2048,
-        "temperature": 0.7
+        "temperature": 0.7,
+        "auto_failover": True,
+        "cache_responses": False,
+        "archive_after_days": 90,       # 0 — не архивировать
+        "compare_models": [
+            "mistralai/mistral-7b-instruct:free",
+            "meta-llama/llama-3.2-3b-instruct:free",
+            "google/gemini-2.0-flash-exp:free",
+        ]
     }
 
     SETTINGS_PATH = DATA_DIR / "settings.json"
@@ -0,0 +1,214 @@
+"""
+Холодное хранилище: чаты, которые давно не открывали, переезжают из
+chats.db в отдельный файл архива (ATTACH ... AS archive).
+
+Основной файл, его индексы и кэш страниц остаются размером с активную
+историю. В архиве та же схема, что и в основной базе (chats, messages,
+blobs, chat_summaries), плюс свой поиск FTS5 поверх message_texts —
+представления в подключённой базе ссылаются на её же таблицы.
+Триггеров в архиве нет: переносы явно поддерживают его поиск сами.
+Открытие архивного чата возвращает его в основную базу целиком.
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+from config import Config
+from database import blobs
+from database.background import BatchWorker
+
+CHAT_COLUMNS = ("id, title, created_at, updated_at, model, system_prompt, system_prompt_hash, "
+                "message_count, total_tokens, last_role, last_message_preview")
+MESSAGE_COLUMNS = "id, chat_id, role, content, content_hash, timestamp, model, tokens"
+SUMMARY_COLUMNS = "chat_id, summary, covered_until, updated_at"
+
+SCHEMA = [
+    """
+        CREATE TABLE IF NOT EXISTS archive.chats (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            created_at TIMESTAMP,
+            updated_at TIMESTAMP,
+            model TEXT,
+            system_prompt TEXT,
+            system_prompt_hash TEXT,
+            message_count INTEGER NOT NULL DEFAULT 0,
+            total_tokens INTEGER NOT NULL DEFAULT 0,
+            last_role TEXT,
+            last_message_preview TEXT,
+            archived_at TIMESTAMP
+        )
+    """,
+    # Страницы архива в сайдбаре: тот же порядок, что в get_chats_page
+    "DROP INDEX IF EXISTS archive.idx_chats_updated",
+    """
+        CREATE INDEX IF NOT EXISTS archive.idx_chats_page
+        ON chats (updated_at DESC, id DESC)
+    """,
+    """
+        CREATE TABLE IF NOT EXISTS archive.messages (
+            id INTEGER PRIMARY KEY,
+            chat_id INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            content_hash TEXT,
+            timestamp TIMESTAMP,
+            model TEXT,
+            tokens INTEGER
+        )
+    """,
+    """
+        CREATE INDEX IF NOT EXISTS archive.idx_messages_chat
+        ON messages (chat_id, id)
+    """,
+    """
+        CREATE TABLE IF NOT EXISTS archive.blobs (
+            hash TEXT PRIMARY KEY,
+            codec TEXT NOT NULL,
+            data BLOB NOT NULL,
+            size INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """,
+    """
+        CREATE TABLE IF NOT EXISTS archive.chat_summaries (
+            chat_id INTEGER PRIMARY KEY,
+            summary TEXT NOT NULL,
+            covered_until INTEGER NOT NULL,
+            updated_at TIMESTAMP
+        )
+    """,
+    """
+        CREATE VIEW IF NOT EXISTS archive.message_texts AS
+        SELECT m.id AS id,
+               CASE WHEN m.content_hash IS NULL THEN m.content
+                    ELSE blob_decode(b.codec, b.data) END AS content
+        FROM messages m LEFT JOIN blobs b ON b.hash = m.content_hash
+    """,
+    """
+        CREATE VIRTUAL TABLE IF NOT EXISTS archive.messages_fts USING fts5(
+            content, content='message_texts', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """,
+]
+
+
+def attach(conn: sqlite3.Connection, path):
+    conn.execute("ATTACH DATABASE ? AS archive", (str(path),))
+
+
+def is_attached(conn: sqlite3.Connection) -> bool:
+    return any(row[1] == "archive" for row in conn.execute("PRAGMA database_list"))
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    conn.execute("PRAGMA archive.journal_mode = WAL")
+    for sql in SCHEMA:
+        conn.execute(sql)
+
+
+def _copy_blobs(cursor: sqlite3.Cursor, source: str, target: str, hashes: list):
+    cursor.executemany(f"""
+        INSERT OR IGNORE INTO {target}.blobs (hash, codec, data, size)
+        SELECT hash, codec, data, size FROM {source}.blobs WHERE hash = ?
+    """, [(h,) for h in hashes])
+
+
+def archive_chats(cursor: sqlite3.Cursor, ids: list):
+    """Перенести чаты из основной базы в архив (внутри транзакции)"""
+    marks = ",".join("?" * len(ids))
+    hashes = blobs.chat_hashes(cursor, ids)
+
+    _copy_blobs(cursor, "main", "archive", hashes)
+    cursor.execute(f"""
+        INSERT INTO archive.chats ({CHAT_COLUMNS}, archived_at)
+        SELECT {CHAT_COLUMNS}, ? FROM main.chats WHERE id IN ({marks})
+    """, [datetime.now()] + ids)
+    cursor.execute(f"""
+        INSERT INTO archive.messages ({MESSAGE_COLUMNS})
+        SELECT {MESSAGE_COLUMNS} FROM main.messages WHERE chat_id IN ({marks})
+    """, ids)
+    cursor.execute(f"""
+        INSERT INTO archive.messages_fts (rowid, content)
+        SELECT id, content FROM archive.message_texts
+        WHERE id IN (SELECT id FROM archive.messages WHERE chat_id IN ({marks}))
+    """, ids)
+    cursor.execute(f"""
+        INSERT OR REPLACE INTO archive.chat_summaries ({SUMMARY_COLUMNS})
+        SELECT {SUMMARY_COLUMNS} FROM main.chat_summaries WHERE chat_id IN ({marks})
+    """, ids)
+
+    # Триггеры основной базы уберут сообщения и названия из её поиска
+    cursor.execute(f"DELETE FROM main.messages WHERE chat_id IN ({marks})", ids)
+    cursor.execute(f"DELETE FROM main.chat_summaries WHERE chat_id IN ({marks})", ids)
+    cursor.execute(f"DELETE FROM main.chats WHERE id IN ({marks})", ids)
+    blobs.release(cursor, hashes)
+
+
+def purge_chat(cursor: sqlite3.Cursor, chat_id: int):
+    """Удалить чат из архива вместе с его записями в поиске и блобами"""
+    hashes = blobs.chat_hashes(cursor, [chat_id], schema="archive")
+    cursor.execute("""
+        INSERT INTO archive.messages_fts (messages_fts, rowid, content)
+        SELECT 'delete', id, content FROM archive.message_texts
+        WHERE id IN (SELECT id FROM archive.messages WHERE chat_id = ?)
+    """, (chat_id,))
+    cursor.execute("DELETE FROM archive.messages WHERE chat_id = ?", (chat_id,))
+    cursor.execute("DELETE FROM archive.chat_summaries WHERE chat_id = ?", (chat_id,))
+    cursor.execute("DELETE FROM archive.chats WHERE id = ?", (chat_id,))
+    blobs.release(cursor, hashes, schema="archive")
+
+
+def restore_chat(cursor: sqlite3.Cursor, chat_id: int) -> bool:
+    """Вернуть чат из архива в основную базу; False, если его там нет"""
+    cursor.execute("SELECT 1 FROM archive.chats WHERE id = ?", (chat_id,))
+    if cursor.fetchone() is None:
+        return False
+
+    _copy_blobs(cursor, "archive", "main", blobs.chat_hashes(cursor, [chat_id], schema="archive"))
+
+    # Счётчики и превью заново посчитают триггеры на вставку сообщений
+    cursor.execute("""
+        INSERT INTO main.chats (id, title, created_at, updated_at, model,
+                               system_prompt, system_prompt_hash, accessed_at)
+        SELECT id, title, created_at, updated_at, model,
+               system_prompt, system_prompt_hash, ?
+        FROM archive.chats WHERE id = ?
+    """, (datetime.now(), chat_id))
+    cursor.execute(f"""
+        INSERT INTO main.messages ({MESSAGE_COLUMNS})
+        SELECT {MESSAGE_COLUMNS} FROM archive.messages WHERE chat_id = ? ORDER BY id
+    """, (chat_id,))
+    cursor.execute(f"""
+        INSERT OR REPLACE INTO main.chat_summaries ({SUMMARY_COLUMNS})
+        SELECT {SUMMARY_COLUMNS} FROM archive.chat_summaries WHERE chat_id = ?
+    """, (chat_id,))
+
+    purge_chat(cursor, chat_id)
+    return True
+
+
+def archive_step(cursor: sqlite3.Cursor, cutoff: datetime, batch_size: int) -> int:
+    """Перенести пачку давно не открывавшихся чатов; вернуть, сколько перенесено"""
+    cursor.execute("""
+        SELECT id FROM main.chats
+        WHERE COALESCE(accessed_at, updated_at) < ?
+        ORDER BY updated_at LIMIT ?
+    """, (cutoff, batch_size))
+    ids = [row[0] for row in cursor.fetchall()]
+    if ids:
+        archive_chats(cursor, ids)
+    return len(ids)
+
+
+class ChatArchiver(BatchWorker):
+    name = "chat-archiver"
+
+    def __init__(self, writer, after_days: int,
+                 batch_size: int = Config.ARCHIVE_BATCH, pause: float = Config.ARCHIVE_PAUSE):
+        # Соединение записи подключает архив при создании DatabaseManager
+        super().__init__(writer, batch_size, pause)
+        self.cutoff = datetime.now() - timedelta(days=after_days)
+
+    def step(self, cursor: sqlite3.Cursor) -> int:
+        return archive_step(cursor, self.cutoff, self.batch_size)
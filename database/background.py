@@ -0,0 +1,56 @@
+"""
+Фоновые пакетные задачи над базой (индексация поиска, сжатие старых
+сообщений, перенос чатов в архив, очистка сирот). Каждая работает в своём
+потоке, но пачки пишет через общий DatabaseWriter: второго пишущего
+соединения, которое спорило бы с ним за блокировку базы, нет. Пауза
+между пачками оставляет место для записей из приложения. Прогресс
+хранится в maintenance_state, поэтому прерванная задача продолжается со
+следующего запуска.
+"""
+
+import sqlite3
+import threading
+import time
+
+
+class BatchWorker:
+    name = "batch"
+
+    def __init__(self, writer, batch_size: int, pause: float):
+        self.writer = writer
+        self.batch_size = batch_size
+        self.pause = pause
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+
+    def step(self, cursor: sqlite3.Cursor) -> int:
+        """
+        Обработать одну пачку (в потоке записи, внутри его транзакции);
+        вернуть, сколько ещё осталось (0 — готово)
+        """
+        raise NotImplementedError
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout=2)
+
+    def _run(self):
+        started = time.perf_counter()
+        batches = 0
+        try:
+            while not self._stop.is_set():
+                remaining = self.writer.submit(self.step).result()
+                if remaining <= 0:
+                    break
+                batches += 1
+                # Пауза между пачками — место для записей из интерфейса
+                self._stop.wait(self.pause)
+        except (sqlite3.Error, RuntimeError) as e:
+            print(f"[DB] {self.name}: прервано ({e})")
+
+        if batches:
+            print(f"[DB] {self.name}: пачек {batches} за {time.perf_counter() - started:.1f} с")
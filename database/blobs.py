@@ -0,0 +1,94 @@
+"""
+Хранилище больших текстов с адресацией по содержимому.
+
+Длинные сообщения и системные промпты лежат в таблице blobs один раз —
+ключ это SHA-256 текста, строки messages/chats ссылаются на него.
+Тексты от COMPRESS_MIN_BYTES сжимаются (zstd, если установлен
+zstandard, иначе zlib); сжатие оставляется, только если оно реально
+меньше исходника. Для SQL зарегистрирована функция blob_decode(codec,
+data): через неё представление message_texts отдаёт исходный текст
+поиску FTS5.
+"""
+
+import hashlib
+import sqlite3
+import zlib
+
+from config import Config
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CODEC = "zstd" if zstandard else "zlib"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def encode(text: str, min_size: int = Config.COMPRESS_MIN_BYTES) -> tuple:
+    """Текст → (codec, data, размер в байтах)"""
+    raw = text.encode("utf-8")
+    if len(raw) >= min_size:
+        if CODEC == "zstd":
+            packed = zstandard.compress(raw, Config.COMPRESS_LEVEL_ZSTD)
+        else:
+            packed = zlib.compress(raw, Config.COMPRESS_LEVEL_ZLIB)
+        if len(packed) < len(raw):
+            return CODEC, packed, len(raw)
+    return "raw", raw, len(raw)
+
+
+def decode(codec: str, data: bytes) -> str:
+    if codec is None:
+        return None
+    if codec == "zlib":
+        data = zlib.decompress(data)
+    elif codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Запись сжата zstd: установите пакет zstandard")
+        data = zstandard.decompress(data)
+    return data.decode("utf-8")
+
+
+def register(conn: sqlite3.Connection):
+    """blob_decode() для представления message_texts и триггеров поиска"""
+    conn.create_function("blob_decode", 2, decode, deterministic=True)
+
+
+def store(cursor: sqlite3.Cursor, text: str) -> str:
+    """Сохранить текст (если такого ещё нет) и вернуть его хэш"""
+    key = content_hash(text)
+    cursor.execute("SELECT 1 FROM blobs WHERE hash = ?", (key,))
+    if cursor.fetchone() is None:
+        codec, data, size = encode(text)
+        cursor.execute(
+            "INSERT INTO blobs (hash, codec, data, size) VALUES (?, ?, ?, ?)",
+            (key, codec, data, size)
+        )
+    return key
+
+
+def chat_hashes(cursor: sqlite3.Cursor, chat_ids: list, schema: str = "main") -> list:
+    """Хэши блобов чатов: тексты сообщений и системные промпты"""
+    marks = ",".join("?" * len(chat_ids))
+    cursor.execute(f"""
+        SELECT content_hash FROM {schema}.messages
+        WHERE chat_id IN ({marks}) AND content_hash IS NOT NULL
+        UNION
+        SELECT system_prompt_hash FROM {schema}.chats
+        WHERE id IN ({marks}) AND system_prompt_hash IS NOT NULL
+    """, list(chat_ids) * 2)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def release(cursor: sqlite3.Cursor, hashes: list, schema: str = "main"):
+    """Удалить блобы, на которые больше никто не ссылается"""
+    cursor.executemany(f"""
+        DELETE FROM {schema}.blobs WHERE hash = ?
+        AND NOT EXISTS (SELECT 1 FROM {schema}.messages WHERE content_hash = ?)
+        AND NOT EXISTS (SELECT 1 FROM {schema}.chats WHERE system_prompt_hash = ?)
+    """, [(h, h, h) for h in set(hashes) if h])
+
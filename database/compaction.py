@@ -0,0 +1,51 @@
+"""
+Фоновое сжатие сообщений, сохранённых до появления хранилища blobs.
+
+Длинные тексты старых строк переносятся в blobs пачками по диапазонам
+id, от новых к старым; новые сообщения сразу пишутся через blobs.store.
+"""
+
+import sqlite3
+
+from config import Config
+from database import blobs
+from database.background import BatchWorker
+
+
+def compact_step(cursor: sqlite3.Cursor, batch_size: int) -> int:
+    """Перенести длинные сообщения из старых строк в blobs; вернуть остаток id"""
+    row = cursor.execute(
+        "SELECT value FROM maintenance_state WHERE name = 'content_compact_below'"
+    ).fetchone()
+    below = row[0] if row else 1
+    if below <= 1:
+        return 0
+
+    low = max(1, below - batch_size)
+    rows = cursor.execute("""
+        SELECT id, content FROM messages
+        WHERE id >= ? AND id < ? AND content_hash IS NULL AND length(CAST(content AS BLOB)) >= ?
+    """, (low, below, Config.COMPRESS_MIN_BYTES)).fetchall()
+
+    # Текст не меняется, поэтому триггер поиска на это обновление не срабатывает
+    for message_id, content in rows:
+        cursor.execute(
+            "UPDATE messages SET content = '', content_hash = ? WHERE id = ?",
+            (blobs.store(cursor, content), message_id)
+        )
+    cursor.execute(
+        "UPDATE maintenance_state SET value = ? WHERE name = 'content_compact_below'",
+        (low,)
+    )
+    return low - 1
+
+
+class ContentCompactor(BatchWorker):
+    name = "content-compactor"
+
+    def __init__(self, writer, batch_size: int = Config.COMPACT_BATCH,
+                 pause: float = Config.COMPACT_PAUSE):
+        super().__init__(writer, batch_size, pause)
+
+    def step(self, cursor: sqlite3.Cursor) -> int:
+        return compact_step(cursor, self.batch_size)
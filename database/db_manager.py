@@ -1,68 +1,129 @@
 import sqlite3
 import json
+from pathlib import Path
+from concurrent.futures import Future
 from datetime import datetime
 from config import Config
+from utils.tokens import estimate_tokens
+from database.migrations import BULK_INSERT_KEY, migrate
+from database.writer import DatabaseWriter
+from database.pool import ReadPool
+from database import archive, blobs
 
 
 class DatabaseManager:
-    def __init__(self):
+    """
+    Запись — только через поток DatabaseWriter (методы записи возвращают
+    Future), чтение — через пул соединений ReadPool. Давно не открывавшиеся
+    чаты лежат в отдельном файле архива (database/archive.py).
+    """
+
+    def __init__(self, db_path=None, archive_path=None):
         Config.init()
-        self.conn = sqlite3.connect(Config.DB_PATH, check_same_thread=False)
-        self.create_tables()
-
-    def create_tables(self):
-        cursor = self.conn.cursor()
-
-        # Таблица чатов
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS chats (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                model TEXT,
-                system_prompt TEXT
-            )
-        """)
+        self.db_path = db_path or Config.DB_PATH
+        if archive_path is None:
+            archive_path = (Config.ARCHIVE_PATH if db_path is None
+                            else Path(db_path).with_name(Path(db_path).stem + "_archive.db"))
+        self.archive_path = archive_path
 
-        # Таблица сообщений
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                chat_id INTEGER NOT NULL,
-                role TEXT NOT NULL,
-                content TEXT NOT NULL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (chat_id) REFERENCES chats (id) ON DELETE CASCADE
-            )
-        """)
+        conn = self.connect()
+        migrate(conn)
+        # ATTACH нельзя выполнить внутри транзакции, поэтому соединение записи
+        # подключает архив сразу, до запуска потока
+        archive.attach(conn, self.archive_path)
+        archive.ensure_schema(conn)
+        conn.commit()
+        self.writer = DatabaseWriter(conn)
 
-        self.conn.commit()
+        self.pool = ReadPool(lambda: self.connect(read_only=True), Config.DB_READ_POOL_SIZE)
+
+    def connect(self, read_only: bool = False) -> sqlite3.Connection:
+        """Соединение с WAL и настройками кэша (journal_mode сохраняется в файле базы)"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10,
+                               cached_statements=Config.DB_STATEMENT_CACHE)
+        blobs.register(conn)
+        cursor = conn.cursor()
+        if read_only:
+            # Без неявных транзакций: каждое чтение видит последний коммит
+            conn.isolation_level = None
+            cursor.execute("PRAGMA query_only = ON")
+        else:
+            # Читатели не блокируют запись, коммит без fsync на каждую транзакцию
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
+            # Иначе ON DELETE CASCADE не срабатывает и сообщения остаются сиротами
+            cursor.execute("PRAGMA foreign_keys = ON")
+        cursor.execute(f"PRAGMA cache_size = -{Config.DB_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size = {Config.DB_MMAP_SIZE}")
+        cursor.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    def _fetchall(self, sql: str, params: tuple = (), cold: bool = False) -> list:
+        with self.pool.connection() as conn:
+            # Архив нужен редко — читатель подключает его при первом обращении
+            if cold and not archive.is_attached(conn):
+                archive.attach(conn, self.archive_path)
+            return conn.execute(sql, params).fetchall()
+
+    def _fetchone(self, sql: str, params: tuple = ()):
+        with self.pool.connection() as conn:
+            return conn.execute(sql, params).fetchone()
 
     # === ЧАТЫ ===
 
     def create_chat(self, title: str = "Новый чат",
                     model: str = "", system_prompt: str = "") -> int:
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "INSERT INTO chats (title, model, system_prompt) VALUES (?, ?, ?)",
-            (title, model, system_prompt)
-        )
-        self.conn.commit()
-        return cursor.lastrowid
+        def write(cursor):
+            # Один и тот же промпт у сотен чатов хранится один раз
+            prompt_hash = blobs.store(cursor, system_prompt) if system_prompt else None
+            cursor.execute(
+                "INSERT INTO chats (title, model, system_prompt_hash) VALUES (?, ?, ?)",
+                (title, model, prompt_hash)
+            )
+            return cursor.lastrowid
+
+        return self.writer.submit(write).result()
 
     def get_all_chats(self) -> list:
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT id, title, created_at, updated_at, model 
+        return self._fetchall("""
+            SELECT id, title, created_at, updated_at, model,
+                   message_count, total_tokens, last_role, last_message_preview
             FROM chats ORDER BY updated_at DESC
         """)
-        return cursor.fetchall()
+
+    def get_chats_page(self, after: tuple = None, limit: int = Config.CHAT_PAGE_SIZE,
+                       archived: bool = False) -> list:
+        """
+        Страница списка чатов в формате get_all_chats. after — (updated_at, id)
+        последнего чата предыдущей страницы: поиск идёт по индексу с этого
+        места, а не OFFSET с начала списка
+        """
+        table = "archive.chats" if archived else "chats"
+        where = "WHERE (updated_at, id) < (?, ?)" if after else ""
+        return self._fetchall(f"""
+            SELECT id, title, created_at, updated_at, model,
+                   message_count, total_tokens, last_role, last_message_preview
+            FROM {table} {where}
+            ORDER BY updated_at DESC, id DESC LIMIT ?
+        """, (*(after or ()), limit), cold=archived)
+
+    def restore_chat(self, chat_id: int) -> Future:
+        """Вернуть чат из архива; Future с False, если в архиве его нет"""
+        return self.writer.submit(archive.restore_chat, chat_id)
+
+    def touch_chat(self, chat_id: int) -> Future:
+        """Отметить открытие чата — открываемые чаты не уходят в архив"""
+        return self.writer.submit(lambda cursor: cursor.execute(
+            "UPDATE chats SET accessed_at = ? WHERE id = ?", (datetime.now(), chat_id)
+        ))
 
     def get_chat(self, chat_id: int) -> dict:
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM chats WHERE id = ?", (chat_id,))
-        row = cursor.fetchone()
+        row = self._fetchone("""
+            SELECT c.id, c.title, c.created_at, c.updated_at, c.model,
+                   c.system_prompt, b.codec, b.data, c.message_count
+            FROM chats c LEFT JOIN blobs b ON b.hash = c.system_prompt_hash
+            WHERE c.id = ?
+        """, (chat_id,))
         if row:
             return {
                 "id": row[0],
@@ -70,50 +131,378 @@ class DatabaseManager:
                 "created_at": row[2],
                 "updated_at": row[3],
                 "model": row[4],
-                "system_prompt": row[5]
+                "system_prompt": blobs.decode(row[6], row[7]) if row[6] else row[5],
+                "message_count": row[8],
             }
         return None
 
-    def update_chat_title(self, chat_id: int, title: str):
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "UPDATE chats SET title = ?, updated_at = ? WHERE id = ?",
-            (title, datetime.now(), chat_id)
-        )
-        self.conn.commit()
+    def update_chat_title(self, chat_id: int, title: str) -> Future:
+        def write(cursor):
+            cursor.execute(
+                "UPDATE chats SET title = ?, updated_at = ? WHERE id = ?",
+                (title, datetime.now(), chat_id)
+            )
+
+        return self.writer.submit(write)
+
+    def delete_chat(self, chat_id: int) -> Future:
+        return self.delete_chats([chat_id])
+
+    def delete_chats(self, chat_ids: list) -> Future:
+        """Удалить чаты одной транзакцией; сообщения и резюме удаляет каскад"""
+        ids = list(chat_ids)
 
-    def delete_chat(self, chat_id: int):
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM chats WHERE id = ?", (chat_id,))
-        self.conn.commit()
+        def write(cursor):
+            hashes = blobs.chat_hashes(cursor, ids)
+            cursor.execute(f"DELETE FROM chats WHERE id IN ({','.join('?' * len(ids))})", ids)
+            deleted = cursor.rowcount
+            blobs.release(cursor, hashes)
+            for chat_id in ids:
+                archive.purge_chat(cursor, chat_id)
+            return deleted
+
+        return self.writer.submit(write)
 
     # === СООБЩЕНИЯ ===
 
-    def add_message(self, chat_id: int, role: str, content: str):
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "INSERT INTO messages (chat_id, role, content) VALUES (?, ?, ?)",
-            (chat_id, role, content)
-        )
-        cursor.execute(
-            "UPDATE chats SET updated_at = ? WHERE id = ?",
-            (datetime.now(), chat_id)
-        )
-        self.conn.commit()
+    def add_message(self, chat_id: int, role: str, content: str,
+                    model: str = None, chat_model: bool = True) -> Future:
+        """Future с id сообщения; готов, когда запись закоммичена.
+        chat_model=False — модель ответа не становится моделью чата (сравнение)"""
+        tokens = estimate_tokens(content)
+        now = datetime.now()
+        # Длинный текст — в blobs (сжатый, один раз на одинаковые ответы)
+        in_blob = len(content.encode("utf-8")) >= Config.COMPRESS_MIN_BYTES
+
+        def write(cursor):
+            content_hash = blobs.store(cursor, content) if in_blob else None
+            cursor.execute(
+                """INSERT INTO messages (chat_id, role, content, content_hash, model, tokens)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (chat_id, role, "" if in_blob else content, content_hash, model, tokens)
+            )
+            message_id = cursor.lastrowid
+            cursor.execute(
+                "UPDATE chats SET updated_at = ?, model = COALESCE(?, model) WHERE id = ?",
+                (now, model if chat_model else None, chat_id)
+            )
+            return message_id
+
+        return self.writer.submit(write)
 
     def get_messages(self, chat_id: int) -> list:
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT role, content, timestamp 
-            FROM messages WHERE chat_id = ? ORDER BY timestamp
+        rows = self._fetchall("""
+            SELECT m.id, m.role, m.content, m.timestamp, m.model, m.tokens, b.codec, b.data
+            FROM messages m LEFT JOIN blobs b ON b.hash = m.content_hash
+            WHERE m.chat_id = ? ORDER BY m.id
         """, (chat_id,))
-        return [{"role": r[0], "content": r[1], "timestamp": r[2]}
-                for r in cursor.fetchall()]
+        return self._to_messages(rows)
+
+    def get_messages_page(self, chat_id: int, before_id: int = None,
+                          limit: int = Config.MESSAGE_PAGE_SIZE) -> list:
+        """Последние limit сообщений с id < before_id (keyset), по возрастанию id"""
+        if before_id is None:
+            rows = self._fetchall("""
+                SELECT m.id, m.role, m.content, m.timestamp, m.model, m.tokens, b.codec, b.data
+                FROM messages m LEFT JOIN blobs b ON b.hash = m.content_hash
+                WHERE m.chat_id = ? ORDER BY m.id DESC LIMIT ?
+            """, (chat_id, limit))
+        else:
+            rows = self._fetchall("""
+                SELECT m.id, m.role, m.content, m.timestamp, m.model, m.tokens, b.codec, b.data
+                FROM messages m LEFT JOIN blobs b ON b.hash = m.content_hash
+                WHERE m.chat_id = ? AND m.id < ? ORDER BY m.id DESC LIMIT ?
+            """, (chat_id, before_id, limit))
+        return self._to_messages(rows[::-1])
+
+    def get_messages_after(self, chat_id: int, after_id: int) -> list:
+        """Сообщения чата с id > after_id по возрастанию id"""
+        rows = self._fetchall("""
+            SELECT m.id, m.role, m.content, m.timestamp, m.model, m.tokens, b.codec, b.data
+            FROM messages m LEFT JOIN blobs b ON b.hash = m.content_hash
+            WHERE m.chat_id = ? AND m.id > ? ORDER BY m.id
+        """, (chat_id, after_id))
+        return self._to_messages(rows)
+
+    def get_messages_range(self, chat_id: int, from_id: int, before_id: int) -> list:
+        """Сообщения чата с from_id <= id < before_id по возрастанию id"""
+        rows = self._fetchall("""
+            SELECT m.id, m.role, m.content, m.timestamp, m.model, m.tokens, b.codec, b.data
+            FROM messages m LEFT JOIN blobs b ON b.hash = m.content_hash
+            WHERE m.chat_id = ? AND m.id >= ? AND m.id < ? ORDER BY m.id
+        """, (chat_id, from_id, before_id))
+        return self._to_messages(rows)
+
+    def has_messages_before(self, chat_id: int, before_id: int) -> bool:
+        row = self._fetchone(
+            "SELECT 1 FROM messages WHERE chat_id = ? AND id < ? LIMIT 1", (chat_id, before_id)
+        )
+        return row is not None
+
+    def _to_messages(self, rows: list) -> list:
+        # Текст из blobs распаковывается здесь — вызывающим это не видно
+        messages = [{"id": r[0], "role": r[1],
+                     "content": blobs.decode(r[6], r[7]) if r[6] else r[2],
+                     "timestamp": r[3], "model": r[4], "tokens": r[5]}
+                    for r in rows]
+
+        # Сообщения из старых баз: досчитать токены один раз
+        missing = [m for m in messages if m["tokens"] is None]
+        if missing:
+            for m in missing:
+                m["tokens"] = estimate_tokens(m["content"])
+            updates = [(m["tokens"], m["id"]) for m in missing]
+            self.writer.submit(lambda cursor: cursor.executemany(
+                "UPDATE messages SET tokens = ? WHERE id = ?", updates
+            ))
+        return messages
+
+    def clear_messages(self, chat_id: int) -> Future:
+        def write(cursor):
+            cursor.execute("""
+                SELECT DISTINCT content_hash FROM messages
+                WHERE chat_id = ? AND content_hash IS NOT NULL
+            """, (chat_id,))
+            hashes = [r[0] for r in cursor.fetchall()]
+            cursor.execute("DELETE FROM messages WHERE chat_id = ?", (chat_id,))
+            cursor.execute("DELETE FROM chat_summaries WHERE chat_id = ?", (chat_id,))
+            blobs.release(cursor, hashes)
+
+        return self.writer.submit(write)
+
+    # === ИМПОРТ ===
+
+    def import_chats(self, chats: list, source: str = None, offset: int = 0) -> Future:
+        """Пачка чатов (utils.importer.normalize) одной транзакцией; вместе с ней
+        сохраняется позиция offset в файле source. Future с числом сообщений"""
+        def write(cursor):
+            # Построчные триггеры молчат: счётчики считаются здесь,
+            # поиск индексируется одним запросом на всю пачку
+            cursor.execute(
+                "INSERT INTO maintenance_state (name, value) VALUES (?, 1)", (BULK_INSERT_KEY,)
+            )
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM messages")
+            last_id = cursor.fetchone()[0]
 
-    def clear_messages(self, chat_id: int):
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM messages WHERE chat_id = ?", (chat_id,))
-        self.conn.commit()
+            rows = []
+            for chat in chats:
+                prompt = chat["system_prompt"]
+                messages = chat["messages"]
+                role, content = messages[-1][0], messages[-1][1]
+                cursor.execute(
+                    """INSERT INTO chats (title, model, system_prompt_hash, created_at, updated_at,
+                                          message_count, total_tokens, last_role, last_message_preview)
+                       VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP),
+                               ?, ?, ?, ?)""",
+                    (chat["title"], chat["model"], blobs.store(cursor, prompt) if prompt else None,
+                     chat["created_at"], chat["updated_at"],
+                     len(messages), sum(m[4] for m in messages), role, content[:120])
+                )
+                chat_id = cursor.lastrowid
+                for role, content, timestamp, model, tokens in messages:
+                    content_hash = None
+                    if len(content.encode("utf-8")) >= Config.COMPRESS_MIN_BYTES:
+                        content_hash = blobs.store(cursor, content)
+                        content = ""
+                    rows.append((chat_id, role, content, content_hash, timestamp, model, tokens))
+
+            cursor.executemany(
+                """INSERT INTO messages (chat_id, role, content, content_hash, timestamp, model, tokens)
+                   VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?)""",
+                rows
+            )
+            cursor.execute("""
+                INSERT INTO messages_fts (rowid, content)
+                SELECT id, content FROM message_texts WHERE id > ?
+            """, (last_id,))
+            cursor.execute("DELETE FROM maintenance_state WHERE name = ?", (BULK_INSERT_KEY,))
+
+            if source:
+                cursor.execute(
+                    "INSERT OR REPLACE INTO maintenance_state (name, value) VALUES (?, ?)",
+                    (source, offset)
+                )
+            return len(rows)
+
+        return self.writer.submit(write)
+
+    def get_import_offset(self, source: str) -> int:
+        row = self._fetchone("SELECT value FROM maintenance_state WHERE name = ?", (source,))
+        return row[0] if row else 0
+
+    # === ПОИСК ===
+
+    @staticmethod
+    def _match_query(query: str) -> str:
+        """Слова пользователя → запрос FTS5: каждое в кавычках, с поиском по префиксу"""
+        words = [w.replace('"', '""') for w in query.split()]
+        return " ".join(f'"{w}"*' for w in words)
+
+    def search(self, query: str, limit: int = Config.SEARCH_RESULTS_LIMIT) -> list:
+        """Найти чаты и сообщения; совпадения в сниппете обрамлены \x02…\x03"""
+        match = self._match_query(query)
+        if not match:
+            return []
+
+        # bm25 отрицательный (меньше — лучше); совпадение в названии весит вдвое
+        rows = self._fetchall("""
+            SELECT * FROM (
+                SELECT c.id, NULL, c.title,
+                       highlight(chats_fts, 0, char(2), char(3)),
+                       bm25(chats_fts) * 2 AS rank
+                FROM chats_fts JOIN chats c ON c.id = chats_fts.rowid
+                WHERE chats_fts MATCH ?
+                UNION ALL
+                SELECT m.chat_id, m.id, c.title,
+                       snippet(messages_fts, 0, char(2), char(3), '…', 12),
+                       bm25(messages_fts) AS rank
+                FROM messages_fts
+                JOIN messages m ON m.id = messages_fts.rowid
+                JOIN chats c ON c.id = m.chat_id
+                WHERE messages_fts MATCH ?
+            ) ORDER BY rank LIMIT ?
+        """, (match, match, limit))
+        results = [{"chat_id": r[0], "message_id": r[1], "title": r[2], "snippet": r[3],
+                    "archived": False}
+                   for r in rows]
+        if len(results) < limit:
+            results += self._search_archive(query, match, limit - len(results))
+        return results
+
+    def _search_archive(self, query: str, match: str, limit: int) -> list:
+        """Архив ищется, только если активных совпадений не хватило на страницу"""
+        rows = self._fetchall("""
+            SELECT * FROM (
+                SELECT id, NULL, title, title, -1e9 AS rank
+                FROM archive.chats WHERE title LIKE ? ESCAPE '\\'
+                UNION ALL
+                SELECT m.chat_id, m.id, c.title,
+                       snippet(messages_fts, 0, char(2), char(3), '…', 12),
+                       bm25(messages_fts) AS rank
+                FROM archive.messages_fts
+                JOIN archive.messages m ON m.id = messages_fts.rowid
+                JOIN archive.chats c ON c.id = m.chat_id
+                WHERE messages_fts MATCH ?
+            ) ORDER BY rank LIMIT ?
+        """, (f"%{self._escape_like(query.strip())}%", match, limit), cold=True)
+        return [{"chat_id": r[0], "message_id": r[1], "title": r[2], "snippet": r[3],
+                 "archived": True}
+                for r in rows]
+
+    @staticmethod
+    def _escape_like(text: str) -> str:
+        """% и _ из запроса — буквальные символы, а не шаблон LIKE"""
+        return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+    # === РЕЗЮМЕ ===
+
+    def get_summary(self, chat_id: int) -> dict:
+        row = self._fetchone(
+            "SELECT summary, covered_until FROM chat_summaries WHERE chat_id = ?", (chat_id,)
+        )
+        if row:
+            return {"summary": row[0], "covered_until": row[1]}
+        return None
+
+    def save_summary(self, chat_id: int, summary: str, covered_until: int) -> Future:
+        """Сохранить, только если свёрнутое сообщение ещё существует (чат не очищен).
+        Future с True, если резюме записано"""
+        now = datetime.now()
+
+        def write(cursor):
+            cursor.execute("""
+                INSERT OR REPLACE INTO chat_summaries (chat_id, summary, covered_until, updated_at)
+                SELECT ?, ?, ?, ? WHERE EXISTS (
+                    SELECT 1 FROM messages WHERE id = ? AND chat_id = ?
+                )
+            """, (chat_id, summary, covered_until, now, covered_until, chat_id))
+            return cursor.rowcount > 0
+
+        return self.writer.submit(write)
+
+    # === ТЕЛЕМЕТРИЯ ===
+
+    def add_model_stat(self, model: str, ttft: float, duration: float,
+                       tokens: int, tokens_per_sec: float, error: str,
+                       window: int = Config.TELEMETRY_WINDOW) -> Future:
+        def write(cursor):
+            cursor.execute(
+                """INSERT INTO model_stats (model, ttft, duration, tokens, tokens_per_sec, error)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (model, ttft, duration, tokens, tokens_per_sec, error)
+            )
+            # Храним только последние window замеров модели
+            cursor.execute("""
+                DELETE FROM model_stats WHERE model = ? AND id <= (
+                    SELECT id FROM model_stats WHERE model = ?
+                    ORDER BY id DESC LIMIT 1 OFFSET ?
+                )
+            """, (model, model, window))
+
+        return self.writer.submit(write)
+
+    def get_model_stats(self, model: str, limit: int = Config.TELEMETRY_WINDOW) -> list:
+        rows = self._fetchall("""
+            SELECT ttft, duration, tokens, tokens_per_sec, error
+            FROM model_stats WHERE model = ? ORDER BY id DESC LIMIT ?
+        """, (model, limit))
+        return [{"ttft": r[0], "duration": r[1], "tokens": r[2],
+                 "tokens_per_sec": r[3], "error": r[4]}
+                for r in rows]
+
+    # === КЭШ ОТВЕТОВ ===
+
+    def cache_get(self, key: str, now: float):
+        row = self._fetchone(
+            "SELECT response, model, created_at FROM response_cache WHERE key = ?", (key,)
+        )
+        if row:
+            # Отметка использования для LRU — ждать её незачем
+            self.writer.submit(lambda c: c.execute(
+                "UPDATE response_cache SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                (now, key)
+            ))
+            return {"response": row[0], "model": row[1], "created_at": row[2]}
+        return None
+
+    def cache_put(self, key: str, model: str, response: str, now: float) -> Future:
+        def write(cursor):
+            cursor.execute(
+                """INSERT OR REPLACE INTO response_cache
+                   (key, model, response, size, created_at, last_used)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (key, model, response, len(response.encode("utf-8")), now, now)
+            )
+
+        return self.writer.submit(write)
+
+    def cache_evict(self, max_bytes: int, min_created_at: float) -> Future:
+        """Удалить устаревшие записи и самые давно использованные сверх лимита"""
+        def write(cursor):
+            cursor.execute("DELETE FROM response_cache WHERE created_at < ?", (min_created_at,))
+            cursor.execute("""
+                DELETE FROM response_cache WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(size) OVER (ORDER BY last_used DESC) AS total
+                        FROM response_cache
+                    ) WHERE total > ?
+                )
+            """, (max_bytes,))
+
+        return self.writer.submit(write)
+
+    def cache_delete(self, key: str) -> Future:
+        return self.writer.submit(
+            lambda cursor: cursor.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+        )
+
+    def cache_size(self) -> tuple:
+        return self._fetchone("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache")
 
     def close(self):
-        self.conn.close()
\ No newline at end of file
+        # Дописать очередь, затем обновить статистику планировщика, если она устарела
+        self.writer.stop()
+        self.writer.conn.execute("PRAGMA optimize")
+        self.writer.conn.close()
+
+        self.pool.close()
\ No newline at end of file
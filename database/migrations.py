@@ -0,0 +1,516 @@
+"""
+Версионированные миграции схемы.
+
+Текущая версия хранится в PRAGMA user_version. Каждая миграция —
+функция от курсора; применяется в своей транзакции вместе с повышением
+user_version, так что прерванный запуск не оставит базу «между» версиями.
+Новые изменения схемы — только новой миграцией в конец MIGRATIONS.
+"""
+
+import sqlite3
+
+from database import blobs
+
+
+def _v1_baseline(cursor: sqlite3.Cursor):
+    """Исходная схема (базы до миграций тоже проходят через неё)"""
+
+    # Таблица чатов
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS chats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            model TEXT,
+            system_prompt TEXT
+        )
+    """)
+
+    # Таблица сообщений
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            model TEXT,
+            tokens INTEGER,
+            FOREIGN KEY (chat_id) REFERENCES chats (id) ON DELETE CASCADE
+        )
+    """)
+
+    # Телеметрия вызовов API: скользящее окно замеров по каждой модели
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS model_stats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            model TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            ttft REAL,
+            duration REAL,
+            tokens INTEGER,
+            tokens_per_sec REAL,
+            error TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_model_stats_model
+        ON model_stats (model, id)
+    """)
+
+    # Резюме старой части чата: covered_until — id последнего свёрнутого сообщения
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS chat_summaries (
+            chat_id INTEGER PRIMARY KEY,
+            summary TEXT NOT NULL,
+            covered_until INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (chat_id) REFERENCES chats (id) ON DELETE CASCADE
+        )
+    """)
+
+    # Кэш ответов (LRU по last_used, размер в байтах UTF-8)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS response_cache (
+            key TEXT PRIMARY KEY,
+            model TEXT,
+            response TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL,
+            hits INTEGER DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_response_cache_last_used
+        ON response_cache (last_used)
+    """)
+
+    # Старые базы: модель, которая ответила, и оценка токенов добавлены позже
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(messages)")]
+    if "model" not in columns:
+        cursor.execute("ALTER TABLE messages ADD COLUMN model TEXT")
+    if "tokens" not in columns:
+        cursor.execute("ALTER TABLE messages ADD COLUMN tokens INTEGER")
+
+
+def _v2_indexes(cursor: sqlite3.Cursor):
+    """Индексы под get_messages и список чатов"""
+
+    # Сообщения чата уже упорядочены по id — без полного скана и сортировки
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_messages_chat
+        ON messages (chat_id, id)
+    """)
+    # Список чатов в сайдбаре: покрывающий индекс, таблица не читается
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_chats_updated
+        ON chats (updated_at DESC, id, title, created_at, model)
+    """)
+    cursor.execute("ANALYZE")
+
+
+# Триггеры держат индекс в актуальном состоянии. Удалять из индекса
+# можно только то, что в него уже попало, иначе FTS5 испортит счётчики
+SEARCH_TRIGGERS = [
+    """
+        CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+        END;
+    """,
+    """
+        CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages
+        WHEN old.id >= (SELECT value FROM search_state WHERE name = 'messages_backfill_below')
+        BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, content)
+            VALUES ('delete', old.id, old.content);
+        END;
+    """,
+    """
+        CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages
+        WHEN old.id >= (SELECT value FROM search_state WHERE name = 'messages_backfill_below')
+        BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, content)
+            VALUES ('delete', old.id, old.content);
+            INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+        END;
+    """,
+    """
+        CREATE TRIGGER IF NOT EXISTS chats_fts_insert AFTER INSERT ON chats BEGIN
+            INSERT INTO chats_fts (rowid, title) VALUES (new.id, new.title);
+        END;
+    """,
+    """
+        CREATE TRIGGER IF NOT EXISTS chats_fts_delete AFTER DELETE ON chats BEGIN
+            INSERT INTO chats_fts (chats_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        END;
+    """,
+    """
+        CREATE TRIGGER IF NOT EXISTS chats_fts_update AFTER UPDATE OF title ON chats BEGIN
+            INSERT INTO chats_fts (chats_fts, rowid, title) VALUES ('delete', old.id, old.title);
+            INSERT INTO chats_fts (rowid, title) VALUES (new.id, new.title);
+        END;
+    """,
+]
+
+
+def _v3_search(cursor: sqlite3.Cursor):
+    """Полнотекстовый поиск FTS5 по сообщениям и названиям чатов"""
+
+    # external content: текст хранится только в messages/chats, в индексе — токены
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+            content, content='messages', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS chats_fts USING fts5(
+            title, content='chats', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+
+    # Сообщения с id ниже границы ещё не проиндексированы: их в фоне
+    # дописывает SearchBackfill, от новых id к старым
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS search_state (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        INSERT OR REPLACE INTO search_state (name, value)
+        SELECT 'messages_backfill_below', COALESCE(MAX(id), 0) + 1 FROM messages
+    """)
+
+    # executescript нельзя: он коммитит транзакцию миграции
+    for trigger in SEARCH_TRIGGERS:
+        cursor.execute(trigger)
+
+    # Названий немного — индексируются сразу
+    cursor.execute("INSERT INTO chats_fts (rowid, title) SELECT id, title FROM chats")
+
+
+# Поиск по сообщениям после переноса длинных текстов в blobs: текст для
+# индекса берётся из message_texts (или декодируется из blobs при удалении)
+MESSAGE_SEARCH_TRIGGERS = [
+    """
+        CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_fts (rowid, content)
+            SELECT id, content FROM message_texts WHERE id = new.id;
+        END;
+    """,
+    """
+        CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages
+        WHEN old.id >= (SELECT value FROM maintenance_state WHERE name = 'messages_backfill_below')
+        BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, content)
+            VALUES ('delete', old.id, CASE
+                WHEN old.content_hash IS NULL THEN old.content
+                ELSE (SELECT blob_decode(codec, data) FROM blobs WHERE hash = old.content_hash)
+            END);
+        END;
+    """,
+    # Перенос текста в blobs (смена content_hash) текст не меняет — не переиндексируем
+    """
+        CREATE TRIGGER messages_fts_update AFTER UPDATE OF content ON messages
+        WHEN old.id >= (SELECT value FROM maintenance_state WHERE name = 'messages_backfill_below')
+        AND old.content_hash IS NULL AND new.content_hash IS NULL
+        BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, content)
+            VALUES ('delete', old.id, old.content);
+            INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+        END;
+    """,
+]
+
+
+def _v4_blobs(cursor: sqlite3.Cursor):
+    """Хранилище длинных текстов с дедупликацией и сжатием"""
+
+    # Граница фоновых задач теперь не только для поиска
+    cursor.execute("ALTER TABLE search_state RENAME TO maintenance_state")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS blobs (
+            hash TEXT PRIMARY KEY,
+            codec TEXT NOT NULL,
+            data BLOB NOT NULL,
+            size INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("ALTER TABLE messages ADD COLUMN content_hash TEXT")
+    cursor.execute("ALTER TABLE chats ADD COLUMN system_prompt_hash TEXT")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_messages_content_hash
+        ON messages (content_hash) WHERE content_hash IS NOT NULL
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_chats_system_prompt_hash
+        ON chats (system_prompt_hash) WHERE system_prompt_hash IS NOT NULL
+    """)
+
+    # Исходный текст сообщения, где бы он ни хранился
+    cursor.execute("""
+        CREATE VIEW IF NOT EXISTS message_texts AS
+        SELECT m.id AS id,
+               CASE WHEN m.content_hash IS NULL THEN m.content
+                    ELSE blob_decode(b.codec, b.data) END AS content
+        FROM messages m LEFT JOIN blobs b ON b.hash = m.content_hash
+    """)
+
+    # Индекс сообщений пересоздаётся поверх message_texts и заполняется в фоне
+    for name in ("messages_fts_insert", "messages_fts_delete", "messages_fts_update"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    cursor.execute("DROP TABLE IF EXISTS messages_fts")
+    cursor.execute("""
+        CREATE VIRTUAL TABLE messages_fts USING fts5(
+            content, content='message_texts', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    for trigger in MESSAGE_SEARCH_TRIGGERS:
+        cursor.execute(trigger)
+
+    # Старые длинные сообщения переносит в blobs ContentCompactor
+    for key in ("messages_backfill_below", "content_compact_below"):
+        cursor.execute("""
+            INSERT OR REPLACE INTO maintenance_state (name, value)
+            SELECT ?, COALESCE(MAX(id), 0) + 1 FROM messages
+        """, (key,))
+
+    # Системные промпты одинаковы у множества чатов — переносим сразу
+    prompts = cursor.execute("""
+        SELECT id, system_prompt FROM chats
+        WHERE system_prompt IS NOT NULL AND system_prompt != ''
+    """).fetchall()
+    for chat_id, prompt in prompts:
+        cursor.execute(
+            "UPDATE chats SET system_prompt = NULL, system_prompt_hash = ? WHERE id = ?",
+            (blobs.store(cursor, prompt), chat_id)
+        )
+
+
+# Сводка по чату в самой строке chats: сайдбару не нужны агрегаты по messages
+CHAT_SUMMARY_TRIGGERS = [
+    """
+        CREATE TRIGGER chats_summary_insert AFTER INSERT ON messages BEGIN
+            UPDATE chats SET
+                message_count = message_count + 1,
+                total_tokens = total_tokens + COALESCE(new.tokens, 0),
+                last_role = new.role,
+                last_message_preview = (
+                    SELECT substr(content, 1, 120) FROM message_texts WHERE id = new.id
+                )
+            WHERE id = new.chat_id;
+        END;
+    """,
+    """
+        CREATE TRIGGER chats_summary_delete AFTER DELETE ON messages BEGIN
+            UPDATE chats SET
+                message_count = message_count - 1,
+                total_tokens = total_tokens - COALESCE(old.tokens, 0)
+            WHERE id = old.chat_id;
+        END;
+    """,
+    # Удалено последнее сообщение — превью берётся с предыдущего
+    # (при очистке чата строки удаляются по возрастанию id, срабатывает один раз)
+    """
+        CREATE TRIGGER chats_summary_delete_last AFTER DELETE ON messages
+        WHEN NOT EXISTS (SELECT 1 FROM messages WHERE chat_id = old.chat_id AND id > old.id)
+        BEGIN
+            UPDATE chats SET
+                last_role = (
+                    SELECT role FROM messages WHERE chat_id = old.chat_id
+                    ORDER BY id DESC LIMIT 1
+                ),
+                last_message_preview = (
+                    SELECT substr(t.content, 1, 120) FROM message_texts t
+                    WHERE t.id = (SELECT MAX(id) FROM messages WHERE chat_id = old.chat_id)
+                )
+            WHERE id = old.chat_id;
+        END;
+    """,
+    # Досчитанная оценка токенов (get_messages для старых строк)
+    """
+        CREATE TRIGGER chats_summary_tokens AFTER UPDATE OF tokens ON messages BEGIN
+            UPDATE chats SET
+                total_tokens = total_tokens + COALESCE(new.tokens, 0) - COALESCE(old.tokens, 0)
+            WHERE id = new.chat_id;
+        END;
+    """,
+]
+
+
+def _v5_chat_summary(cursor: sqlite3.Cursor):
+    """Счётчики и превью последнего сообщения в chats"""
+
+    cursor.execute("ALTER TABLE chats ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("ALTER TABLE chats ADD COLUMN total_tokens INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("ALTER TABLE chats ADD COLUMN last_role TEXT")
+    cursor.execute("ALTER TABLE chats ADD COLUMN last_message_preview TEXT")
+
+    # Оценка токенов для строк, где её ещё нет: та же, что estimate_tokens —
+    # ceil(байты UTF-8 / 4); у вынесенных в blobs размер известен
+    cursor.execute("""
+        UPDATE messages SET tokens = (length(CAST(content AS BLOB)) + 3) / 4
+        WHERE tokens IS NULL AND content_hash IS NULL
+    """)
+    cursor.execute("""
+        UPDATE messages SET tokens = (
+            SELECT (size + 3) / 4 FROM blobs WHERE hash = messages.content_hash
+        )
+        WHERE tokens IS NULL AND content_hash IS NOT NULL
+    """)
+
+    # Разовое заполнение по существующим сообщениям (индекс (chat_id, id))
+    cursor.execute("""
+        UPDATE chats SET
+            message_count = (SELECT COUNT(*) FROM messages WHERE chat_id = chats.id),
+            total_tokens = (
+                SELECT COALESCE(SUM(tokens), 0) FROM messages WHERE chat_id = chats.id
+            ),
+            last_role = (
+                SELECT role FROM messages WHERE chat_id = chats.id ORDER BY id DESC LIMIT 1
+            ),
+            last_message_preview = (
+                SELECT substr(t.content, 1, 120) FROM message_texts t
+                WHERE t.id = (SELECT MAX(id) FROM messages WHERE chat_id = chats.id)
+            )
+    """)
+
+    for trigger in CHAT_SUMMARY_TRIGGERS:
+        cursor.execute(trigger)
+
+    # Список чатов снова читается одним индексом
+    cursor.execute("DROP INDEX IF EXISTS idx_chats_updated")
+    cursor.execute("""
+        CREATE INDEX idx_chats_updated ON chats (
+            updated_at DESC, id, title, created_at, model,
+            message_count, total_tokens, last_role, last_message_preview
+        )
+    """)
+
+
+def _v6_archive(cursor: sqlite3.Cursor):
+    """Отметка открытия чата — по ней давно забытые чаты уходят в архив"""
+    cursor.execute("ALTER TABLE chats ADD COLUMN accessed_at TIMESTAMP")
+
+    # Сообщение, возвращённое из архива, может оказаться ниже границы фоновой
+    # индексации — тогда его проиндексирует SearchBackfill, а не триггер
+    cursor.execute("DROP TRIGGER IF EXISTS messages_fts_insert")
+    cursor.execute("""
+        CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages
+        WHEN new.id >= (SELECT value FROM maintenance_state WHERE name = 'messages_backfill_below')
+        BEGIN
+            INSERT INTO messages_fts (rowid, content)
+            SELECT id, content FROM message_texts WHERE id = new.id;
+        END
+    """)
+
+
+BULK_INSERT_KEY = "bulk_insert"
+
+
+def _v7_bulk_insert(cursor: sqlite3.Cursor):
+    """Построчные триггеры вставки отключаются на время пакетного импорта:
+    импорт сам индексирует пачку одним INSERT ... SELECT и пишет счётчики"""
+    cursor.execute("DROP TRIGGER IF EXISTS messages_fts_insert")
+    cursor.execute(f"""
+        CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages
+        WHEN new.id >= (SELECT value FROM maintenance_state WHERE name = 'messages_backfill_below')
+        AND NOT EXISTS (SELECT 1 FROM maintenance_state WHERE name = '{BULK_INSERT_KEY}')
+        BEGIN
+            INSERT INTO messages_fts (rowid, content)
+            SELECT id, content FROM message_texts WHERE id = new.id;
+        END
+    """)
+
+    cursor.execute("DROP TRIGGER IF EXISTS chats_summary_insert")
+    cursor.execute(f"""
+        CREATE TRIGGER chats_summary_insert AFTER INSERT ON messages
+        WHEN NOT EXISTS (SELECT 1 FROM maintenance_state WHERE name = '{BULK_INSERT_KEY}')
+        BEGIN
+            UPDATE chats SET
+                message_count = message_count + 1,
+                total_tokens = total_tokens + COALESCE(new.tokens, 0),
+                last_role = new.role,
+                last_message_preview = (
+                    SELECT substr(content, 1, 120) FROM message_texts WHERE id = new.id
+                )
+            WHERE id = new.chat_id;
+        END
+    """)
+
+
+def _v8_orphans(cursor: sqlite3.Cursor):
+    """Граница очистки сирот — сразу за последним осиротевшим сообщением.
+    Дальше их удаляет OrphanSweeper; новых не будет — foreign_keys включён"""
+    cursor.execute("""
+        INSERT OR REPLACE INTO maintenance_state (name, value)
+        SELECT 'orphans_sweep_below', COALESCE(MAX(id), 0) + 1 FROM messages
+        WHERE NOT EXISTS (SELECT 1 FROM chats WHERE id = messages.chat_id)
+    """)
+    cursor.execute("""
+        DELETE FROM chat_summaries
+        WHERE NOT EXISTS (SELECT 1 FROM chats WHERE id = chat_summaries.chat_id)
+    """)
+
+
+def _v9_chat_page_order(cursor: sqlite3.Cursor):
+    """Порядок индекса списка чатов как в get_chats_page (updated_at DESC, id DESC):
+    страница читается прямо из индекса, без временного B-дерева для id"""
+    cursor.execute("DROP INDEX IF EXISTS idx_chats_updated")
+    cursor.execute("""
+        CREATE INDEX idx_chats_updated ON chats (
+            updated_at DESC, id DESC, title, created_at, model,
+            message_count, total_tokens, last_role, last_message_preview
+        )
+    """)
+
+
+# (версия, описание, функция) — строго по возрастанию версии
+MIGRATIONS = [
+    (1, "baseline schema", _v1_baseline),
+    (2, "indexes for messages and chat list", _v2_indexes),
+    (3, "full-text search", _v3_search),
+    (4, "content-addressed blobs", _v4_blobs),
+    (5, "denormalized chat summary", _v5_chat_summary),
+    (6, "chat archive", _v6_archive),
+    (7, "bulk insert switch", _v7_bulk_insert),
+    (8, "orphaned messages sweep", _v8_orphans),
+    (9, "chat list keyset order", _v9_chat_page_order),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection, target: int = LATEST_VERSION) -> int:
+    """Применить недостающие миграции до target; вернуть итоговую версию"""
+    version = get_version(conn)
+
+    for number, description, apply in MIGRATIONS:
+        if number <= version or number > target:
+            continue
+
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            apply(cursor)
+            # user_version меняется в той же транзакции
+            cursor.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        print(f"[DB] Миграция {number}: {description}")
+        version = number
+
+    return version
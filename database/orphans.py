@@ -0,0 +1,56 @@
+"""
+Фоновая очистка осиротевших сообщений.
+
+До включения PRAGMA foreign_keys каскадное удаление не срабатывало:
+delete_chat удалял строку chats, а сообщения чата оставались в базе
+навсегда. Здесь они удаляются пачками по диапазонам id, от новых к
+старым, вместе с блобами, на которые больше никто не ссылается.
+Новых сирот после миграции не появляется — их не пропустит внешний ключ.
+"""
+
+import sqlite3
+
+from config import Config
+from database import blobs
+from database.background import BatchWorker
+
+SWEEP_KEY = "orphans_sweep_below"
+
+
+def sweep_step(cursor: sqlite3.Cursor, batch_size: int) -> int:
+    """Удалить сирот в одной пачке id; вернуть, сколько id ещё ниже границы"""
+    row = cursor.execute(
+        "SELECT value FROM maintenance_state WHERE name = ?", (SWEEP_KEY,)
+    ).fetchone()
+    below = row[0] if row else 1
+    if below <= 1:
+        return 0
+
+    low = max(1, below - batch_size)
+    orphans = """
+        FROM messages WHERE id >= ? AND id < ?
+        AND NOT EXISTS (SELECT 1 FROM chats WHERE id = messages.chat_id)
+    """
+    cursor.execute(
+        f"SELECT DISTINCT content_hash {orphans} AND content_hash IS NOT NULL", (low, below)
+    )
+    hashes = [r[0] for r in cursor.fetchall()]
+    # Триггеры удаления убирают строки и из поискового индекса
+    cursor.execute(f"DELETE {orphans}", (low, below))
+    blobs.release(cursor, hashes)
+
+    cursor.execute(
+        "UPDATE maintenance_state SET value = ? WHERE name = ?", (low, SWEEP_KEY)
+    )
+    return low - 1
+
+
+class OrphanSweeper(BatchWorker):
+    name = "orphan-sweeper"
+
+    def __init__(self, writer, batch_size: int = Config.ORPHAN_SWEEP_BATCH,
+                 pause: float = Config.ORPHAN_SWEEP_PAUSE):
+        super().__init__(writer, batch_size, pause)
+
+    def step(self, cursor: sqlite3.Cursor) -> int:
+        return sweep_step(cursor, self.batch_size)
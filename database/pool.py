@@ -0,0 +1,93 @@
+"""
+Пул соединений только для чтения.
+
+Чтение (сайдбар, поиск, экспорт, подгрузка истории, фоновые задачи)
+не делит одно соединение: каждый запрос берёт свободное соединение из
+пула и возвращает его. Под WAL читатели работают параллельно друг с
+другом и с потоком записи. Скомпилированные запросы кэшируются в каждом
+соединении (cached_statements), поэтому повторный SQL не разбирается
+заново. stats() показывает долю попаданий в свободное соединение и
+время ожидания, когда все заняты.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class ReadPool:
+    def __init__(self, connect, size: int):
+        """connect() создаёт новое соединение только для чтения"""
+        self._connect = connect
+        self.size = size
+
+        self._idle = []
+        self._all = []
+        # Ждущие потоки получают соединение напрямую в порядке очереди,
+        # иначе новые запросы перехватывают его и ожидание растягивается
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+        self.borrows = 0
+        self.hits = 0
+        self.waits = 0
+        self.wait_time = 0.0
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def _acquire(self) -> sqlite3.Connection:
+        with self._lock:
+            self.borrows += 1
+            if self._idle:
+                self.hits += 1
+                return self._idle.pop()
+
+            # Свободных нет: открыть ещё одно, пока не достигнут размер пула
+            if len(self._all) < self.size:
+                conn = self._connect()
+                self._all.append(conn)
+                return conn
+
+            waiter = {"event": threading.Event(), "conn": None}
+            self._waiters.append(waiter)
+
+        started = time.perf_counter()
+        waiter["event"].wait()
+        with self._lock:
+            self.waits += 1
+            self.wait_time += time.perf_counter() - started
+        return waiter["conn"]
+
+    def _release(self, conn: sqlite3.Connection):
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter["conn"] = conn
+                waiter["event"].set()
+            else:
+                self._idle.append(conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "connections": len(self._all),
+                "borrows": self.borrows,
+                "hit_rate": self.hits / self.borrows if self.borrows else 0.0,
+                "waits": self.waits,
+                "avg_wait_ms": self.wait_time / self.waits * 1000 if self.waits else 0.0,
+            }
+
+    def close(self):
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+            self._idle.clear()
@@ -0,0 +1,49 @@
+"""
+Фоновое заполнение поискового индекса FTS5.
+
+Новые сообщения индексируют триггеры, а всё, что лежало в базе до
+миграции поиска, дописывается здесь небольшими пачками — от новых
+сообщений к старым, чтобы свежая история находилась первой. Текст
+берётся из представления message_texts, так что сжатые сообщения
+индексируются так же, как обычные.
+"""
+
+import sqlite3
+
+from config import Config
+from database.background import BatchWorker
+
+BACKFILL_KEY = "messages_backfill_below"
+
+
+def backfill_step(cursor: sqlite3.Cursor, batch_size: int) -> int:
+    """Проиндексировать одну пачку; вернуть, сколько id ещё ниже границы"""
+    # Граница и индекс меняются в одной транзакции записи — атомарно
+    # относительно триггеров удаления
+    row = cursor.execute(
+        "SELECT value FROM maintenance_state WHERE name = ?", (BACKFILL_KEY,)
+    ).fetchone()
+    below = row[0] if row else 1
+    if below <= 1:
+        return 0
+
+    low = max(1, below - batch_size)
+    cursor.execute("""
+        INSERT INTO messages_fts (rowid, content)
+        SELECT id, content FROM message_texts WHERE id >= ? AND id < ?
+    """, (low, below))
+    cursor.execute(
+        "UPDATE maintenance_state SET value = ? WHERE name = ?", (low, BACKFILL_KEY)
+    )
+    return low - 1
+
+
+class SearchBackfill(BatchWorker):
+    name = "search-backfill"
+
+    def __init__(self, writer, batch_size: int = Config.SEARCH_BACKFILL_BATCH,
+                 pause: float = Config.SEARCH_BACKFILL_PAUSE):
+        super().__init__(writer, batch_size, pause)
+
+    def step(self, cursor: sqlite3.Cursor) -> int:
+        return backfill_step(cursor, self.batch_size)
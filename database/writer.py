@@ -0,0 +1,149 @@
+"""
+Единственный поток записи в SQLite.
+
+Все изменения базы проходят через очередь DatabaseWriter: поток забирает
+накопившиеся за короткое окно записи и применяет их одной транзакцией
+(group commit) — вместо коммита на каждое сообщение. Каждая запись
+выполняется в своём SAVEPOINT, так что ошибка одной не откатывает
+соседние. Вызывающий получает concurrent.futures.Future: результат
+появляется после COMMIT, поэтому .result() — это ожидание сохранения.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from config import Config
+
+_STOP = object()
+
+
+class DatabaseWriter:
+    def __init__(self, conn: sqlite3.Connection,
+                 window: float = Config.DB_WRITE_WINDOW,
+                 max_batch: int = Config.DB_WRITE_MAX_BATCH):
+        # Соединение принадлежит потоку записи; транзакциями управляем сами
+        self.conn = conn
+        self.conn.isolation_level = None
+        self.window = window
+        self.max_batch = max_batch
+
+        self.queue = queue.Queue()
+        # Под замком: после stop() ни одна запись не встанет за _STOP
+        self._lock = threading.Lock()
+        self._closed = False
+        self.batches = 0
+        self.writes = 0
+        self.failed = 0             # групп, откатившихся целиком
+
+        self.thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, fn, *args) -> Future:
+        """Поставить запись в очередь; fn(cursor, *args) выполнится в потоке записи"""
+        future = Future()
+        with self._lock:
+            if not self._closed and self.thread.is_alive():
+                self.queue.put((fn, args, future))
+                return future
+        future.set_exception(RuntimeError("Поток записи остановлен"))
+        return future
+
+    def stop(self):
+        """Дописать очередь и остановить поток"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self.queue.put(_STOP)
+        self.thread.join()
+        self._fail_leftovers()
+
+    def _fail_leftovers(self):
+        """Записи, оставшиеся в очереди после остановки, — с ошибкой, а не вечным ожиданием"""
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is _STOP:
+                continue
+            future = item[2]
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("Поток записи остановлен"))
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+
+            # Собрать всё, что пришло за окно, в одну транзакцию
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._commit(batch)
+
+    def _commit(self, batch: list):
+        cursor = self.conn.cursor()
+        done = []
+
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for fn, args, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                cursor.execute("SAVEPOINT write")
+                try:
+                    done.append((future, fn(cursor, *args), None))
+                    cursor.execute("RELEASE write")
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO write")
+                    cursor.execute("RELEASE write")
+                    done.append((future, None, e))
+            cursor.execute("COMMIT")
+        except sqlite3.Error as e:
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            self.failed += 1
+            # Группа не сохранена целиком: ошибку получают все её записи,
+            # в том числе те, до которых не дошло (BEGIN не удался)
+            for _, _, future in batch:
+                if future.done():
+                    continue
+                if future.running() or future.set_running_or_notify_cancel():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.writes += len(done)
+
+        for future, result, error in done:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "writes": self.writes,
+            "batches": self.batches,
+            "per_batch": self.writes / self.batches if self.batches else 0.0,
+            "failed": self.failed,
+        }
@@ -1,13 +1,28 @@
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
-from threading import Thread
-import time
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from config import Config
-from api.openrouter import OpenRouterAPI
+from api.openrouter import OpenRouterAPI, APIError
+from api.router import ModelRouter
+from api.telemetry import Telemetry
+from api.cache import ResponseCache
+from api.context import ContextBudgeter
+from api.summarizer import ConversationSummarizer
+from api.event_loop import get_event_loop_thread
+from api.cancellation import CancelToken
 from database.db_manager import DatabaseManager
+from database.search_index import SearchBackfill
+from database.compaction import ContentCompactor
+from database.archive import ChatArchiver
+from database.orphans import OrphanSweeper
 from utils.export import ExportManager
+from utils.importer import ChatImporter
 from ui.sidebar import Sidebar
 from ui.chat_frame import ChatFrame
+from ui.streaming import StreamRenderer
 from ui.settings_window import SettingsWindow
 
 
@@ -18,9 +33,35 @@ class App(ctk.CTk):
         Config.init()
         self.settings = Config.load_settings()
         self.db = DatabaseManager()
+        self.telemetry = Telemetry(self.db)
+        self.cache = ResponseCache(self.db)
+        # Сообщения, сохранённые до появления поиска, индексируются в фоне
+        self.search_backfill = SearchBackfill(self.db.writer)
+        self.search_backfill.start()
+        self.compactor = ContentCompactor(self.db.writer)
+        self.compactor.start()
+        # Сообщения удалённых чатов, оставшиеся до включения внешних ключей
+        self.orphan_sweeper = OrphanSweeper(self.db.writer)
+        self.orphan_sweeper.start()
+        # Давно не открывавшиеся чаты уходят в отдельный файл архива
+        self.archiver = None
+        if self.settings.get("archive_after_days", 90) > 0:
+            self.archiver = ChatArchiver(self.db.writer, self.settings["archive_after_days"])
+            self.archiver.start()
+        self.loop_thread = get_event_loop_thread()
+        # Чтение открываемого чата — вне потока Tk; устаревшие загрузки
+        # отбрасываются по номеру поколения
+        self.chat_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-load")
+        self.load_generation = 0
+        self.loading_chat = False   # пока чат не показан, отправка недоступна
+        self.shown_chat_id = None   # чей вид сейчас в окне сообщений
         self.api = None
+        self.router = None
+        self.summarizer = None
         self.current_chat_id = None
         self.is_processing = False
+        self.cancel_token = None
+        self.generating_chat_id = None
 
         self.title(f"🤖 {Config.APP_NAME}")
         self.geometry("1300x850")
@@ -50,65 +91,252 @@ class App(ctk.CTk):
         self.chat_frame.grid(row=0, column=1, sticky="nsew")
 
     def init_api(self):
+        if self.api:
+            self.api.close()
         if self.settings.get("api_key"):
-            self.api = OpenRouterAPI(self.settings["api_key"])
+            self.api = OpenRouterAPI(self.settings["api_key"], telemetry=self.telemetry)
+            self.router = ModelRouter(self.api, telemetry=self.telemetry)
+            self.summarizer = ConversationSummarizer(self.api, self.db)
         else:
             self.api = None
+            self.router = None
+            self.summarizer = None
 
     # === ЧАТЫ ===
 
     def new_chat(self) -> int:
         """Создать новый чат"""
+        self.stop_generation()
         chat_id = self.db.create_chat(
             model=self.settings.get("model", ""),
             system_prompt=self.settings.get("system_prompt", "")
         )
         self.current_chat_id = chat_id
+        self.shown_chat_id = chat_id
+        self._end_load()
         self.chat_frame.clear_messages()
         self.chat_frame.set_title("Новый чат", self.settings.get("model", ""))
         self.refresh_chat_list()
         return chat_id
 
-    def load_chat(self, chat_id: int):
+    def load_chat(self, chat_id: int, then=None):
+        """
+        Открыть чат. Чтение базы идёт в фоновом потоке, результат
+        показывается через after; then() вызывается после показа. Если
+        за это время открыли другой чат, прежняя загрузка отбрасывается.
+        До показа отправка недоступна: сообщение попало бы в прежний вид,
+        который показ затем очистит.
+        """
+        if chat_id != self.current_chat_id:
+            self.stop_generation()
         self.current_chat_id = chat_id
+        self.load_generation += 1
+        generation = self.load_generation
+        self.loading_chat = True
+        self.chat_frame.set_loading(True)
+        # Подсветка в списке — сразу, не дожидаясь сообщений
+        self.sidebar.set_active(chat_id)
+
+        future = self.chat_loader.submit(self._fetch_chat, chat_id, generation)
+        future.add_done_callback(
+            lambda f: self.after(0, self._show_chat, chat_id, generation, f, then)
+        )
+
+    def _fetch_chat(self, chat_id: int, generation: int):
+        """Фоновый поток: чат и последняя страница его сообщений"""
+        if generation != self.load_generation:
+            return None
         chat = self.db.get_chat(chat_id)
+        restored = chat is None and self.db.restore_chat(chat_id).result()
+        if restored:
+            # Чат был в архиве — вернулся в основную базу целиком
+            chat = self.db.get_chat(chat_id)
+        if not chat:
+            return None, [], restored
+
+        self.db.touch_chat(chat_id)
+        # Только последняя страница; старые подгружаются при прокрутке вверх
+        messages = self.db.get_messages_page(chat_id)
+        return chat, messages, restored
+
+    def _end_load(self):
+        """Текущая загрузка больше не нужна (показана или чат сменился)"""
+        self.load_generation += 1
+        self.loading_chat = False
+        self.chat_frame.set_loading(False)
+
+    def _show_chat(self, chat_id: int, generation: int, future, then):
+        if generation != self.load_generation or future.cancelled():
+            return  # пока читали, открыли другой чат
+        self._end_load()
+        if future.exception():
+            print(f"[APP] Ошибка загрузки чата {chat_id}: {future.exception()!r}")
+            return
 
-        if chat:
+        chat, messages, restored = future.result()
+        if chat is None:
+            # Чат удалили, пока он загружался
+            self.current_chat_id = self.shown_chat_id = None
+            self.chat_frame.clear_messages()
+            self.chat_frame.set_title("✨ Новый диалог", "")
+        elif self.generating_chat_id == chat_id == self.shown_chat_id:
+            # В этом чате идёт ответ и его пузырь на экране — вид не трогаем
+            self.chat_frame.set_title(chat["title"], chat.get("model", ""))
+        else:
+            self.shown_chat_id = chat_id
             self.chat_frame.set_title(chat["title"], chat.get("model", ""))
             self.chat_frame.clear_messages()
+            self.chat_frame.show_history(
+                messages, has_older=len(messages) == Config.MESSAGE_PAGE_SIZE
+            )
 
-            # Скрыть приветствие если есть сообщения
-            messages = self.db.get_messages(chat_id)
-            for msg in messages:
-                self.chat_frame.add_message(msg["role"], msg["content"])
+        if restored or chat is None:
+            self.refresh_chat_list()
+        if chat and then:
+            then()
 
-        self.refresh_chat_list()
+    def load_older_messages(self):
+        chat_id = self.current_chat_id
+        before_id = self.chat_frame.oldest_message_id
+        if not chat_id or before_id is None:
+            return
+
+        messages = self.db.get_messages_page(chat_id, before_id=before_id)
+        self.chat_frame.prepend_history(
+            messages, has_older=len(messages) == Config.MESSAGE_PAGE_SIZE
+        )
+
+    # === ПОИСК ===
+
+    def search(self, query: str) -> list:
+        return self.db.search(query)
+
+    def open_search_result(self, chat_id: int, message_id: int = None):
+        reveal = (lambda: self._reveal_message(message_id)) if message_id is not None else None
+        if chat_id != self.current_chat_id or self.chat_frame.oldest_message_id is None:
+            self.load_chat(chat_id, then=reveal)
+        elif reveal:
+            reveal()
+
+    def _reveal_message(self, message_id: int):
+        chat_id = self.current_chat_id
+        before_id = self.chat_frame.oldest_message_id
+        if not self.chat_frame.has_older or before_id is None or before_id <= message_id:
+            self.chat_frame.scroll_to_message(message_id)
+            return
+
+        # Всё от найденного сообщения до показанных — одним чтением в фоне,
+        # а не постранично в потоке интерфейса
+        generation = self.load_generation
+        future = self.chat_loader.submit(self._fetch_range, chat_id, message_id, before_id)
+        future.add_done_callback(
+            lambda f: self.after(0, self._show_range, chat_id, generation, message_id, f)
+        )
+
+    def _fetch_range(self, chat_id: int, from_id: int, before_id: int):
+        """Фоновый поток: сообщения from_id..before_id и есть ли ещё старее"""
+        messages = self.db.get_messages_range(chat_id, from_id, before_id)
+        return messages, self.db.has_messages_before(chat_id, from_id)
+
+    def _show_range(self, chat_id: int, generation: int, message_id: int, future):
+        if (generation != self.load_generation or chat_id != self.shown_chat_id
+                or future.cancelled()):
+            return  # пока читали, открыли другой чат
+        if future.exception():
+            print(f"[APP] Ошибка загрузки сообщений: {future.exception()!r}")
+            return
+
+        messages, has_older = future.result()
+        # Прокрутка вверх могла тем временем дорисовать часть диапазона
+        oldest = self.chat_frame.oldest_message_id
+        if oldest is not None:
+            messages = [m for m in messages if m["id"] < oldest]
+        if messages:
+            self.chat_frame.prepend_history(messages, has_older=has_older)
+        self.chat_frame.scroll_to_message(message_id)
 
     def delete_chat(self, chat_id: int):
         if messagebox.askyesno("Удаление", "Удалить этот чат?"):
-            self.db.delete_chat(chat_id)
-            if self.current_chat_id == chat_id:
-                self.current_chat_id = None
-                self.chat_frame.clear_messages()
-                self.chat_frame.set_title("✨ Новый диалог", "")
-            self.refresh_chat_list()
+            self._delete_chats([chat_id])
+
+    def delete_selected_chats(self, chat_ids: list):
+        if chat_ids and messagebox.askyesno("Удаление", f"Удалить выбранные чаты ({len(chat_ids)})?"):
+            self._delete_chats(chat_ids)
+            self.sidebar.set_select_mode(False)
+
+    def _delete_chats(self, chat_ids: list):
+        if self.generating_chat_id in chat_ids:
+            self.stop_generation()
+        if self.summarizer:
+            for chat_id in chat_ids:
+                self.summarizer.cancel(chat_id)
+        # Открытый чат закрывается сразу, список обновится после коммита —
+        # каскадное удаление многих чатов не держит интерфейс
+        if self.current_chat_id in chat_ids:
+            self.current_chat_id = self.shown_chat_id = None
+            self._end_load()
+            self.chat_frame.clear_messages()
+            self.chat_frame.set_title("✨ Новый диалог", "")
+        future = self.db.delete_chats(chat_ids)
+        future.add_done_callback(lambda f: self.after(0, self._chats_deleted, chat_ids, f))
+
+    def _chats_deleted(self, chat_ids: list, future):
+        if future.exception():
+            print(f"[APP] Ошибка удаления чатов: {future.exception()!r}")
+        else:
+            self.sidebar.forget_chats(chat_ids)
+        self.refresh_chat_list()
 
     def clear_current_chat(self):
         if self.current_chat_id:
+            if self.summarizer:
+                self.summarizer.cancel(self.current_chat_id)
             self.db.clear_messages(self.current_chat_id)
             self.chat_frame.clear_messages()
 
     def refresh_chat_list(self):
-        chats = self.db.get_all_chats()
-        self.sidebar.refresh_chats(chats, self.current_chat_id)
+        """Перечитать уже подгруженную часть истории (первые страницы)"""
+        limit = self.sidebar.page_limit()
+        chats = self.db.get_chats_page(limit=limit)
+        self.sidebar.refresh_chats(chats, self.current_chat_id, limit)
+
+    def load_more_chats(self):
+        """Следующая страница истории — когда список докрутили до конца"""
+        chats = self.db.get_chats_page(after=self.sidebar.cursor(self.sidebar.chats))
+        self.sidebar.append_chats(chats, Config.CHAT_PAGE_SIZE)
+
+    def load_archived_chats(self):
+        """Архив читается, только когда список докрутили до него"""
+        chats = self.db.get_chats_page(
+            after=self.sidebar.cursor(self.sidebar.archive_chats or []), archived=True
+        )
+        self.sidebar.show_archived_chats(chats, Config.CHAT_PAGE_SIZE)
 
     # === СООБЩЕНИЯ ===
 
-    def process_message(self, message: str):
-        """Обработка сообщения"""
+    def send_message(self, message: str, compare: bool = False):
+        """Передать сообщение в фоновый event loop"""
+        if compare:
+            future = self.loop_thread.submit(self.process_compare(message))
+        else:
+            future = self.loop_thread.submit(self.process_message(message))
+        future.add_done_callback(self._on_task_done)
+
+    def _on_task_done(self, future):
+        if not future.cancelled() and future.exception():
+            print(f"[APP] Ошибка фоновой задачи: {future.exception()!r}")
+            self.is_processing = False
+            self.after(0, self.chat_frame.enable_input)
+
+    def stop_generation(self):
+        """Остановить текущую генерацию (полученный текст сохранится)"""
+        if self.cancel_token:
+            self.cancel_token.cancel()
 
+    def _begin_turn(self):
+        """Проверки перед отправкой; вернуть id чата или None"""
         if self.is_processing:
-            return
+            return None
 
         self.is_processing = True
 
@@ -118,82 +346,205 @@ class App(ctk.CTk):
             ))
             self.after(0, self.chat_frame.enable_input)
             self.is_processing = False
-            return
+            return None
 
         chat_id = self.current_chat_id
 
         if not chat_id:
             self.after(0, self.chat_frame.enable_input)
             self.is_processing = False
-            return
+            return None
+
+        return chat_id
+
+    def _schedule_summary(self, chat_id: int):
+        # Сохранение настроек могло пересоздать API и сбросить summarizer
+        summarizer = self.summarizer
+        if summarizer is not None:
+            summarizer.schedule(chat_id)
+
+    def _end_turn(self):
+        self.cancel_token = None
+        self.generating_chat_id = None
+        self.after(0, self.chat_frame.enable_input)
+        self.is_processing = False
 
-        # Добавить сообщение пользователя
+    async def _add_user_message(self, chat_id: int, message: str) -> tuple:
+        """Сохранить сообщение пользователя; вернуть (чат, резюме, несвёрнутые сообщения)"""
         self.after(0, lambda: self.chat_frame.add_message("user", message))
-        self.db.add_message(chat_id, "user", message)
+        await asyncio.wrap_future(self.db.add_message(chat_id, "user", message))
+        chat, summary, recent = await asyncio.to_thread(self._read_turn, chat_id)
 
-        # Обновить заголовок
-        messages = self.db.get_messages(chat_id)
-        if len(messages) == 1:
+        # Первое сообщение чата становится его заголовком
+        if chat and chat["message_count"] == 1:
             title = message[:40] + "..." if len(message) > 40 else message
-            self.db.update_chat_title(chat_id, title)
+            await asyncio.wrap_future(self.db.update_chat_title(chat_id, title))
             model = self.settings.get("model", "")
             self.after(0, lambda: self.chat_frame.set_title(title, model))
             self.after(0, self.refresh_chat_list)
 
-        # Подготовить API сообщения
+        return chat, summary, recent
+
+    def _read_turn(self, chat_id: int) -> tuple:
+        """Чтение для ответа (в потоке-исполнителе, не в event loop): свёрнутая
+        часть истории приходит резюме, из сообщений — только те, что после него"""
         chat = self.db.get_chat(chat_id)
+        summary = self.db.get_summary(chat_id)
+        covered_until = summary["covered_until"] if summary else 0
+        return chat, summary, self.db.get_messages_after(chat_id, covered_until)
 
-        api_messages = []
+    def _history_fitter(self, chat: dict, summary: dict, recent: list, max_tokens: int):
+        """Подготовить API сообщения: системный промпт + окно истории под контекст модели"""
         system_prompt = self.settings.get("system_prompt", "")
         if chat and chat.get("system_prompt"):
             system_prompt = chat["system_prompt"]
-        if system_prompt:
-            api_messages.append({"role": "system", "content": system_prompt})
 
-        for msg in messages:
-            api_messages.append({"role": msg["role"], "content": msg["content"]})
+        budgeter = ContextBudgeter(max_tokens)
+
+        def fit(model_id: str) -> list:
+            return budgeter.fit(system_prompt, recent, model_id,
+                                summary=summary["summary"] if summary else None)
+
+        return fit
+
+    async def _save_reply(self, chat_id: int, text: str, model: str,
+                          compare: bool = False) -> bool:
+        """Сохранить ответ (после остановки — то, что успело прийти).
+        Ответ из сравнения не меняет модель чата"""
+        if text and not any(text.startswith(x) for x in ["❌", "🔑", "🚫", "⚡", "⚠️"]):
+            try:
+                await asyncio.wrap_future(
+                    self.db.add_message(chat_id, "assistant", text, model=model,
+                                        chat_model=not compare)
+                )
+                return True
+            except sqlite3.IntegrityError:
+                # Чат удалили, пока шёл ответ
+                pass
+        return False
+
+    async def process_message(self, message: str):
+        """Обработка сообщения (выполняется в фоновом event loop)"""
+
+        chat_id = self._begin_turn()
+        if not chat_id:
+            return
+
+        token = CancelToken()
+        self.cancel_token = token
+        self.generating_chat_id = chat_id
 
-        # Создать placeholder
-        label_holder = {"label": None}
+        chat, summary, recent = await self._add_user_message(chat_id, message)
 
-        def create_placeholder():
-            _, label = self.chat_frame.add_streaming_message()
-            label_holder["label"] = label
+        max_tokens = self.settings.get("max_tokens", 2048)
+        temperature = self.settings.get("temperature", 0.7)
+        fit = self._history_fitter(chat, summary, recent, max_tokens)
 
-        self.after(0, create_placeholder)
-        time.sleep(0.2)
+        # Создать placeholder; куски, пришедшие раньше него, renderer придержит
+        renderer = StreamRenderer(self)
+        self.after(0, lambda: self.chat_frame.add_streaming_message(renderer))
 
         # Получить ответ
         full_response = ""
         model = self.settings.get("model", "mistralai/mistral-7b-instruct:free")
+        if model == Config.AUTO_MODEL:
+            model = await self.telemetry.fastest_model()
+        route = {"model": model}
+        api_messages = fit(model)
+
+        if self.settings.get("auto_failover", True):
+            # Запасная модель может иметь меньшее окно — история подгоняется заново
+            stream = self.router.astream(
+                api_messages,
+                model,
+                max_tokens,
+                temperature,
+                cancel_token=token,
+                route=route,
+                fit=fit
+            )
+        else:
+            stream = self.api.astream_deltas(
+                api_messages,
+                model,
+                max_tokens,
+                temperature,
+                cancel_token=token
+            )
+
+        if ResponseCache.applies(temperature, self.settings):
+            key = ResponseCache.make_key(model, api_messages, max_tokens, temperature)
+            stream = self.cache.astream(key, stream, cancel_token=token, route=route)
 
         try:
-            for chunk in self.api.chat_stream(
-                    api_messages,
-                    model,
-                    self.settings.get("max_tokens", 2048),
-                    self.settings.get("temperature", 0.7)
-            ):
+            async for chunk in stream:
                 full_response += chunk
-                text = full_response
-
-                if label_holder["label"]:
-                    self.after(0, lambda t=text:
-                    self.chat_frame.update_streaming_message(label_holder["label"], t))
+                renderer.push(chunk)
+        except APIError as e:
+            full_response = f"{full_response}\n{e.message}" if full_response else e.message
         except Exception as e:
             full_response = f"❌ Ошибка: {str(e)}"
 
         # Финализация
-        if label_holder["label"]:
-            self.after(0, lambda:
-            self.chat_frame.finalize_streaming_message(label_holder["label"], full_response))
+        shown = full_response
+        if token.cancelled and not full_response:
+            shown = "⏹ Генерация остановлена"
+        renderer.finish(shown)
 
-        # Сохранить
-        if full_response and not any(full_response.startswith(x) for x in ["❌", "🔑", "🚫", "⚡", "⚠️"]):
-            self.db.add_message(chat_id, "assistant", full_response)
+        if await self._save_reply(chat_id, full_response, route["model"]):
+            self._schedule_summary(chat_id)
 
-        self.after(0, self.chat_frame.enable_input)
-        self.is_processing = False
+        # Ответила другая модель — показать какая
+        if route["model"] != self.settings.get("model") and self.current_chat_id == chat_id:
+            self.after(0, lambda: self.chat_frame.set_model(route["model"]))
+
+        self._end_turn()
+
+    async def process_compare(self, message: str):
+        """Один запрос сразу в несколько моделей: ответы стримятся параллельно"""
+
+        chat_id = self._begin_turn()
+        if not chat_id:
+            return
+
+        token = CancelToken()
+        self.cancel_token = token
+        self.generating_chat_id = chat_id
+
+        chat, summary, recent = await self._add_user_message(chat_id, message)
+
+        models = self.settings.get("compare_models") or list(Config.FREE_MODELS.values())[:3]
+        max_tokens = self.settings.get("max_tokens", 2048)
+        temperature = self.settings.get("temperature", 0.7)
+        fit = self._history_fitter(chat, summary, recent, max_tokens)
+
+        # Колонка под каждую модель
+        renderers = {model: StreamRenderer(self) for model in models}
+        self.after(0, lambda: self.chat_frame.add_compare_messages(models, renderers))
+
+        semaphore = asyncio.Semaphore(Config.COMPARE_MAX_CONCURRENCY)
+
+        async def run(model: str) -> bool:
+            response = ""
+            async with semaphore:
+                try:
+                    async for chunk in self.api.astream_deltas(
+                            fit(model), model, max_tokens, temperature, token):
+                        response += chunk
+                        renderers[model].push(chunk)
+                except APIError as e:
+                    response = f"{response}\n{e.message}" if response else e.message
+                except Exception as e:
+                    response = f"❌ Ошибка: {str(e)}"
+
+            renderers[model].finish(response or "⏹ Генерация остановлена")
+            return await self._save_reply(chat_id, response, model, compare=True)
+
+        saved = await asyncio.gather(*(run(model) for model in models))
+        if any(saved):
+            self._schedule_summary(chat_id)
+
+        self._end_turn()
 
     # === ЭКСПОРТ ===
 
@@ -265,6 +616,117 @@ class App(ctk.CTk):
                 font=ctk.CTkFont(size=14)
             ).pack(fill="x", pady=5)
 
+    # === ИМПОРТ ===
+
+    def import_chats(self):
+        source_window = ctk.CTkToplevel(self)
+        source_window.title("📤 Импорт")
+        source_window.geometry("350x220")
+        source_window.transient(self)
+        source_window.grab_set()
+        source_window.configure(fg_color=("#f8fafc", "#12121f"))
+
+        ctk.CTkLabel(
+            source_window,
+            text="📤 Откуда импортировать",
+            font=ctk.CTkFont(size=20, weight="bold"),
+            text_color=("gray10", "#e2e8f0")
+        ).pack(pady=(30, 20))
+
+        def choose(kind):
+            source_window.destroy()
+            if kind == "files":
+                paths = list(filedialog.askopenfilenames(
+                    filetypes=[("JSON", "*.json *.jsonl *.ndjson")]
+                ))
+            else:
+                folder = filedialog.askdirectory()
+                paths = [folder] if folder else []
+            if paths:
+                self._run_import(paths)
+
+        for text, kind in (("📄 Файлы JSON / JSONL", "files"), ("📁 Папка с экспортами", "folder")):
+            ctk.CTkButton(
+                source_window,
+                text=text,
+                command=lambda k=kind: choose(k),
+                height=45,
+                corner_radius=12,
+                fg_color=("#6366f1", "#6366f1"),
+                hover_color=("#4f46e5", "#4f46e5"),
+                font=ctk.CTkFont(size=14)
+            ).pack(fill="x", padx=30, pady=5)
+
+    def _run_import(self, paths: list):
+        """Импорт в отдельном потоке; окно показывает прогресс и позволяет прервать"""
+        window = ctk.CTkToplevel(self)
+        window.title("📤 Импорт")
+        window.geometry("380x200")
+        window.transient(self)
+        window.configure(fg_color=("#f8fafc", "#12121f"))
+
+        ctk.CTkLabel(
+            window,
+            text="📤 Импорт чатов...",
+            font=ctk.CTkFont(size=18, weight="bold"),
+            text_color=("gray10", "#e2e8f0")
+        ).pack(pady=(25, 15))
+
+        bar = ctk.CTkProgressBar(window, progress_color="#6366f1")
+        bar.pack(fill="x", padx=30)
+        bar.set(0)
+
+        status = ctk.CTkLabel(window, text="", font=ctk.CTkFont(size=12),
+                              text_color=("gray40", "#94a3b8"))
+        status.pack(pady=10)
+
+        def show(done, total, chats, messages):
+            if window.winfo_exists():
+                bar.set(done / total if total else 1)
+                status.configure(text=f"Чатов: {chats:,} · сообщений: {messages:,}")
+
+        importer = ChatImporter(
+            self.db,
+            progress=lambda *p: self.after(0, lambda: show(*p))
+        )
+
+        ctk.CTkButton(
+            window,
+            text="Прервать",
+            command=importer.cancel,
+            width=120,
+            fg_color="transparent",
+            border_width=1,
+            text_color=("gray40", "#94a3b8")
+        ).pack()
+        # Прерванный импорт продолжится с того же места при следующем запуске
+        window.protocol("WM_DELETE_WINDOW", importer.cancel)
+
+        def finish(result):
+            if window.winfo_exists():
+                window.destroy()
+            self.refresh_chat_list()
+            stopped = "Импорт прерван" if result["cancelled"] else "Импорт завершён"
+            messagebox.showinfo("📤 Импорт",
+                                f"{stopped}\nЧатов: {result['chats']:,}\n"
+                                f"Сообщений: {result['messages']:,}\n"
+                                f"Пропущено записей: {result['skipped']:,}")
+
+        def fail(error):
+            if window.winfo_exists():
+                window.destroy()
+            self.refresh_chat_list()
+            messagebox.showerror("Ошибка импорта", str(error))
+
+        def work():
+            try:
+                result = importer.run(paths)
+                self.after(0, lambda: finish(result))
+            except Exception as e:
+                self.after(0, lambda: fail(e))
+
+        threading.Thread(target=work, name="chat-import", daemon=True).start()
+
     # === НАСТРОЙКИ ===
 
     def open_settings(self):
@@ -278,5 +740,25 @@ class App(ctk.CTk):
         self.init_api()
 
     def on_closing(self):
+        self.stop_generation()
+        if self.api:
+            stats = self.api.connection_stats()
+            print(f"[API] Connections: {stats['opened']} opened, {stats['reused']} reused")
+            self.api.close()
+        cache_stats = self.cache.stats()
+        print(f"[CACHE] Hits: {cache_stats['hits']}, misses: {cache_stats['misses']}")
+        self.chat_loader.shutdown(wait=False, cancel_futures=True)
+        self.loop_thread.stop()
+        self.search_backfill.stop()
+        self.compactor.stop()
+        self.orphan_sweeper.stop()
+        if self.archiver:
+            self.archiver.stop()
+        pool_stats = self.db.pool.stats()
+        print(f"[DB] Read pool: {pool_stats['borrows']} borrows, "
+              f"hit rate {pool_stats['hit_rate']:.0%}, avg wait {pool_stats['avg_wait_ms']:.1f} ms")
+        writer_stats = self.db.writer.stats()
+        print(f"[DB] Writer: {writer_stats['writes']} writes in {writer_stats['batches']} batches, "
+              f"{writer_stats['failed']} failed")
         self.db.close()
         self.destroy()
\ No newline at end of file
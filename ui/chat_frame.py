@@ -1,6 +1,7 @@
 import customtkinter as ctk
-from threading import Thread
-from datetime import datetime
+
+from config import Config
+from ui.message_list import MessageList, short_model_name
 
 
 class ChatFrame(ctk.CTkFrame):
@@ -8,6 +9,14 @@ class ChatFrame(ctk.CTkFrame):
         super().__init__(parent, fg_color="transparent")
         self.app = app
 
+        # Подгрузка истории страницами: id самого старого показанного сообщения
+        self.oldest_message_id = None
+        self.has_older = False
+        self.loading_older = False
+        # Страница рисуется порциями: сначала новые, старшие — следующими тактами
+        self._pending = []
+        self._pending_job = None
+
         # Цветовая схема
         self.colors = {
             "user_bubble": "#6366f1",  # Индиго
@@ -61,6 +70,16 @@ class ChatFrame(ctk.CTkFrame):
         )
         self.model_badge.pack(side="right", pady=20)
 
+        # Режим сравнения: один вопрос — ответы нескольких моделей рядом
+        self.compare_var = ctk.BooleanVar(value=False)
+        ctk.CTkSwitch(
+            header_right,
+            text="⚖️ Сравнение",
+            variable=self.compare_var,
+            font=ctk.CTkFont(size=12),
+            progress_color=("#8b5cf6", "#7c3aed")
+        ).pack(side="right", padx=(0, 16), pady=20)
+
         # === ОБЛАСТЬ СООБЩЕНИЙ ===
         self.messages_container = ctk.CTkFrame(
             self,
@@ -69,17 +88,18 @@ class ChatFrame(ctk.CTkFrame):
         )
         self.messages_container.pack(fill="both", expand=True)
 
-        self.messages_frame = ctk.CTkScrollableFrame(
+        # Виджеты есть только у сообщений рядом с видимой областью
+        self.message_list = MessageList(
             self.messages_container,
-            fg_color="transparent",
-            scrollbar_button_color=("#c7d2fe", "#4338ca"),
-            scrollbar_button_hover_color=("#a5b4fc", "#6366f1")
+            self.colors,
+            on_scroll=self._on_scroll,
+            fg_color=("gray98", "#0f0f1a"),
+            corner_radius=0
         )
-        self.messages_frame.pack(fill="both", expand=True, padx=30, pady=20)
+        self.message_list.pack(fill="both", expand=True, padx=30, pady=20)
 
-        # Приветственное сообщение
-        self.welcome_frame = ctk.CTkFrame(self.messages_frame, fg_color="transparent")
-        self.welcome_frame.pack(expand=True, pady=100)
+        # Приветственное сообщение поверх пустого списка
+        self.welcome_frame = ctk.CTkFrame(self.messages_container, fg_color="transparent")
 
         ctk.CTkLabel(
             self.welcome_frame,
@@ -100,6 +120,7 @@ class ChatFrame(ctk.CTkFrame):
             font=ctk.CTkFont(size=14),
             text_color=("gray50", "#64748b")
         ).pack()
+        self._show_welcome()
 
         # === ПАНЕЛЬ ВВОДА ===
         self.input_container = ctk.CTkFrame(
@@ -182,155 +203,144 @@ class ChatFrame(ctk.CTkFrame):
 
     def set_title(self, title: str, model: str = ""):
         self.chat_title_label.configure(text=f"💬 {title}")
-        if model:
-            short_model = model.split("/")[-1].replace(":free", "").replace("-instruct", "")
-            self.model_badge.configure(text=f"🤖 {short_model}")
-        else:
-            self.model_badge.configure(text="")
-
-    def add_message(self, role: str, content: str):
-        """Добавить сообщение с современным дизайном"""
+        self.set_model(model)
 
-        # Скрыть приветствие
-        if self.welcome_frame.winfo_exists():
-            self.welcome_frame.destroy()
-
-        is_user = role == "user"
-
-        # Основной контейнер сообщения
-        msg_container = ctk.CTkFrame(
-            self.messages_frame,
-            fg_color="transparent"
-        )
-        msg_container.pack(fill="x", pady=12)
+    @staticmethod
+    def short_model_name(model: str) -> str:
+        return short_model_name(model)
 
-        # Внутренний контейнер для выравнивания
-        inner_container = ctk.CTkFrame(msg_container, fg_color="transparent")
-
-        if is_user:
-            inner_container.pack(anchor="e")
+    def set_model(self, model: str = ""):
+        if model:
+            self.model_badge.configure(text=f"🤖 {self.short_model_name(model)}")
         else:
-            inner_container.pack(anchor="w")
-
-        # Аватар + сообщение
-        msg_row = ctk.CTkFrame(inner_container, fg_color="transparent")
-        msg_row.pack(fill="x")
-
-        if not is_user:
-            # Аватар AI слева
-            avatar_frame = ctk.CTkFrame(
-                msg_row,
-                width=40,
-                height=40,
-                corner_radius=20,
-                fg_color=("#8b5cf6", "#7c3aed")
-            )
-            avatar_frame.pack(side="left", padx=(0, 12))
-            avatar_frame.pack_propagate(False)
-
-            ctk.CTkLabel(
-                avatar_frame,
-                text="🤖",
-                font=ctk.CTkFont(size=18)
-            ).place(relx=0.5, rely=0.5, anchor="center")
-
-        # Пузырь сообщения
-        bubble = ctk.CTkFrame(
-            msg_row,
-            fg_color=(
-                (self.colors["user_bubble"], self.colors["user_bubble_dark"])
-                if is_user else
-                (self.colors["ai_bubble_light"], self.colors["ai_bubble"])
-            ),
-            corner_radius=18
-        )
-        bubble.pack(side="right" if is_user else "left")
-
-        # Текст сообщения
-        text_label = ctk.CTkLabel(
-            bubble,
-            text=content,
-            wraplength=450,
-            justify="left",
-            font=ctk.CTkFont(family="Segoe UI", size=14),
-            text_color="white" if is_user else ("gray10", "#e2e8f0"),
-            padx=16,
-            pady=12
-        )
-        text_label.pack()
-
-        if is_user:
-            # Аватар пользователя справа
-            avatar_frame = ctk.CTkFrame(
-                msg_row,
-                width=40,
-                height=40,
-                corner_radius=20,
-                fg_color=("#6366f1", "#4f46e5")
-            )
-            avatar_frame.pack(side="right", padx=(12, 0))
-            avatar_frame.pack_propagate(False)
-
-            ctk.CTkLabel(
-                avatar_frame,
-                text="👤",
-                font=ctk.CTkFont(size=18)
-            ).place(relx=0.5, rely=0.5, anchor="center")
-
-        # Время отправки
-        time_label = ctk.CTkLabel(
-            inner_container,
-            text=datetime.now().strftime("%H:%M"),
-            font=ctk.CTkFont(size=10),
-            text_color=("gray50", "#64748b")
-        )
-        time_label.pack(anchor="e" if is_user else "w", padx=52, pady=(4, 0))
-
-        # Прокрутка вниз
-        self.messages_frame._parent_canvas.yview_moveto(1.0)
-
-        return bubble, text_label
-
-    def add_streaming_message(self) -> tuple:
-        """Создать пустое сообщение для стриминга"""
-        return self.add_message("assistant", "▌")
+            self.model_badge.configure(text="")
 
-    def update_streaming_message(self, label, content: str):
-        """Обновить текст"""
-        label.configure(text=content + " ▌")
-        self.messages_frame._parent_canvas.yview_moveto(1.0)
+    def _show_welcome(self):
+        self.welcome_frame.place(relx=0.5, rely=0.45, anchor="center")
+
+    def _hide_welcome(self):
+        self.welcome_frame.place_forget()
+
+    def add_message(self, role: str, content: str, model: str = None,
+                    message_id: int = None) -> dict:
+        """Добавить сообщение в конец чата; вернуть его запись в списке"""
+        self._hide_welcome()
+        return self.message_list.append(role, content, model, message_id)
+
+    def show_history(self, messages: list, has_older: bool):
+        """
+        Показать последнюю страницу сообщений чата. Сразу — последнюю
+        порцию, более старые порции дорисовываются сверху через after,
+        чтобы окно не замирало на длинной странице.
+        """
+        self._cancel_pending()
+        if messages:
+            self._hide_welcome()
+        batch = Config.HISTORY_RENDER_BATCH
+        split = max(0, len(messages) - batch)
+        self.message_list.append_many(messages[split:])
+        self._pending = [messages[max(0, end - batch):end]
+                         for end in range(split, 0, -batch)]
+        if self._pending:
+            self._pending_job = self.after(1, self._render_pending)
+
+        self.oldest_message_id = messages[0]["id"] if messages else None
+        self.has_older = has_older
+
+    def _render_pending(self):
+        self._pending_job = None
+        if not self._pending:
+            return
+        self.message_list.prepend(self._pending.pop(0))
+        if self._pending:
+            self._pending_job = self.after(1, self._render_pending)
+
+    def _flush_pending(self):
+        """Дорисовать оставшиеся порции сразу (перед подгрузкой и переходом)"""
+        if self._pending_job is not None:
+            self.after_cancel(self._pending_job)
+            self._pending_job = None
+        while self._pending:
+            self.message_list.prepend(self._pending.pop(0))
+
+    def _cancel_pending(self):
+        if self._pending_job is not None:
+            self.after_cancel(self._pending_job)
+            self._pending_job = None
+        self._pending = []
+
+    def prepend_history(self, messages: list, has_older: bool):
+        """Дорисовать более старую страницу сверху, не сдвигая видимую часть"""
+        self._flush_pending()
+        self.has_older = has_older
+        if not messages:
+            return
 
-    def finalize_streaming_message(self, label, content: str):
+        self.message_list.prepend(messages)
+        self.oldest_message_id = messages[0]["id"]
+
+    def scroll_to_message(self, message_id: int):
+        """Прокрутить к сообщению и ненадолго подсветить его"""
+        self._flush_pending()
+        self.message_list.scroll_to(message_id)
+
+    def _on_scroll(self, first, last):
+        if (self.has_older and not self.loading_older and not self._pending
+                and float(first) <= 0.05):
+            self.loading_older = True
+            self.after_idle(self._load_older)
+
+    def _load_older(self):
+        try:
+            self.app.load_older_messages()
+        finally:
+            self.loading_older = False
+
+    def add_streaming_message(self, renderer=None) -> dict:
+        """Создать пустое сообщение для стриминга (и подключить к нему renderer)"""
+        self._hide_welcome()
+        item = self.message_list.append("assistant", "", streaming=True)
+        if renderer is not None:
+            self._attach(renderer, item)
+        return item
+
+    def add_compare_messages(self, models: list, renderers: dict = None) -> dict:
+        """Колонки для параллельных ответов; вернуть {модель: (запись, модель)}"""
+        self._hide_welcome()
+        item = self.message_list.append_compare(models)
+        handles = {model: (item, model) for model in models}
+        for model, renderer in (renderers or {}).items():
+            self._attach(renderer, handles[model])
+        return handles
+
+    def _attach(self, renderer, handle):
+        renderer.attach(lambda delta: self.append_streaming_message(handle, delta),
+                        lambda content: self.finalize_streaming_message(handle, content))
+
+    def append_streaming_message(self, handle, delta: str):
+        """Дописать кусок ответа"""
+        item, column = self._unpack(handle)
+        self.message_list.append_text(item, delta, column=column)
+
+    def finalize_streaming_message(self, handle, content: str):
         """Завершить стриминг"""
-        label.configure(text=content)
+        item, column = self._unpack(handle)
+        self.message_list.set_text(item, content, column=column, streaming=False)
 
-    def clear_messages(self):
-        for widget in self.messages_frame.winfo_children():
-            widget.destroy()
-
-        # Показать приветствие снова
-        self.welcome_frame = ctk.CTkFrame(self.messages_frame, fg_color="transparent")
-        self.welcome_frame.pack(expand=True, pady=100)
-
-        ctk.CTkLabel(
-            self.welcome_frame,
-            text="🤖",
-            font=ctk.CTkFont(size=60)
-        ).pack()
+    @staticmethod
+    def _unpack(handle) -> tuple:
+        # handle — сообщение либо (строка сравнения, модель)
+        if isinstance(handle, tuple):
+            return handle
+        return handle, None
 
-        ctk.CTkLabel(
-            self.welcome_frame,
-            text="Привет! Я AI ассистент",
-            font=ctk.CTkFont(size=24, weight="bold"),
-            text_color=("gray20", "#e2e8f0")
-        ).pack(pady=(20, 10))
+    def clear_messages(self):
+        self._cancel_pending()
+        self.message_list.clear()
 
-        ctk.CTkLabel(
-            self.welcome_frame,
-            text="Напишите сообщение, чтобы начать диалог",
-            font=ctk.CTkFont(size=14),
-            text_color=("gray50", "#64748b")
-        ).pack()
+        self.oldest_message_id = None
+        self.has_older = False
+        self._show_welcome()
 
     def send_message(self):
         """Отправить сообщение"""
@@ -339,14 +349,34 @@ class ChatFrame(ctk.CTkFrame):
         if not message or message == "Напишите сообщение...":
             return
 
+        if self.app.is_processing or self.app.loading_chat:
+            return
+
         # Создаём чат если нужно
         if not self.app.current_chat_id:
             self.app.new_chat()
 
         self.message_input.delete("1.0", "end")
-        self.send_btn.configure(state="disabled", text="⏳", fg_color=("#94a3b8", "#475569"))
+        # Пока идёт генерация, кнопка отправки работает как «Стоп»
+        self.send_btn.configure(
+            text="■",
+            command=self.app.stop_generation,
+            fg_color=("#ef4444", "#dc2626"),
+            hover_color=("#dc2626", "#b91c1c")
+        )
 
-        Thread(target=self.app.process_message, args=(message,), daemon=True).start()
+        self.app.send_message(message, compare=self.compare_var.get())
+
+    def set_loading(self, loading: bool):
+        """Пока чат загружается, кнопка отправки неактивна (кроме «Стоп»)"""
+        if not self.app.is_processing:
+            self.send_btn.configure(state="disabled" if loading else "normal")
 
     def enable_input(self):
-        self.send_btn.configure(state="normal", text="➤", fg_color=("#6366f1", "#6366f1"))
\ No newline at end of file
+        self.send_btn.configure(
+            state="normal",
+            text="➤",
+            command=self.send_message,
+            fg_color=("#6366f1", "#6366f1"),
+            hover_color=("#4f46e5", "#4f46e5")
+        )
\ No newline at end of file
@@ -0,0 +1,325 @@
+"""
+Виртуальный список чатов в боковой панели.
+
+Сайдбар подгружает чаты страницами (get_chats_page) и отдаёт сюда
+плоский список элементов: чаты, заголовки групп по дате, заголовок
+архива, пояснения. Строки-виджеты есть только у видимых элементов и
+берутся из пула. set_items сопоставляет новые элементы со старыми по
+ключу: строка, которая осталась на экране, только сдвигается, а
+перерисовывается, если изменились её данные, подсветка или выбор.
+"""
+
+from datetime import date, datetime
+
+import customtkinter as ctk
+
+from ui.virtual_list import VirtualList
+
+ROW_HEIGHT = 78
+ROW_PADDING = 3
+HEIGHTS = {
+    "chat": ROW_HEIGHT + 2 * ROW_PADDING,
+    "header": 30,
+    "archive": 45,
+    "note": 60,
+}
+
+MONTHS = ["Январь", "Февраль", "Март", "Апрель", "Май", "Июнь", "Июль",
+          "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"]
+
+
+def date_group(updated, today: date = None) -> str:
+    """Заголовок группы для чата по времени последнего изменения"""
+    try:
+        moment = datetime.fromisoformat(str(updated)).date()
+    except ValueError:
+        return "Ранее"
+    today = today or date.today()
+    days = (today - moment).days
+    if days <= 0:
+        return "Сегодня"
+    if days == 1:
+        return "Вчера"
+    if days < 7:
+        return "Последние 7 дней"
+    if days < 30:
+        return "Последние 30 дней"
+    if moment.year == today.year:
+        return MONTHS[moment.month - 1]
+    return f"{MONTHS[moment.month - 1]} {moment.year}"
+
+
+class ChatRow(ctk.CTkFrame):
+    """Строка чата из пула: show(item) переключает её на другой чат"""
+
+    def __init__(self, master, sidebar, fonts: dict, bg):
+        super().__init__(master, fg_color=bg, bg_color=bg, corner_radius=0)
+        self.sidebar = sidebar
+        self.fonts = fonts
+        self.chat_id = None
+        self.state = None
+
+        # Контейнер чата
+        self.frame = ctk.CTkFrame(self, fg_color="transparent", corner_radius=12,
+                                  height=ROW_HEIGHT)
+        self.frame.pack(fill="x", pady=ROW_PADDING, padx=5)
+        self.frame.pack_propagate(False)
+
+        # Иконка чата (в режиме выбора — флажок)
+        self.icon = ctk.CTkFrame(self.frame, width=36, height=36, corner_radius=10,
+                                 fg_color=("#f1f5f9", "#252542"))
+        self.icon.pack(side="left", padx=(10, 8), pady=21)
+        self.icon.pack_propagate(False)
+
+        self.icon_label = ctk.CTkLabel(self.icon, text="💬", font=fonts["icon"])
+        self.selected = ctk.BooleanVar(value=False)
+        self.checkbox = ctk.CTkCheckBox(
+            self.icon,
+            text="",
+            width=20,
+            checkbox_width=20,
+            checkbox_height=20,
+            variable=self.selected,
+            command=lambda: self.sidebar._toggle_selected(self.chat_id, self.selected.get())
+        )
+
+        # Текст чата
+        text_frame = ctk.CTkFrame(self.frame, fg_color="transparent")
+        text_frame.pack(side="left", fill="both", expand=True, pady=10)
+
+        # ИСПРАВЛЕНО: убрал hover_color="transparent"
+        self.title = ctk.CTkButton(
+            text_frame,
+            text="",
+            command=self._open,
+            fg_color="transparent",
+            hover_color=("#e2e8f0", "#3b3b5c"),  # Реальный цвет вместо transparent
+            text_color=("gray20", "#e2e8f0"),
+            anchor="w",
+            height=20,
+            font=fonts["title"]
+        )
+        self.title.pack(fill="x")
+
+        # Последнее сообщение (упаковывается, только если оно есть)
+        self.preview = ctk.CTkLabel(
+            text_frame,
+            text="",
+            font=fonts["preview"],
+            text_color=("gray40", "#94a3b8"),
+            anchor="w",
+            height=16
+        )
+
+        self.meta = ctk.CTkLabel(
+            text_frame,
+            text="",
+            font=fonts["meta"],
+            text_color=("gray50", "#64748b"),
+            anchor="w",
+            height=14
+        )
+        self.meta.pack(fill="x", padx=(6, 0))
+
+        # Кнопка удаления (в режиме выбора — панель над списком)
+        self.del_btn = ctk.CTkButton(
+            self.frame,
+            text="✕",
+            width=28,
+            height=28,
+            corner_radius=8,
+            fg_color="transparent",
+            hover_color=("#fecaca", "#7f1d1d"),
+            text_color=("gray40", "#94a3b8"),
+            font=fonts["preview"],
+            command=lambda: self.sidebar.app.delete_chat(self.chat_id)
+        )
+
+    def _open(self):
+        if self.sidebar.select_mode:
+            # Щелчок по названию тоже отмечает чат, а не открывает его
+            self.selected.set(not self.selected.get())
+            self.sidebar._toggle_selected(self.chat_id, self.selected.get())
+        else:
+            self.sidebar.app.load_chat(self.chat_id)
+
+    def show(self, item: dict):
+        chat = item["chat"]
+        sidebar = self.sidebar
+        state = (chat, item["archived"], chat[0] == sidebar.active_id,
+                 sidebar.select_mode, chat[0] in sidebar.selected)
+        # Та же строка с теми же данными — ничего не трогать
+        if state == self.state:
+            return
+        previous = self.state or (None, None, None, None, None)
+        self.state = state
+
+        (chat_id, title, created, updated, model,
+         message_count, total_tokens, last_role, preview) = chat
+        _, archived, active, select_mode, selected = state
+        self.chat_id = chat_id
+
+        if chat != previous[0]:
+            # Название
+            self.title.configure(text=title[:22] + "..." if len(title) > 22 else title)
+
+            # Время
+            try:
+                time_str = datetime.fromisoformat(str(updated)).strftime("%d.%m %H:%M")
+            except:
+                time_str = "—"
+            self.meta.configure(text=f"{time_str} · 💬 {message_count}")
+
+            # Последнее сообщение
+            if preview:
+                preview = " ".join(preview.split())
+                self.preview.configure(text=("👤 " if last_role == "user" else "🤖 ") + (
+                    preview[:26] + "..." if len(preview) > 26 else preview
+                ))
+                self.preview.pack(fill="x", padx=(6, 0), before=self.meta)
+            else:
+                self.preview.pack_forget()
+
+        if select_mode != previous[3] or archived != previous[1]:
+            if select_mode:
+                self.icon_label.place_forget()
+                self.checkbox.place(relx=0.5, rely=0.5, anchor="center")
+                self.del_btn.pack_forget()
+            else:
+                self.checkbox.place_forget()
+                self.icon_label.configure(text="🗄" if archived else "💬")
+                self.icon_label.place(relx=0.5, rely=0.5, anchor="center")
+                self.del_btn.pack(side="right", padx=8)
+        self.selected.set(selected)
+
+        if active != previous[2]:
+            if active:
+                self.frame.configure(fg_color=("#e0e7ff", "#312e81"))
+                self.icon.configure(fg_color=("#6366f1", "#6366f1"))
+                self.title.configure(text_color=("#4338ca", "#c7d2fe"),
+                                     font=self.fonts["title_active"])
+            else:
+                self.frame.configure(fg_color="transparent")
+                self.icon.configure(fg_color=("#f1f5f9", "#252542"))
+                self.title.configure(text_color=("gray20", "#e2e8f0"), font=self.fonts["title"])
+
+
+class HeaderRow(ctk.CTkFrame):
+    """Заголовок группы по дате"""
+
+    def __init__(self, master, fonts: dict, bg):
+        super().__init__(master, fg_color=bg, bg_color=bg, corner_radius=0)
+        self.label = ctk.CTkLabel(
+            self,
+            text="",
+            font=fonts["header"],
+            text_color=("gray50", "#64748b"),
+            anchor="w",
+            height=HEIGHTS["header"] - 6
+        )
+        self.label.pack(fill="x", padx=12, pady=(6, 0))
+
+    def show(self, item: dict):
+        self.label.configure(text=item["text"])
+
+
+class ArchiveRow(ctk.CTkFrame):
+    """Заголовок архива: по щелчку (или докрутив до него) архив подгружается"""
+
+    def __init__(self, master, sidebar, fonts: dict, bg):
+        super().__init__(master, fg_color=bg, bg_color=bg, corner_radius=0)
+        self.button = ctk.CTkButton(
+            self,
+            text="",
+            command=sidebar._load_archive,
+            fg_color="transparent",
+            hover_color=("#e2e8f0", "#252542"),
+            text_color=("gray50", "#64748b"),
+            anchor="w",
+            height=30,
+            font=fonts["header"]
+        )
+        self.button.pack(fill="x", pady=(12, 3), padx=5)
+
+    def show(self, item: dict):
+        self.button.configure(text=item["text"])
+
+
+class NoteRow(ctk.CTkFrame):
+    """Пояснение вместо пустого списка"""
+
+    def __init__(self, master, fonts: dict, bg):
+        super().__init__(master, fg_color=bg, bg_color=bg, corner_radius=0)
+        self.label = ctk.CTkLabel(
+            self,
+            text="",
+            font=fonts["note"],
+            text_color=("gray50", "#64748b")
+        )
+        self.label.pack(pady=18)
+
+    def show(self, item: dict):
+        self.label.configure(text=item["text"])
+
+
+class ChatList(VirtualList):
+    def __init__(self, master, sidebar, on_scroll=None, **kwargs):
+        super().__init__(master, on_scroll=on_scroll, **kwargs)
+        self.sidebar = sidebar
+
+        # Шрифты общие для всех строк
+        self.fonts = {
+            "icon": ctk.CTkFont(size=14),
+            "title": ctk.CTkFont(size=13, weight="normal"),
+            "title_active": ctk.CTkFont(size=13, weight="bold"),
+            "preview": ctk.CTkFont(size=11),
+            "meta": ctk.CTkFont(size=10),
+            "header": ctk.CTkFont(size=12, weight="bold"),
+            "note": ctk.CTkFont(size=12),
+        }
+
+    def set_items(self, items: list):
+        """
+        Новый список элементов. Виджеты видимых элементов переходят к
+        элементам с тем же ключом — без пересоздания и без перерисовки,
+        если данные не изменились.
+        """
+        previous = {item["key"]: item for item in self.shown}
+        shown = []
+        for item in items:
+            item.setdefault("widget", None)
+            old = previous.pop(item["key"], None)
+            if old is not None and old["widget"] is not None:
+                item["widget"] = old["widget"]
+                old["widget"] = None
+                shown.append(item)
+        for old in previous.values():
+            self._release(old)
+
+        self.items = items
+        self.shown = shown
+        self._relayout()
+        for item in shown:
+            item["widget"].show(item)
+        self._schedule_render()
+
+    def refresh(self):
+        """Перепроверить видимые строки (сменился активный чат, режим выбора)"""
+        for item in self.shown:
+            item["widget"].show(item)
+
+    def _height(self, item: dict) -> int:
+        return HEIGHTS[item["kind"]]
+
+    def _kind(self, item: dict):
+        return item["kind"]
+
+    def _create(self, kind):
+        bg = self._fg_color
+        if kind == "chat":
+            return ChatRow(self.canvas, self.sidebar, self.fonts, bg)
+        if kind == "header":
+            return HeaderRow(self.canvas, self.fonts, bg)
+        if kind == "archive":
+            return ArchiveRow(self.canvas, self.sidebar, self.fonts, bg)
+        return NoteRow(self.canvas, self.fonts, bg)
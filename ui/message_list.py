@@ -0,0 +1,462 @@
+"""
+Виртуальный список сообщений чата.
+
+CTkScrollableFrame держит виджеты всех сообщений сразу — около восьми
+на сообщение, на длинном чате это десятки тысяч виджетов, секунды
+загрузки и тяжёлая прокрутка. Здесь сообщения — только данные (items),
+а на холсте (ui.virtual_list) живут пузыри для видимой области и запаса
+вокруг неё. Ушедшие за край пузыри возвращаются в пул и показывают следующие
+сообщения. Высота сообщения измеряется при первом показе и кэшируется,
+до этого берётся оценка по длине текста; при уточнении высот видимое
+сообщение остаётся на месте.
+"""
+
+import bisect
+import math
+import tkinter
+import tkinter.font
+from datetime import datetime
+
+import customtkinter as ctk
+
+from ui.virtual_list import VirtualList
+
+ITEM_PADDING = 12       # отступ сверху и снизу у каждого сообщения
+WRAP_LENGTH = 450
+# Для оценки высоты ещё не измеренных сообщений
+CHARS_PER_LINE = 55
+LINE_HEIGHT = 20
+CHROME_HEIGHT = 24 + 18  # поля пузыря и строка времени
+
+FLASH_COLOR = ("#fef9c3", "#3f3f1e")
+
+
+def short_model_name(model: str) -> str:
+    return model.split("/")[-1].replace(":free", "").replace("-instruct", "")
+
+
+class MessageBubble(ctk.CTkFrame):
+    """Переиспользуемый пузырь: show(item) перестраивает его под другое сообщение"""
+
+    def __init__(self, master, colors: dict, fonts: dict, bg):
+        super().__init__(master, fg_color=bg, bg_color=bg, corner_radius=0)
+        self.colors = colors
+        self.bg = bg
+        self.fonts = fonts
+        self.role = None
+        self.flashed = False
+        self.streaming = False
+        self.stream_text = None
+
+        self.inner = ctk.CTkFrame(self, fg_color="transparent")
+        self.row = ctk.CTkFrame(self.inner, fg_color="transparent")
+        self.row.pack(fill="x")
+
+        self.ai_avatar = self._avatar("🤖", ("#8b5cf6", "#7c3aed"), fonts)
+        self.user_avatar = self._avatar("👤", ("#6366f1", "#4f46e5"), fonts)
+
+        self.bubble = ctk.CTkFrame(self.row, corner_radius=18)
+        self.text_label = ctk.CTkLabel(
+            self.bubble,
+            text="",
+            wraplength=WRAP_LENGTH,
+            justify="left",
+            font=fonts["text"],
+            padx=16,
+            pady=12
+        )
+        self.text_label.pack()
+
+        self.time_label = ctk.CTkLabel(
+            self.inner,
+            text="",
+            font=fonts["time"],
+            text_color=("gray50", "#64748b")
+        )
+
+    def _avatar(self, text: str, color, fonts: dict):
+        frame = ctk.CTkFrame(self.row, width=40, height=40, corner_radius=20, fg_color=color)
+        frame.pack_propagate(False)
+        ctk.CTkLabel(frame, text=text, font=fonts["avatar"]).place(
+            relx=0.5, rely=0.5, anchor="center"
+        )
+        return frame
+
+    def show(self, item: dict):
+        is_user = item["role"] == "user"
+
+        # Раскладка меняется, только если пузырь переходит к сообщению другой роли
+        if item["role"] != self.role:
+            self.role = item["role"]
+            for widget in (self.inner, self.ai_avatar, self.user_avatar,
+                           self.bubble, self.time_label):
+                widget.pack_forget()
+
+            self.inner.pack(anchor="e" if is_user else "w")
+            if is_user:
+                self.bubble.pack(side="right")
+                self.user_avatar.pack(side="right", padx=(12, 0))
+                self.bubble.configure(fg_color=(self.colors["user_bubble"],
+                                                self.colors["user_bubble_dark"]))
+                self.text_label.configure(text_color="white")
+            else:
+                self.ai_avatar.pack(side="left", padx=(0, 12))
+                self.bubble.pack(side="left")
+                self.bubble.configure(fg_color=(self.colors["ai_bubble_light"],
+                                                self.colors["ai_bubble"]))
+                self.text_label.configure(text_color=("gray10", "#e2e8f0"))
+            self.time_label.pack(anchor="e" if is_user else "w", padx=52, pady=(4, 0))
+
+        if item.get("streaming"):
+            self._start_stream(item["content"])
+        else:
+            if self.streaming:
+                self.streaming = False
+                self.stream_text.pack_forget()
+                self.text_label.pack()
+            self.text_label.configure(text=item["content"])
+        self.time_label.configure(text=item["time"])
+
+        flash = bool(item.get("flash"))
+        if flash != self.flashed:
+            self.flashed = flash
+            self.configure(fg_color=FLASH_COLOR if flash else self.bg)
+
+    # === СТРИМИНГ ===
+    # Пока ответ идёт, вместо label — tkinter.Text: новые куски дописываются
+    # в конец, а не переразмечается весь текст
+
+    def _start_stream(self, content: str):
+        if self.stream_text is None:
+            font = self.text_label._apply_font_scaling(self.fonts["text"])
+            wrap = self.text_label._apply_widget_scaling(WRAP_LENGTH)
+            self.stream_text = tkinter.Text(
+                self.bubble,
+                font=font,
+                width=max(20, int(wrap // tkinter.font.Font(font=font).measure("0"))),
+                height=1,
+                wrap="word",
+                bd=0,
+                highlightthickness=0,
+                padx=16,
+                pady=12,
+                cursor="arrow",
+                takefocus=0
+            )
+
+        self.stream_text.configure(
+            bg=self.bubble._apply_appearance_mode(self.bubble.cget("fg_color")),
+            fg=self._apply_appearance_mode(("gray10", "#e2e8f0")),
+            state="normal"
+        )
+        self.stream_text.delete("1.0", "end")
+        self.stream_text.insert("1.0", content + " ▌")
+        if not self.streaming:
+            self.streaming = True
+            self.text_label.pack_forget()
+            self.stream_text.pack()
+        self._counted_line = 1
+        self._counted = 0
+        self._fit_stream()
+
+    def append(self, delta: str):
+        # Перед курсором « ▌» (end-1c — завершающий перевод строки Text)
+        self.stream_text.insert("end-3c", delta)
+        self._fit_stream()
+
+    def _display_lines(self, start: str, end: str) -> int:
+        counted = self.stream_text.count(start, end, "displaylines")
+        return counted[0] if counted else 0
+
+    def _fit_stream(self):
+        """Высота Text по числу экранных строк; дописанные строки не пересчитываются"""
+        if self.stream_text.winfo_width() <= 1:
+            # Перенос строк считается по реальной ширине виджета
+            self.stream_text.update_idletasks()
+        last = int(self.stream_text.index("end-1c").split(".")[0])
+        if last > self._counted_line:
+            self._counted += self._display_lines(f"{self._counted_line}.0", f"{last}.0")
+            self._counted_line = last
+        height = self._counted + self._display_lines(f"{last}.0", "end-1c") + 1
+        if height != int(self.stream_text.cget("height")):
+            self.stream_text.configure(height=height)
+
+
+class CompareRow(ctk.CTkFrame):
+    """Ответы нескольких моделей в колонках — пул по числу колонок"""
+
+    def __init__(self, master, colors: dict, fonts: dict, bg, columns: int):
+        super().__init__(master, fg_color=bg, bg_color=bg, corner_radius=0)
+        self.model_labels = []
+        self.text_labels = []
+        wraplength = max(200, 900 // max(columns, 1))
+
+        for column in range(columns):
+            self.grid_columnconfigure(column, weight=1, uniform="compare")
+
+            bubble = ctk.CTkFrame(
+                self,
+                fg_color=(colors["ai_bubble_light"], colors["ai_bubble"]),
+                corner_radius=18
+            )
+            bubble.grid(row=0, column=column, sticky="nsew", padx=6)
+
+            model_label = ctk.CTkLabel(
+                bubble,
+                text="",
+                font=fonts["model"],
+                text_color=("#4338ca", "#a5b4fc")
+            )
+            model_label.pack(anchor="w", padx=16, pady=(10, 0))
+
+            text_label = ctk.CTkLabel(
+                bubble,
+                text="",
+                wraplength=wraplength,
+                justify="left",
+                font=fonts["text"],
+                text_color=("gray10", "#e2e8f0"),
+                padx=16,
+                pady=12
+            )
+            text_label.pack(anchor="w")
+
+            self.model_labels.append(model_label)
+            self.text_labels.append(text_label)
+
+    def show(self, item: dict):
+        for model, model_label, text_label in zip(item["models"], self.model_labels,
+                                                  self.text_labels):
+            model_label.configure(text=f"🤖 {short_model_name(model)}")
+            streaming = model in item["streaming"]
+            text_label.configure(text=item["contents"][model] + (" ▌" if streaming else ""))
+
+
+class MessageList(VirtualList):
+    def __init__(self, master, colors: dict, on_scroll=None, **kwargs):
+        super().__init__(master, on_scroll=on_scroll, **kwargs)
+        self.colors = colors
+
+        # Шрифты общие для всех пузырей, а не по CTkFont на каждый виджет
+        self.fonts = {
+            "text": ctk.CTkFont(family="Segoe UI", size=14),
+            "time": ctk.CTkFont(size=10),
+            "avatar": ctk.CTkFont(size=18),
+            "model": ctk.CTkFont(size=11, weight="bold"),
+        }
+
+        self.dirty = {}         # id(item) -> показанное сообщение, у которого изменился текст
+        self.follow = True      # держаться у нижнего края (новые сообщения, стриминг)
+
+    # === ДАННЫЕ ===
+
+    def _message_item(self, role: str, content: str, model: str = None,
+                      message_id: int = None, timestamp=None) -> dict:
+        moment = datetime.now()
+        if timestamp:
+            try:
+                moment = datetime.fromisoformat(str(timestamp))
+            except ValueError:
+                pass
+        time_text = moment.strftime("%H:%M")
+        # У ответа — и модель, которая его дала
+        if model and role != "user":
+            time_text = f"{time_text} · {short_model_name(model)}"
+        return {"kind": "message", "id": message_id, "role": role, "content": content,
+                "time": time_text, "height": None, "widget": None}
+
+    def append(self, role: str, content: str, model: str = None, message_id: int = None,
+               timestamp=None, streaming: bool = False) -> dict:
+        item = self._message_item(role, content, model, message_id, timestamp)
+        item["streaming"] = streaming
+        return self._append(item)
+
+    def append_many(self, messages: list):
+        for msg in messages:
+            self.items.append(self._message_item(msg["role"], msg["content"], msg.get("model"),
+                                                 msg.get("id"), msg.get("timestamp")))
+        self._relayout()
+        self.follow = True
+        self._scroll_to_bottom()
+
+    def append_compare(self, models: list) -> dict:
+        item = {"kind": "compare", "id": None, "models": list(models),
+                "contents": {model: "" for model in models}, "streaming": set(models),
+                "height": None, "widget": None}
+        return self._append(item)
+
+    def _append(self, item: dict) -> dict:
+        self.items.append(item)
+        self.offsets.append(self.offsets[-1] + self._height(item))
+        self._update_scrollregion()
+        self.follow = True
+        self._scroll_to_bottom()
+        return item
+
+    def prepend(self, messages: list):
+        """Более старые сообщения сверху; видимая часть остаётся на месте"""
+        if not messages:
+            return
+        top = self.canvas.canvasy(0)
+        old_height = self.offsets[-1]
+        self.items[:0] = [self._message_item(m["role"], m["content"], m.get("model"),
+                                             m.get("id"), m.get("timestamp"))
+                          for m in messages]
+        self._relayout()
+        self._move_to(top + self.offsets[-1] - old_height)
+
+    def set_text(self, item: dict, content: str, column: str = None, streaming: bool = True):
+        """Новый текст сообщения (column — модель в строке сравнения)"""
+        if item["kind"] == "compare":
+            item["contents"][column] = content
+            if streaming:
+                item["streaming"].add(column)
+            else:
+                item["streaming"].discard(column)
+        else:
+            item["content"] = content
+            item["streaming"] = streaming
+
+        if item["widget"] is not None:
+            item["widget"].show(item)
+        self._changed(item)
+
+    def append_text(self, item: dict, delta: str, column: str = None):
+        """Дописать кусок стриминга; у сообщения на экране дописывается только он"""
+        if item["kind"] == "compare":
+            item["contents"][column] += delta
+            if item["widget"] is not None:
+                item["widget"].show(item)
+        else:
+            item["content"] += delta
+            if item["widget"] is not None:
+                item["widget"].append(delta)
+        self._changed(item)
+
+    def _changed(self, item: dict):
+        if item["widget"] is not None:
+            self.dirty[id(item)] = item
+        else:
+            # Виджета нет — высота будет измерена при показе
+            item["height"] = None
+        self._schedule_render()
+
+    def clear(self):
+        self._release_all()
+        self.dirty.clear()
+        self.items.clear()
+        self.offsets = [0]
+        self.follow = True
+        self._update_scrollregion()
+        self.canvas.yview_moveto(0)
+
+    def index_of(self, message_id: int):
+        for index, item in enumerate(self.items):
+            if item["id"] == message_id:
+                return index
+        return None
+
+    def scroll_to(self, message_id: int):
+        """Прокрутить к сообщению и ненадолго подсветить его"""
+        index = self.index_of(message_id)
+        if index is None:
+            return
+        item = self.items[index]
+        self.follow = False
+        self._move_to(self.offsets[index])
+        self._render()
+
+        item["flash"] = True
+        if item["widget"] is not None:
+            item["widget"].show(item)
+
+        def unflash():
+            item["flash"] = False
+            if item["widget"] is not None:
+                item["widget"].show(item)
+
+        self.after(1500, unflash)
+
+    # === РАЗМЕТКА ===
+
+    def _height(self, item: dict) -> int:
+        if item["height"] is not None:
+            return item["height"]
+
+        if item["kind"] == "compare":
+            per_line = max(10, CHARS_PER_LINE * 2 // max(len(item["models"]), 1))
+            text = max(item["contents"].values(), key=len, default="")
+        else:
+            per_line = CHARS_PER_LINE
+            text = item["content"]
+        lines = sum(max(1, math.ceil(len(line) / per_line)) for line in text.split("\n"))
+        return 2 * ITEM_PADDING + CHROME_HEIGHT + lines * LINE_HEIGHT
+
+    def _top(self, item: dict) -> int:
+        return ITEM_PADDING
+
+    def _kind(self, item: dict):
+        if item["kind"] == "compare":
+            return "compare", len(item["models"])
+        return "message"
+
+    def _create(self, kind):
+        bg = self._fg_color
+        if kind == "message":
+            return MessageBubble(self.canvas, self.colors, self.fonts, bg)
+        return CompareRow(self.canvas, self.colors, self.fonts, bg, kind[1])
+
+    def _scroll_to_bottom(self):
+        self.canvas.yview_moveto(1.0)
+        self._schedule_render()
+
+    # === ПОКАЗ ===
+
+    def _render(self):
+        top = self.canvas.canvasy(0)
+        # Сообщение у верхнего края — его положение на экране сохраняется
+        anchor = max(0, bisect.bisect_right(self.offsets, top) - 1)
+        anchor = min(anchor, len(self.items) - 1)
+        anchor_delta = top - self.offsets[anchor] if self.items else 0
+
+        fresh = super()._render()
+        first, last = self._visible_range()
+
+        # Элементы сравниваются по id(): == у словарей сравнило бы весь текст
+        measure = {id(item): item for item in fresh}
+        measure.update((key, item) for key, item in self.dirty.items()
+                       if item["widget"] is not None)
+        self.dirty.clear()
+        if not measure:
+            return
+
+        # Один проход геометрии на все новые пузыри, затем замер
+        self.canvas.update_idletasks()
+        changed = []
+        for item in measure.values():
+            height = item["widget"].winfo_reqheight() + 2 * ITEM_PADDING
+            if height != item["height"]:
+                item["height"] = height
+                changed.append(item)
+        if not changed:
+            return
+
+        # Виджеты есть только у сообщений из [first, last]; при стриминге
+        # меняется последнее сообщение, и пересчёт позиций короткий
+        positions = {id(self.items[index]): index for index in range(first, last + 1)}
+        self._relayout(min(positions[id(item)] for item in changed))
+        if self.follow:
+            self.canvas.yview_moveto(1.0)
+        else:
+            self._move_to(self.offsets[anchor] + anchor_delta)
+        # Уточнённые высоты могли открыть ещё не показанные сообщения
+        self._schedule_render()
+
+    # === СОБЫТИЯ ===
+
+    def _resized(self):
+        if self.follow:
+            self.canvas.yview_moveto(1.0)
+
+    def _user_scrolled(self):
+        self.follow = self.canvas.yview()[1] >= 0.999
@@ -87,7 +87,9 @@ class SettingsWindow(ctk.CTkToplevel):
 
         self.model_var = ctk.StringVar(value=self.settings.get("model", ""))
 
-        for i, (name, model_id) in enumerate(Config.FREE_MODELS.items()):
+        models = {"⚡ Авто (самая быстрая)": Config.AUTO_MODEL, **Config.FREE_MODELS}
+
+        for i, (name, model_id) in enumerate(models.items()):
             is_selected = self.model_var.get() == model_id
 
             model_btn = ctk.CTkRadioButton(
@@ -102,6 +104,44 @@ class SettingsWindow(ctk.CTkToplevel):
             )
             model_btn.pack(anchor="w", padx=15, pady=10)
 
+        self.failover_var = ctk.BooleanVar(value=self.settings.get("auto_failover", True))
+        ctk.CTkSwitch(
+            model_container,
+            text="Переключаться на другую модель при ошибках",
+            variable=self.failover_var,
+            font=ctk.CTkFont(size=12),
+            progress_color="#6366f1",
+            text_color=("gray40", "#94a3b8")
+        ).pack(anchor="w", padx=15, pady=(5, 15))
+
+        # === СРАВНЕНИЕ МОДЕЛЕЙ ===
+        self._create_section(main_frame, "⚖️ Модели для сравнения")
+
+        compare_container = ctk.CTkFrame(
+            main_frame,
+            fg_color=("white", "#1e1e2e"),
+            corner_radius=12,
+            border_width=1,
+            border_color=("#e2e8f0", "#374151")
+        )
+        compare_container.pack(fill="x", pady=(0, 20))
+
+        compare_models = self.settings.get("compare_models", [])
+        self.compare_vars = {}
+
+        for name, model_id in Config.FREE_MODELS.items():
+            var = ctk.BooleanVar(value=model_id in compare_models)
+            ctk.CTkCheckBox(
+                compare_container,
+                text=f"  {name}",
+                variable=var,
+                font=ctk.CTkFont(size=14),
+                fg_color="#6366f1",
+                hover_color="#4f46e5",
+                border_color=("#d1d5db", "#4b5563")
+            ).pack(anchor="w", padx=15, pady=8)
+            self.compare_vars[model_id] = var
+
         # === SYSTEM PROMPT ===
         self._create_section(main_frame, "📝 Системный промпт")
 
@@ -168,6 +208,17 @@ class SettingsWindow(ctk.CTkToplevel):
         self.temp_slider.set(self.settings.get("temperature", 0.7))
         self.temp_slider.pack(fill="x", padx=15, pady=(0, 15))
 
+        # При температуре 0 ответы кэшируются всегда
+        self.cache_var = ctk.BooleanVar(value=self.settings.get("cache_responses", False))
+        ctk.CTkSwitch(
+            temp_container,
+            text="Кэшировать ответы и при температуре выше 0",
+            variable=self.cache_var,
+            font=ctk.CTkFont(size=12),
+            progress_color="#6366f1",
+            text_color=("gray40", "#94a3b8")
+        ).pack(anchor="w", padx=15, pady=(0, 15))
+
         # === ТЕМА ===
         self._create_section(main_frame, "🎨 Тема оформления")
 
@@ -249,8 +300,13 @@ class SettingsWindow(ctk.CTkToplevel):
     def save(self):
         self.settings["api_key"] = self.api_key_entry.get().strip()
         self.settings["model"] = self.model_var.get()
+        self.settings["auto_failover"] = self.failover_var.get()
+        self.settings["compare_models"] = [
+            model_id for model_id, var in self.compare_vars.items() if var.get()
+        ]
         self.settings["system_prompt"] = self.system_prompt_text.get("1.0", "end-1c")
         self.settings["temperature"] = round(self.temp_slider.get(), 1)
+        self.settings["cache_responses"] = self.cache_var.get()
         self.settings["theme"] = self.theme_var.get()
 
         self.on_save(self.settings)
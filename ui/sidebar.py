@@ -1,5 +1,8 @@
 import customtkinter as ctk
-from datetime import datetime
+from datetime import date
+
+from config import Config
+from ui.chat_list import ChatList, date_group
 
 
 class Sidebar(ctk.CTkFrame):
@@ -11,7 +14,18 @@ class Sidebar(ctk.CTkFrame):
             fg_color=("#f8fafc", "#12121f")
         )
         self.app = app
-        self.chat_buttons = {}
+        self.search_query = ""
+        self._search_job = None
+        self.select_mode = False
+        self.selected = set()
+        self.active_id = None
+
+        # Загруженная часть истории: страницы по курсору (updated_at, id)
+        self.chats = []
+        self.has_more = False
+        self.archive_chats = None   # None — архив ещё не открывали
+        self.archive_has_more = False
+        self.loading = False
 
         self.setup_ui()
 
@@ -47,7 +61,21 @@ class Sidebar(ctk.CTkFrame):
             hover_color=("#4f46e5", "#4f46e5"),
             anchor="center"
         )
-        self.new_chat_btn.pack(fill="x", padx=20, pady=(0, 20))
+        self.new_chat_btn.pack(fill="x", padx=20, pady=(0, 12))
+
+        # === ПОИСК ===
+        self.search_entry = ctk.CTkEntry(
+            self,
+            placeholder_text="🔍  Поиск по чатам...",
+            height=38,
+            corner_radius=10,
+            border_width=0,
+            fg_color=("#eef2ff", "#1e1e2e"),
+            font=ctk.CTkFont(size=13)
+        )
+        self.search_entry.pack(fill="x", padx=20, pady=(0, 20))
+        self.search_entry.bind("<KeyRelease>", self._on_search_key)
+        self.search_entry.bind("<Escape>", lambda e: self.clear_search())
 
         # === РАЗДЕЛИТЕЛЬ ===
         divider = ctk.CTkFrame(self, height=1, fg_color=("#e2e8f0", "#1e1e2e"))
@@ -64,14 +92,81 @@ class Sidebar(ctk.CTkFrame):
             text_color=("gray50", "#64748b")
         ).pack(side="left")
 
+        # Режим выбора нескольких чатов
+        self.select_btn = ctk.CTkButton(
+            history_header,
+            text="☑",
+            width=28,
+            height=24,
+            corner_radius=8,
+            fg_color="transparent",
+            hover_color=("#e2e8f0", "#252542"),
+            text_color=("gray50", "#64748b"),
+            font=ctk.CTkFont(size=13),
+            command=lambda: self.set_select_mode(not self.select_mode)
+        )
+        self.select_btn.pack(side="right")
+
+        # Панель действий над выбранными (видна в режиме выбора)
+        self.select_bar = ctk.CTkFrame(self, fg_color="transparent")
+
+        self.selected_label = ctk.CTkLabel(
+            self.select_bar,
+            text="Выбрано: 0",
+            font=ctk.CTkFont(size=12),
+            text_color=("gray40", "#94a3b8")
+        )
+        self.selected_label.pack(side="left")
+
+        ctk.CTkButton(
+            self.select_bar,
+            text="Отмена",
+            width=70,
+            height=28,
+            corner_radius=8,
+            fg_color="transparent",
+            hover_color=("#e2e8f0", "#252542"),
+            text_color=("gray40", "#94a3b8"),
+            font=ctk.CTkFont(size=12),
+            command=lambda: self.set_select_mode(False)
+        ).pack(side="right")
+
+        self.delete_selected_btn = ctk.CTkButton(
+            self.select_bar,
+            text="🗑 Удалить",
+            width=90,
+            height=28,
+            corner_radius=8,
+            fg_color=("#fecaca", "#7f1d1d"),
+            hover_color=("#fca5a5", "#991b1b"),
+            text_color=("#7f1d1d", "#fecaca"),
+            font=ctk.CTkFont(size=12),
+            state="disabled",
+            command=lambda: self.app.delete_selected_chats(sorted(self.selected))
+        )
+        self.delete_selected_btn.pack(side="right", padx=6)
+
         # === СПИСОК ЧАТОВ ===
-        self.chats_scroll = ctk.CTkScrollableFrame(
+        self.list_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.list_frame.pack(fill="both", expand=True, padx=10, pady=5)
+
+        # История: строки только для видимых чатов, страницы — по прокрутке
+        self.chat_list = ChatList(
+            self.list_frame,
             self,
+            on_scroll=self._on_scroll,
+            fg_color=("#f8fafc", "#12121f"),
+            corner_radius=0
+        )
+        self.chat_list.pack(fill="both", expand=True)
+
+        # Результаты поиска (их не больше SEARCH_RESULTS_LIMIT)
+        self.results_scroll = ctk.CTkScrollableFrame(
+            self.list_frame,
             fg_color="transparent",
             scrollbar_button_color=("#c7d2fe", "#4338ca"),
             scrollbar_button_hover_color=("#a5b4fc", "#6366f1")
         )
-        self.chats_scroll.pack(fill="both", expand=True, padx=10, pady=5)
 
         # === НИЖНЯЯ ПАНЕЛЬ ===
         bottom_frame = ctk.CTkFrame(
@@ -113,118 +208,247 @@ class Sidebar(ctk.CTkFrame):
         )
         export_btn.pack(fill="x")
 
-    def refresh_chats(self, chats: list, current_id: int = None):
-        """Обновить список чатов"""
-        for widget in self.chats_scroll.winfo_children():
+        # Импорт
+        import_btn = ctk.CTkButton(
+            bottom_frame,
+            text="📤  Импорт чатов",
+            command=self.app.import_chats,
+            fg_color="transparent",
+            hover_color=("#e2e8f0", "#252542"),
+            border_width=0,
+            height=50,
+            corner_radius=0,
+            font=ctk.CTkFont(size=14),
+            text_color=("gray40", "#94a3b8"),
+            anchor="center"
+        )
+        import_btn.pack(fill="x")
+
+    # === ПОИСК ===
+
+    def _on_search_key(self, event):
+        # Запрос уходит, когда пользователь перестал печатать
+        if self._search_job:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(250, self._run_search)
+
+    def _run_search(self):
+        self._search_job = None
+        query = self.search_entry.get().strip()
+        if query == self.search_query:
+            return
+
+        self.search_query = query
+        if query:
+            self.show_search_results(self.app.search(query))
+        else:
+            self._show_history()
+
+    def clear_search(self):
+        self.search_entry.delete(0, "end")
+        if self.search_query:
+            self.search_query = ""
+            self._show_history()
+
+    def _show_history(self):
+        self.results_scroll.pack_forget()
+        self.chat_list.pack(fill="both", expand=True)
+        self.app.refresh_chat_list()
+
+    def show_search_results(self, results: list):
+        for widget in self.results_scroll.winfo_children():
             widget.destroy()
-        self.chat_buttons.clear()
+        self.chat_list.pack_forget()
+        self.results_scroll.pack(fill="both", expand=True)
 
-        if not chats:
-            empty_label = ctk.CTkLabel(
-                self.chats_scroll,
-                text="Нет сохранённых чатов",
+        if not results:
+            ctk.CTkLabel(
+                self.results_scroll,
+                text="Ничего не найдено",
                 font=ctk.CTkFont(size=12),
                 text_color=("gray50", "#64748b")
-            )
-            empty_label.pack(pady=40)
+            ).pack(pady=40)
             return
 
-        for chat in chats:
-            chat_id, title, created, updated, model = chat
-            is_active = chat_id == current_id
+        for result in results:
+            self._add_search_result(result)
 
-            # Контейнер чата
-            if is_active:
-                chat_fg = ("#e0e7ff", "#312e81")
-            else:
-                chat_fg = "transparent"
-
-            chat_frame = ctk.CTkFrame(
-                self.chats_scroll,
-                fg_color=chat_fg,
-                corner_radius=12,
-                height=60
-            )
-            chat_frame.pack(fill="x", pady=3, padx=5)
-            chat_frame.pack_propagate(False)
-
-            # Иконка чата
-            if is_active:
-                icon_fg = ("#6366f1", "#6366f1")
-            else:
-                icon_fg = ("#f1f5f9", "#252542")
-
-            icon_frame = ctk.CTkFrame(
-                chat_frame,
-                width=36,
-                height=36,
-                corner_radius=10,
-                fg_color=icon_fg
-            )
-            icon_frame.pack(side="left", padx=(10, 8), pady=12)
-            icon_frame.pack_propagate(False)
+    def _add_search_result(self, result: dict):
+        item = ctk.CTkFrame(
+            self.results_scroll,
+            fg_color=("#f1f5f9", "#1e1e2e"),
+            corner_radius=12
+        )
+        item.pack(fill="x", pady=3, padx=5)
 
-            ctk.CTkLabel(
-                icon_frame,
-                text="💬",
-                font=ctk.CTkFont(size=14)
-            ).place(relx=0.5, rely=0.5, anchor="center")
+        title = result["title"]
+        icon = "🗄" if result.get("archived") else "💬"
+        ctk.CTkLabel(
+            item,
+            text=f"{icon} {title[:28] + '...' if len(title) > 28 else title}",
+            font=ctk.CTkFont(size=12, weight="bold"),
+            text_color=("#4338ca", "#c7d2fe"),
+            anchor="w"
+        ).pack(fill="x", padx=10, pady=(8, 0))
+
+        # Сниппет: совпадения подсвечены тегом
+        snippet = ctk.CTkTextbox(
+            item,
+            height=52,
+            wrap="word",
+            fg_color="transparent",
+            border_width=0,
+            activate_scrollbars=False,
+            font=ctk.CTkFont(size=12),
+            text_color=("gray20", "#cbd5e1")
+        )
+        snippet.pack(fill="x", padx=4, pady=(0, 6))
+        snippet.tag_config("match", background="#facc15", foreground="#1e1b4b")
+
+        for i, part in enumerate(result["snippet"].replace("\x03", "\x02").split("\x02")):
+            snippet.insert("end", part, "match" if i % 2 else None)
+        snippet.configure(state="disabled")
+
+        open_result = lambda e, r=result: self.app.open_search_result(r["chat_id"], r["message_id"])
+        for widget in (item, snippet, *item.winfo_children()):
+            widget.bind("<Button-1>", open_result)
+        snippet.configure(cursor="hand2")
+
+    # === ИСТОРИЯ ===
+
+    def page_limit(self) -> int:
+        """Сколько чатов перечитать при обновлении — всё, что уже подгружено"""
+        return max(Config.CHAT_PAGE_SIZE, len(self.chats))
 
-            # Текст чата
-            text_frame = ctk.CTkFrame(chat_frame, fg_color="transparent")
-            text_frame.pack(side="left", fill="both", expand=True, pady=10)
+    @staticmethod
+    def cursor(chats: list):
+        """Курсор следующей страницы: (updated_at, id) последнего чата"""
+        return (chats[-1][3], chats[-1][0]) if chats else None
 
-            # Название
-            title_text = title[:22] + "..." if len(title) > 22 else title
+    def refresh_chats(self, chats: list, current_id: int = None, limit: int = None):
+        """Обновить загруженную часть истории (первые limit чатов)"""
+        self.chats = chats
+        self.has_more = limit is not None and len(chats) >= limit
+        self.active_id = current_id
 
-            if is_active:
-                title_color = ("#4338ca", "#c7d2fe")
-                title_weight = "bold"
+        # Чат, вернувшийся из архива, показывается уже в основном списке
+        if self.archive_chats:
+            ids = {chat[0] for chat in chats}
+            self.archive_chats = [chat for chat in self.archive_chats if chat[0] not in ids]
+
+        # Пока открыт поиск, список чатов не перерисовываем
+        if not self.search_query:
+            self._update_list()
+
+    def set_active(self, chat_id: int):
+        self.active_id = chat_id
+        self.chat_list.refresh()
+
+    def forget_chats(self, chat_ids: list):
+        """Удалённые чаты — в том числе из подгруженной страницы архива"""
+        if self.archive_chats:
+            ids = set(chat_ids)
+            self.archive_chats = [chat for chat in self.archive_chats if chat[0] not in ids]
+
+    def append_chats(self, chats: list, limit: int):
+        self.chats = self.chats + chats
+        self.has_more = len(chats) >= limit
+        self._update_list()
+
+    def _update_list(self):
+        """
+        Элементы списка из загруженных страниц. Заголовки групп по дате
+        ставятся по ходу уже отсортированных чатов — без отдельных запросов
+        """
+        items = []
+        today = date.today()
+        group = None
+        for chat in self.chats:
+            chat_group = date_group(chat[3], today)
+            if chat_group != group:
+                group = chat_group
+                items.append({"kind": "header", "key": ("header", group), "text": group})
+            items.append({"kind": "chat", "key": ("chat", chat[0]), "chat": chat,
+                          "archived": False})
+
+        if not self.chats:
+            items.append({"kind": "note", "key": ("note", "empty"),
+                          "text": "Нет сохранённых чатов"})
+
+        # Архив — под последней страницей основной истории
+        if not self.has_more:
+            if self.archive_chats is None:
+                text = "🗄  Архив  ▸"
             else:
-                title_color = ("gray20", "#e2e8f0")
-                title_weight = "normal"
-
-            # ИСПРАВЛЕНО: убрал hover_color="transparent"
-            title_btn = ctk.CTkButton(
-                text_frame,
-                text=title_text,
-                command=lambda cid=chat_id: self.app.load_chat(cid),
-                fg_color="transparent",
-                hover_color=("#e2e8f0", "#3b3b5c"),  # Реальный цвет вместо transparent
-                text_color=title_color,
-                anchor="w",
-                height=20,
-                font=ctk.CTkFont(size=13, weight=title_weight)
-            )
-            title_btn.pack(fill="x")
-
-            # Время
-            try:
-                time_str = datetime.fromisoformat(str(updated)).strftime("%d.%m %H:%M")
-            except:
-                time_str = "—"
+                more = "+" if self.archive_has_more else ""
+                text = f"🗄  Архив · {len(self.archive_chats)}{more}"
+            items.append({"kind": "archive", "key": ("archive",), "text": text})
 
-            ctk.CTkLabel(
-                text_frame,
-                text=time_str,
-                font=ctk.CTkFont(size=10),
-                text_color=("gray50", "#64748b"),
-                anchor="w"
-            ).pack(fill="x")
-
-            # Кнопка удаления
-            del_btn = ctk.CTkButton(
-                chat_frame,
-                text="✕",
-                width=28,
-                height=28,
-                corner_radius=8,
-                fg_color="transparent",
-                hover_color=("#fecaca", "#7f1d1d"),
-                text_color=("gray40", "#94a3b8"),
-                font=ctk.CTkFont(size=12),
-                command=lambda cid=chat_id: self.app.delete_chat(cid)
-            )
-            del_btn.pack(side="right", padx=8)
+            for chat in self.archive_chats or ():
+                items.append({"kind": "chat", "key": ("chat", chat[0]), "chat": chat,
+                              "archived": True})
+            if self.archive_chats == []:
+                items.append({"kind": "note", "key": ("note", "archive"), "text": "Архив пуст"})
+
+        self.chat_list.set_items(items)
+
+    # === ВЫБОР НЕСКОЛЬКИХ ЧАТОВ ===
+
+    def set_select_mode(self, enabled: bool):
+        self.select_mode = enabled
+        self.selected.clear()
+        self._update_selected()
+        if enabled:
+            self.select_bar.pack(fill="x", padx=20, pady=(0, 8), before=self.list_frame)
+        else:
+            self.select_bar.pack_forget()
+
+        if self.search_query:
+            self.clear_search()
+        else:
+            # Видимые строки сами переключатся на флажки
+            self.chat_list.refresh()
+
+    def _toggle_selected(self, chat_id: int, selected: bool):
+        if selected:
+            self.selected.add(chat_id)
+        else:
+            self.selected.discard(chat_id)
+        self._update_selected()
+
+    def _update_selected(self):
+        self.selected_label.configure(text=f"Выбрано: {len(self.selected)}")
+        self.delete_selected_btn.configure(state="normal" if self.selected else "disabled")
+
+    # === АРХИВ ===
+
+    def _on_scroll(self, first, last):
+        # Список докрутили почти до конца — подгрузить следующую страницу
+        if float(last) >= 0.9 and not self.loading:
+            self.loading = True
+            self.after_idle(lambda: self._load_more(scrolled=float(first) > 0))
+
+    def _load_more(self, scrolled: bool):
+        try:
+            if self.search_query:
+                return
+            if self.has_more:
+                self.app.load_more_chats()
+            elif self.archive_chats is None:
+                # Архив под историей открывается, только когда до него докрутили
+                if scrolled:
+                    self.app.load_archived_chats()
+            elif self.archive_has_more:
+                self.app.load_archived_chats()
+        finally:
+            self.loading = False
+
+    def _load_archive(self):
+        if self.archive_chats is None and not self.search_query:
+            self.app.load_archived_chats()
 
-            self.chat_buttons[chat_id] = chat_frame
\ No newline at end of file
+    def show_archived_chats(self, chats: list, limit: int):
+        """Следующая страница архива"""
+        self.archive_chats = (self.archive_chats or []) + chats
+        self.archive_has_more = len(chats) >= limit
+        self._update_list()
@@ -0,0 +1,81 @@
+"""
+Отрисовка стриминга с ограничением частоты кадров.
+
+Раньше каждый кусок ответа ставил в очередь Tk свой after(0) с полным
+текстом, а label переразмечал его целиком: O(n²) на ответ и тысячи
+событий в очереди на быстрых моделях. StreamRenderer копит куски из
+любого потока и не чаще fps раз в секунду отдаёт в UI только новый
+текст одним вызовом; финальный текст применяется один раз в конце.
+"""
+
+import threading
+import time
+
+from config import Config
+
+
+class StreamRenderer:
+    """
+    push() и finish() можно вызывать из любого потока, append(текст) и
+    finalize(текст) вызываются в потоке Tk. До attach() куски копятся.
+    """
+
+    def __init__(self, widget, fps: int = Config.STREAM_FPS):
+        self.widget = widget
+        self.interval = 1.0 / fps
+        self.frames = 0
+
+        self._lock = threading.Lock()
+        self._pending = []
+        self._final = None
+        self._scheduled = False
+        self._done = False
+        self._last = 0.0
+        self._append = None
+        self._finalize = None
+
+    def attach(self, append, finalize):
+        """Куда рисовать (вызывается в потоке Tk)"""
+        self._append = append
+        self._finalize = finalize
+
+    def push(self, delta: str):
+        if not delta:
+            return
+        with self._lock:
+            self._pending.append(delta)
+            self._schedule()
+
+    def finish(self, text: str):
+        """Итоговый текст ответа: заменит накопленный, стриминг завершится"""
+        with self._lock:
+            self._final = text
+            self._schedule()
+
+    def _schedule(self):
+        # Под self._lock: кадр уже запланирован — новый кусок войдёт в него
+        if self._scheduled or self._done:
+            return
+        self._scheduled = True
+        delay = max(0.0, self._last + self.interval - time.monotonic())
+        self.widget.after(int(delay * 1000), self._flush)
+
+    def _flush(self):
+        with self._lock:
+            self._scheduled = False
+            if self._append is None:
+                # Сообщение ещё не создано — подождать следующий кадр
+                self._last = time.monotonic()
+                self._schedule()
+                return
+            pending, self._pending = self._pending, []
+            final = self._final
+            if final is not None:
+                self._done = True
+            self._last = time.monotonic()
+
+        self.frames += 1
+        if final is not None:
+            self._finalize(final)
+        elif pending:
+            self._append("".join(pending))
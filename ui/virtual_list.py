@@ -0,0 +1,200 @@
+"""
+Основа виртуальных списков: холст с прокруткой и пулы виджетов.
+
+Элементы списка — словари с данными (kind, widget, …), позиции —
+префиксные суммы высот в offsets. Виджеты получают только элементы в
+видимой области и запасе OVERSCAN вокруг неё; ушедшие за край виджеты
+прячутся и возвращаются в пул своего вида. Наследник задаёт высоту
+элемента (_height), вид виджета (_kind) и его создание (_create).
+"""
+
+import bisect
+import sys
+import tkinter
+
+import customtkinter as ctk
+
+OVERSCAN = 600  # px над и под видимой областью
+
+
+class VirtualList(ctk.CTkFrame):
+    def __init__(self, master, on_scroll=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.on_scroll = on_scroll
+
+        self.canvas = tkinter.Canvas(self, highlightthickness=0, bd=0, yscrollincrement=20)
+        self.scrollbar = ctk.CTkScrollbar(
+            self,
+            command=self._on_scrollbar,
+            button_color=("#c7d2fe", "#4338ca"),
+            button_hover_color=("#a5b4fc", "#6366f1")
+        )
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.canvas.configure(yscrollcommand=self._on_yview,
+                              bg=self._apply_appearance_mode(self._fg_color))
+
+        self.items = []
+        self.offsets = [0]      # offsets[i] — верх i-го элемента, offsets[-1] — вся высота
+        self.shown = []         # элементы, у которых сейчас есть виджет
+        self.pools = {}         # вид виджета → свободные виджеты
+        self.widgets = []       # все созданные виджеты (для смены ширины)
+        self._render_job = None
+        self._width = 1
+
+        self.canvas.bind("<Configure>", self._on_configure)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.canvas.bind_all(sequence, self._on_wheel, add="+")
+
+    def _set_appearance_mode(self, mode_string):
+        super()._set_appearance_mode(mode_string)
+        self.canvas.configure(bg=self._apply_appearance_mode(self._fg_color))
+
+    # === ДЛЯ НАСЛЕДНИКОВ ===
+
+    def _height(self, item: dict) -> int:
+        raise NotImplementedError
+
+    def _kind(self, item: dict):
+        raise NotImplementedError
+
+    def _create(self, kind):
+        """Новый виджет вида kind с родителем self.canvas"""
+        raise NotImplementedError
+
+    def _resized(self):
+        """Ширина или высота холста изменилась"""
+
+    def _user_scrolled(self):
+        """Пользователь прокрутил список колесом или полосой"""
+
+    # === РАЗМЕТКА ===
+
+    def _relayout(self, start: int = 0):
+        """Пересчитать позиции начиная с элемента start (выше ничего не менялось)"""
+        offsets = self.offsets[:start + 1] if start else [0]
+        for item in self.items[start:]:
+            if item["widget"] is not None:
+                self.canvas.coords(item["widget"].window, 0, offsets[-1] + self._top(item))
+            offsets.append(offsets[-1] + self._height(item))
+        self.offsets = offsets
+        self._update_scrollregion()
+
+    def _top(self, item: dict) -> int:
+        """Отступ виджета от верха места элемента"""
+        return 0
+
+    def _update_scrollregion(self):
+        height = max(self.offsets[-1], self.canvas.winfo_height())
+        self.canvas.configure(scrollregion=(0, 0, self._width, height))
+
+    def _move_to(self, y: float):
+        total = max(self.offsets[-1], 1)
+        self.canvas.yview_moveto(max(0.0, y) / total)
+
+    def _visible_range(self) -> tuple:
+        """Индексы первого и последнего элемента в видимой области с запасом"""
+        top = self.canvas.canvasy(0)
+        low = top - OVERSCAN
+        high = top + self.canvas.winfo_height() + OVERSCAN
+        first = max(0, bisect.bisect_right(self.offsets, low) - 1)
+        last = min(len(self.items) - 1, bisect.bisect_left(self.offsets, high))
+        return first, last
+
+    # === ПОКАЗ ===
+
+    def _schedule_render(self):
+        if self._render_job is None:
+            self._render_job = self.after_idle(self._render)
+
+    def _render(self) -> list:
+        """Раздать виджеты видимым элементам; вернуть элементы, получившие виджет"""
+        self._render_job = None
+        if not self.items:
+            return []
+
+        first, last = self._visible_range()
+        needed_ids = {id(item) for item in self.items[first:last + 1]}
+
+        for item in self.shown:
+            if id(item) not in needed_ids:
+                self._release(item)
+        self.shown = [item for item in self.shown if id(item) in needed_ids]
+
+        fresh = []
+        for index in range(first, last + 1):
+            item = self.items[index]
+            if item["widget"] is None:
+                self._materialize(item)
+                self.canvas.coords(item["widget"].window, 0, self.offsets[index] + self._top(item))
+                self.shown.append(item)
+                fresh.append(item)
+        return fresh
+
+    def _materialize(self, item: dict):
+        kind = self._kind(item)
+        pool = self.pools.setdefault(kind, [])
+        if pool:
+            widget = pool.pop()
+        else:
+            widget = self._create(kind)
+            widget.kind = kind
+            widget.window = self.canvas.create_window(
+                0, 0, window=widget, anchor="nw", width=self._width
+            )
+            self.widgets.append(widget)
+
+        self.canvas.itemconfigure(widget.window, state="normal")
+        widget.show(item)
+        item["widget"] = widget
+
+    def _release(self, item: dict):
+        widget = item["widget"]
+        if widget is None:
+            return
+        item["widget"] = None
+        self.canvas.itemconfigure(widget.window, state="hidden")
+        self.pools[widget.kind].append(widget)
+
+    def _release_all(self):
+        for item in self.shown:
+            self._release(item)
+        self.shown.clear()
+
+    # === СОБЫТИЯ ===
+
+    def _on_configure(self, event):
+        if event.width != self._width:
+            self._width = event.width
+            for widget in self.widgets:
+                self.canvas.itemconfigure(widget.window, width=self._width)
+        self._update_scrollregion()
+        self._resized()
+        self._schedule_render()
+
+    def _on_yview(self, first, last):
+        self.scrollbar.set(first, last)
+        self._schedule_render()
+        if self.on_scroll:
+            self.on_scroll(first, last)
+
+    def _on_scrollbar(self, *args):
+        self.canvas.yview(*args)
+        self._user_scrolled()
+
+    def _on_wheel(self, event):
+        if not str(event.widget).startswith(str(self.canvas)):
+            return
+        if self.canvas.yview() == (0.0, 1.0):
+            return
+
+        if event.num == 4:
+            step = -3
+        elif event.num == 5:
+            step = 3
+        elif sys.platform.startswith("win"):
+            step = -int(event.delta / 40)
+        else:
+            step = -event.delta
+        self.canvas.yview_scroll(step, "units")
+        self._user_scrolled()
@@ -0,0 +1,335 @@
+"""
+Импорт чатов из JSON/JSONL.
+
+Понимает три формата:
+- собственный экспорт (ExportManager.to_json): {"title", "messages": [...]};
+- формат OpenAI: {"messages": [{"role", "content"}]} — в том числе JSONL
+  по одному диалогу на строку, как в наборах для дообучения;
+- conversations.json из экспорта ChatGPT: массив диалогов с деревом "mapping".
+
+Файлы читаются потоком: JSONL — построчно, JSON-массив — по одному
+элементу через raw_decode поверх буфера, поэтому в памяти только
+текущая пачка чатов. Пачка пишется одной транзакцией (executemany)
+вместе с позицией в файле, так что прерванный импорт продолжается с
+места остановки, а уже импортированный файл не дублируется.
+"""
+
+import codecs
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from config import Config
+from utils.tokens import estimate_tokens
+
+EXTENSIONS = (".json", ".jsonl", ".ndjson")
+READ_CHUNK = 1 << 16
+ROLES = ("user", "assistant")
+
+
+# === ЧТЕНИЕ ===
+
+def _iter_lines(f, offset: int):
+    """
+    JSONL: (запись, позиция после неё). Повреждённая строка отдаётся как
+    None — она пропускается, а позиция уходит за неё, иначе повторный
+    импорт каждый раз останавливался бы на том же месте.
+    """
+    for line in f:
+        offset += len(line)
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            record = None
+        yield record, offset
+
+
+def _iter_array(f, offset: int):
+    """JSON-массив по одному элементу: (элемент, позиция после него)"""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    eof = False
+
+    def fill(size):
+        nonlocal buf, eof
+        chunk = f.read(size)
+        eof = not chunk
+        buf += utf8.decode(chunk, final=eof)
+
+    def consume(n):
+        # Позиция считается в байтах файла, буфер — в символах
+        nonlocal buf, offset
+        offset += len(buf[:n].encode("utf-8"))
+        buf = buf[n:]
+
+    if offset == 0:
+        fill(READ_CHUNK)
+        start = buf.find("[")
+        if start < 0:
+            raise ValueError("Ожидался JSON-массив")
+        consume(start + 1)
+
+    while True:
+        stripped = len(buf) - len(buf.lstrip(" \t\r\n,"))
+        consume(stripped)
+        if not buf:
+            if eof:
+                return
+            fill(READ_CHUNK)
+            continue
+        if buf[0] == "]":
+            return
+
+        try:
+            record, end = decoder.raw_decode(buf)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # Элемент не поместился в буфер: дочитать (размер растёт вдвое)
+            fill(max(READ_CHUNK, len(buf)))
+            continue
+
+        consume(end)
+        yield record, offset
+
+
+def iter_records(path: Path, offset: int = 0):
+    """Записи файла, начиная с позиции offset: (запись, позиция после неё)"""
+    size = path.stat().st_size
+    with open(path, "rb") as f:
+        if path.suffix.lower() in (".jsonl", ".ndjson"):
+            f.seek(offset)
+            yield from _iter_lines(f, offset)
+            return
+
+        head = f.read(READ_CHUNK).lstrip(codecs.BOM_UTF8).lstrip()
+        if head.startswith(b"["):
+            f.seek(offset)
+            yield from _iter_array(f, offset)
+        elif offset < size:
+            # Одиночный экспорт — небольшой файл с одним чатом
+            f.seek(0)
+            yield json.loads(f.read().decode("utf-8-sig")), size
+
+
+# === ФОРМАТЫ ===
+
+def _text(content) -> str:
+    """content строкой или частями: ["…"], [{"type": "text", "text": "…"}]"""
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, dict):
+        content = content.get("parts") or [content.get("text", "")]
+    parts = []
+    for part in content:
+        if isinstance(part, str):
+            parts.append(part)
+        elif isinstance(part, dict) and isinstance(part.get("text"), str):
+            parts.append(part["text"])
+    return "\n".join(p for p in parts if p)
+
+
+def _timestamp(value):
+    if value is None or value == "":
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(value)
+        moment = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        if moment.tzinfo is not None:
+            moment = moment.astimezone().replace(tzinfo=None)
+        return moment
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+def _chatgpt_messages(record: dict) -> list:
+    """Ветка дерева mapping от current_node к корню — в хронологическом порядке"""
+    mapping = record.get("mapping") or {}
+    node_id = record.get("current_node")
+    if node_id not in mapping:
+        # Без current_node — самая поздняя ветка: идём от последнего листа
+        leaves = [key for key, node in mapping.items() if not node.get("children")]
+        node_id = leaves[-1] if leaves else None
+
+    chain = []
+    seen = set()
+    while node_id in mapping and node_id not in seen:
+        seen.add(node_id)
+        node = mapping[node_id]
+        if node.get("message"):
+            chain.append(node["message"])
+        node_id = node.get("parent")
+
+    messages = []
+    for message in reversed(chain):
+        messages.append({
+            "role": (message.get("author") or {}).get("role"),
+            "content": message.get("content"),
+            "timestamp": message.get("create_time"),
+            "model": (message.get("metadata") or {}).get("model_slug"),
+        })
+    return messages
+
+
+def normalize(record) -> dict:
+    """Запись любого из форматов → чат для DatabaseManager.import_chats; None — не чат"""
+    if not isinstance(record, dict):
+        return None
+    if "mapping" in record:
+        raw = _chatgpt_messages(record)
+    elif isinstance(record.get("messages"), list):
+        raw = record["messages"]
+    else:
+        return None
+
+    system_prompt = ""
+    messages = []
+    for message in raw:
+        if not isinstance(message, dict):
+            continue
+        role = message.get("role")
+        content = _text(message.get("content"))
+        if role == "system":
+            system_prompt = system_prompt or content
+        elif role in ROLES and content:
+            messages.append((role, content, _timestamp(message.get("timestamp")),
+                             message.get("model"), estimate_tokens(content)))
+    if not messages:
+        return None
+
+    title = record.get("title")
+    if not title:
+        first = next((m[1] for m in messages if m[0] == "user"), messages[0][1])
+        first = " ".join(first.split())
+        title = first[:40] + "..." if len(first) > 40 else first
+
+    created = _timestamp(record.get("create_time") or record.get("created_at")) or messages[0][2]
+    updated = (_timestamp(record.get("update_time") or record.get("updated_at"))
+               or messages[-1][2] or created)
+    models = [m[3] for m in messages if m[3]]
+
+    return {
+        "title": title,
+        "system_prompt": system_prompt,
+        "model": record.get("model") or (models[-1] if models else ""),
+        "created_at": created,
+        "updated_at": updated,
+        "messages": messages,
+    }
+
+
+# === ИМПОРТ ===
+
+def collect_files(paths: list) -> list:
+    """Файлы и папки → список JSON/JSONL файлов (папки обходятся рекурсивно)"""
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*")
+                                if p.is_file() and p.suffix.lower() in EXTENSIONS))
+        elif path.is_file():
+            files.append(path)
+    return files
+
+
+class ChatImporter:
+    """
+    Потоковый импорт: разбор следующей пачки идёт, пока поток записи
+    коммитит предыдущую. progress(байт обработано, всего байт, чатов,
+    сообщений) вызывается после каждой сохранённой пачки — из потока импорта.
+    """
+
+    def __init__(self, db, batch_size: int = Config.IMPORT_BATCH, progress=None):
+        self.db = db
+        self.batch_size = batch_size
+        self.progress = progress
+        self.cancelled = threading.Event()
+
+        self.total = 0
+        self.chats = 0
+        self.messages = 0
+        self.skipped = 0
+
+    def cancel(self):
+        """Остановить после текущей пачки; позиция в файле сохранится"""
+        self.cancelled.set()
+
+    def run(self, paths: list) -> dict:
+        files = collect_files(paths)
+        self.total = sum(p.stat().st_size for p in files)
+        self.chats = self.messages = self.skipped = 0
+        done = 0
+        started = time.perf_counter()
+
+        for path in files:
+            if self.cancelled.is_set():
+                break
+            done = self._import_file(path, done)
+
+        elapsed = time.perf_counter() - started
+        print(f"[IMPORT] Файлов: {len(files)}, чатов: {self.chats}, "
+              f"сообщений: {self.messages}, пропущено: {self.skipped} за {elapsed:.1f} с")
+        return {"files": len(files), "chats": self.chats, "messages": self.messages,
+                "skipped": self.skipped, "cancelled": self.cancelled.is_set()}
+
+    def _import_file(self, path: Path, done: int) -> int:
+        """Импортировать файл с сохранённой позиции; вернуть обработанные байты"""
+        size = path.stat().st_size
+        # Ключ включает размер: изменённый файл импортируется заново
+        source = f"import:{path.resolve()}:{size}"
+        offset = self.db.get_import_offset(source)
+        if offset >= size:
+            print(f"[IMPORT] {path.name}: уже импортирован")
+            return done + size
+
+        pending = None
+        batch = []
+        position = offset
+        try:
+            for record, position in iter_records(path, offset):
+                chat = normalize(record)
+                if chat is None:
+                    self.skipped += 1
+                    continue
+                batch.append(chat)
+
+                if len(batch) >= self.batch_size:
+                    pending = self._flush(pending, batch, source, position, done + position)
+                    batch = []
+                    if self.cancelled.is_set():
+                        break
+            else:
+                position = size
+        except (ValueError, UnicodeDecodeError) as e:
+            # Повреждённый JSON-файл или массив (в JSONL битые строки просто
+            # пропускаются): сохранить всё, что успели разобрать до ошибки
+            print(f"[IMPORT] {path.name}: ошибка разбора: {e}")
+
+        pending = self._flush(pending, batch, source, position, done + position)
+        self._wait(pending)
+        return done + size
+
+    def _flush(self, pending, batch: list, source: str, position: int, done: int):
+        """Отдать пачку потоку записи и дождаться предыдущей"""
+        future = self.db.import_chats(batch, source, position)
+        self._wait(pending)
+        return future, len(batch), sum(len(chat["messages"]) for chat in batch), done
+
+    def _wait(self, pending):
+        if pending is None:
+            return
+        future, chats, messages, done = pending
+        future.result()
+        self.chats += chats
+        self.messages += messages
+        if self.progress:
+            self.progress(done, self.total, self.chats, self.messages)
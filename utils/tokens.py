@@ -0,0 +1,21 @@
+import math
+
+# Служебные токены разметки на каждое сообщение (роль, разделители)
+MESSAGE_OVERHEAD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Оценка числа токенов без токенизатора модели.
+
+    Байты UTF-8 / 4: для латиницы это ~4 символа на токен, для кириллицы
+    (2 байта на символ) — ~2 символа, что близко к токенизаторам
+    Llama/Mistral и с запасом для остальных.
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text.encode("utf-8")) / 4)
+
+
+def message_tokens(content: str) -> int:
+    return estimate_tokens(content) + MESSAGE_OVERHEAD